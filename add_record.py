@@ -1,14 +1,13 @@
 import streamlit as st
 import pandas as pd
 from datetime import date, datetime
-import uuid
-from bq_database import (
-    get_all_product_stock,
-    update_product_stock,
-    insert_transaction_record,
-    bulk_update_product_stock,
-    bulk_insert_transaction_records
-)
+from bq_database import get_all_product_stock
+from transaction_entry import build_transaction, stock_update_for, submit_transaction, submit_transactions
+from write_queue import WRITE_BEHIND, get_write_queue
+from bulk_import import CORRECTION_TYPES, read_import_file, validate_import_chunk, iter_valid_batches, build_import_batch
+
+# How long a write-behind submitter waits for the batch to land before moving on
+WRITE_BEHIND_ACK_SECONDS = 2
 
 # --- STATIC LISTS FOR DROPDOWNS ---
 ITEM_NAMES = [
@@ -35,11 +34,13 @@ def combobox(label, options, key, help_text=""):
 
 def show_add_record():
     st.markdown("### ➕ Add New Inventory Transaction")
-    entry_mode = st.radio("Select Entry Mode", ["Single Transaction", "Bulk Transactions"], horizontal=True)
+    entry_mode = st.radio("Select Entry Mode", ["Single Transaction", "Bulk Transactions", "File Import"], horizontal=True)
     if entry_mode == "Single Transaction":
         render_single_transaction_form()
-    else:
+    elif entry_mode == "Bulk Transactions":
         render_bulk_transaction_form()
+    else:
+        render_file_import_form()
 
 def render_single_transaction_form():
     st.subheader("Single Transaction Entry")
@@ -82,23 +83,47 @@ def render_single_transaction_form():
                 st.error("Please fill in all required fields.")
                 return
             
-            adjustment = -quantity if transaction_type in ["Sales", "Breakage"] else quantity
-            record = {
-                'transaction_id': str(uuid.uuid4()), 'transaction_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'product_name': product_name, 'color': color, 'packing_option': packing_option,
-                'product_grade': product_grade, 'entry_type': transaction_type, 'quantity_change': quantity,
-                'user_name': entered_by, 'invoice_number': invoice_number, 'remarks': remarks
-            }
+            record, adjustment = build_transaction(
+                product_name, color, packing_option, product_grade, transaction_type, quantity,
+                entered_by, invoice_number, remarks
+            )
+            if WRITE_BEHIND:
+                ticket = get_write_queue().submit(record, adjustment)
+                st.session_state.setdefault('write_tickets', []).append(ticket)
+                status = ticket.wait(timeout=WRITE_BEHIND_ACK_SECONDS)
+                if status == 'committed':
+                    st.success("✅ Record added successfully!")
+                elif status == 'failed':
+                    st.error(f"❌ An error occurred: {ticket.error}")
+                else:
+                    st.info("⏳ Record accepted and queued for saving. Check its status below.")
+                return
             try:
-                stock_errors = update_product_stock(product_name, color, packing_option, product_grade, adjustment)
-                if stock_errors: raise Exception(stock_errors)
-                transaction_errors = insert_transaction_record(record)
-                if transaction_errors: raise Exception(f"Stock updated, but log failed: {transaction_errors}")
+                submit_errors = submit_transaction(record, adjustment)
+                if submit_errors: raise Exception(submit_errors)
                 st.success("✅ Record added successfully!")
                 st.rerun()
             except Exception as e:
                 st.error(f"❌ An error occurred: {e}")
 
+    if WRITE_BEHIND and st.session_state.get('write_tickets'):
+        render_write_ticket_status()
+
+def render_write_ticket_status():
+    """Shows the save status of this session's recent write-behind submissions."""
+    tickets = st.session_state.write_tickets[-10:]
+    st.session_state.write_tickets = tickets
+    status_icons = {'queued': '⏳ Queued', 'committed': '✅ Saved', 'failed': '❌ Failed'}
+    with st.expander("Recent submissions", expanded=any(t.status != 'committed' for t in tickets)):
+        status_df = pd.DataFrame([{
+            'Submitted': datetime.fromtimestamp(t.submitted_at).strftime('%H:%M:%S'),
+            'Product': t.record['product_name'], 'Type': t.record['entry_type'],
+            'Quantity': t.record['quantity_change'], 'Status': status_icons[t.status], 'Error': t.error or '',
+        } for t in reversed(tickets)])
+        st.dataframe(status_df, use_container_width=True, hide_index=True)
+        if st.button("🔄 Refresh status"):
+            st.rerun()
+
 def render_bulk_transaction_form():
     st.subheader("Bulk Transactions Entry")
     restriction = st.session_state.get('allowed_transaction')
@@ -163,7 +188,6 @@ def render_bulk_transaction_form():
                 return
 
             records_to_create, stock_updates = [], []
-            adj_multiplier = -1 if entry_type in ["Sales", "Breakage"] else 1
             
             for i in range(st.session_state.bulk_rows):
                 def get_value(base_key):
@@ -180,26 +204,19 @@ def render_bulk_transaction_form():
                 grade = get_value("grade")
                 quantity = st.session_state[f"quantity_{i}"]
                 
-                records_to_create.append({
-                    'transaction_id': str(uuid.uuid4()), 'transaction_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'product_name': product_name, 'color': color, 'packing_option': packing,
-                    'product_grade': grade, 'entry_type': entry_type, 'quantity_change': quantity,
-                    'user_name': entered_by, 'invoice_number': invoice_number, 'remarks': remarks
-                })
-                stock_updates.append({
-                    'product_name': product_name, 'color': color, 'packing_option': packing,
-                    'product_grade': grade, 'adjustment': quantity * adj_multiplier
-                })
+                record, adjustment = build_transaction(
+                    product_name, color, packing, grade, entry_type, quantity, entered_by, invoice_number, remarks
+                )
+                records_to_create.append(record)
+                stock_updates.append(stock_update_for(record, adjustment))
 
             if not records_to_create:
                 st.warning("No valid records to submit.")
                 return
             
             try:
-                stock_errors = bulk_update_product_stock(stock_updates)
-                if stock_errors: raise Exception(stock_errors)
-                transaction_errors = bulk_insert_transaction_records(records_to_create)
-                if transaction_errors: raise Exception(f"Stock updated, but log failed: {transaction_errors}")
+                submit_errors = submit_transactions(records_to_create, stock_updates)
+                if submit_errors: raise Exception(submit_errors)
                 
                 st.session_state.bulk_rows = 1
                 st.success(f"✅ Successfully added {len(records_to_create)} records!")
@@ -209,3 +226,69 @@ def render_bulk_transaction_form():
                 st.write("### Preview of Records that Failed:")
                 st.dataframe(pd.DataFrame(records_to_create))
                 st.error(f"❌ An error occurred: {e}")
+
+# Rows written per submit_transactions call during a file import
+IMPORT_BATCH_ROWS = 1000
+
+def render_file_import_form():
+    st.subheader("Import Transactions from File")
+    restriction = st.session_state.get('allowed_transaction')
+
+    allowed_options = [t for t in TRANSACTION_TYPES if t]
+    if st.session_state.get('user_role') in ('admin', 'Sadmin'):
+        allowed_options += [t for t in CORRECTION_TYPES if t not in allowed_options]
+    if restriction and restriction != 'all': allowed_options = restriction.split(',')
+
+    st.caption(
+        "Columns: **product_name**, **quantity**, entry_type, color, packing_option, product_grade, "
+        "invoice_number, remarks. Rows without an entry_type use the default type below."
+    )
+    default_entry_type = st.selectbox("Default Transaction Type", options=allowed_options)
+    entered_by = st.text_input("Name of Person Entering Record*", value=st.session_state.get('user', ''), key="import_entered_by")
+    uploaded_file = st.file_uploader("Upload CSV or Excel file", type=["csv", "xlsx"])
+
+    if uploaded_file is None:
+        return
+
+    # Validation pass: stream the file chunk by chunk and keep only the error rows
+    valid_rows, error_frames, row_number = 0, [], 2
+    try:
+        for chunk in read_import_file(uploaded_file):
+            valid, errors = validate_import_chunk(chunk, allowed_options, default_entry_type, row_number)
+            row_number += len(chunk)
+            valid_rows += len(valid)
+            error_frames.append(errors)
+    except ImportError:
+        st.error("Reading Excel files requires the 'openpyxl' package. Please upload a CSV instead.")
+        return
+    except Exception as e:
+        st.error(f"❌ Could not read file: {e}")
+        return
+
+    errors_df = pd.concat(error_frames, ignore_index=True)
+    col1, col2 = st.columns(2)
+    col1.metric("Valid Rows", valid_rows)
+    col2.metric("Rows with Errors", len(errors_df))
+    if not errors_df.empty:
+        st.warning("The rows below will be skipped. Fix them in the file and upload it again to include them.")
+        st.dataframe(errors_df.rename(columns={'row_number': 'Row', 'error': 'Error'}), use_container_width=True, hide_index=True)
+
+    if valid_rows == 0:
+        return
+    if not entered_by:
+        st.error("Please enter your name.")
+        return
+
+    if st.button(f"Import {valid_rows} Valid Rows", type="primary"):
+        # Import pass: re-read the file and write bounded batches the same way the bulk form does
+        progress = st.progress(0.0)
+        imported = 0
+        for batch in iter_valid_batches(read_import_file(uploaded_file), allowed_options, default_entry_type, IMPORT_BATCH_ROWS):
+            records, stock_updates = build_import_batch(batch, entered_by)
+            submit_errors = submit_transactions(records, stock_updates)
+            if submit_errors:
+                st.error(f"❌ Stopped after {imported} rows: {submit_errors}")
+                return
+            imported += len(records)
+            progress.progress(imported / valid_rows)
+        st.success(f"✅ Successfully imported {imported} records!")
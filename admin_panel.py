@@ -2,10 +2,27 @@
 
 import streamlit as st
 import pandas as pd
-from bq_database import get_all_users, update_user_role, delete_user, update_user_restriction
+from bq_database import (
+    get_all_users, update_user_role, delete_user, update_user_restriction,
+    get_performance_snapshot, flush_query_stats, clear_query_stats,
+    get_all_product_stock, get_low_stock_thresholds, set_low_stock_threshold, set_default_low_stock_threshold,
+)
 
 def show_admin_panel():
     st.title("👑 Admin Panel")
+
+    if st.session_state.get('user_role') == 'Sadmin':
+        users_tab, performance_tab, low_stock_tab = st.tabs(["👥 Users", "⏱️ Performance", "⚠️ Low Stock"])
+        with users_tab:
+            render_user_management()
+        with performance_tab:
+            render_performance()
+        with low_stock_tab:
+            render_low_stock_thresholds()
+    else:
+        render_user_management()
+
+def render_user_management():
     st.subheader("Manage User Roles & Permissions")
 
     logged_in_user_role = st.session_state.get('user_role')
@@ -79,4 +96,90 @@ def show_admin_panel():
                         st.warning(f"Deleted user {user['username']}.")
                         st.rerun()
                     except Exception as e:
-                        st.error(f"Failed to delete: {e}")
\ No newline at end of file
+                        st.error(f"Failed to delete: {e}")
+
+def render_performance():
+    st.subheader("Query Performance")
+    st.caption("Statistics for the most recent database jobs issued by this app instance.")
+
+    snapshot = get_performance_snapshot()
+    summary = snapshot['summary']
+
+    cache, writes = snapshot['read_cache'], snapshot['writes']
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Jobs Recorded", int(summary['calls'].sum()) if not summary.empty else 0)
+    col2.metric("GB Billed", f"{(summary['total_bytes_billed'].sum() if not summary.empty else 0) / 1e9:,.3f}")
+    lookups = cache['hits'] + cache['misses']
+    col3.metric("Read Cache Hit Rate", f"{cache['hits'] / lookups:.0%}" if lookups else "N/A")
+    col4.metric("Write Conflicts Retried", writes['retries'])
+
+    if summary.empty:
+        st.info("No queries recorded yet.")
+    else:
+        st.markdown("#### Per Function (costliest first)")
+        st.dataframe(summary.round(1), use_container_width=True, hide_index=True)
+
+        st.markdown("#### Recent Jobs")
+        recent = snapshot['recent'].copy()
+        recent['timestamp'] = pd.to_datetime(recent['timestamp'], unit='s').dt.strftime('%H:%M:%S')
+        st.dataframe(recent, use_container_width=True, hide_index=True)
+
+    with st.expander("Cache and write details"):
+        st.json({'read_cache': cache, 'writes': writes, 'daily_rollup': snapshot['daily_rollup']})
+
+    col1, col2, _ = st.columns([2, 2, 4])
+    if col1.button("💾 Flush to File", disabled=not snapshot['stats_file']):
+        written = flush_query_stats()
+        st.success(f"Wrote {written} records to {snapshot['stats_file']}.")
+    if col2.button("🗑️ Clear Stats"):
+        clear_query_stats()
+        st.rerun()
+
+def render_low_stock_thresholds():
+    st.subheader("Low Stock Thresholds")
+    st.caption("Alerts (sidebar badge and Analytics) list SKUs at or below their threshold. Changes apply to every user.")
+
+    default_threshold, overrides = get_low_stock_thresholds()
+    col1, col2, _ = st.columns([2, 2, 4])
+    new_default = col1.number_input("Default Threshold", min_value=0, step=1, value=default_threshold)
+    col2.write("")
+    if col2.button("Save Default", disabled=new_default == default_threshold):
+        error = set_default_low_stock_threshold(int(new_default))
+        if error:
+            st.error(error)
+        else:
+            st.success(f"Default threshold set to {int(new_default)} for all users.")
+
+    st.markdown("#### Per-SKU Thresholds")
+    skus = get_all_product_stock(['product_name', 'color', 'packing_option', 'product_grade'])
+    sku_options = {
+        " / ".join(str(v) for v in sku if pd.notna(v) and v): tuple('' if pd.isna(v) else v for v in sku)
+        for sku in skus.itertuples(index=False)
+    }
+    if not sku_options:
+        st.info("No stocked SKUs yet.")
+        return
+    col1, col2, col3 = st.columns([4, 2, 2])
+    sku_label = col1.selectbox("SKU", sorted(sku_options))
+    sku = sku_options[sku_label]
+    sku_threshold = col2.number_input("Threshold", min_value=0, step=1, value=overrides.get(sku, default_threshold), key=f"low_stock_{sku_label}")
+    col3.write("")
+    if col3.button("Save"):
+        error = set_low_stock_threshold(*sku, int(sku_threshold))
+        if error:
+            st.error(error)
+        else:
+            st.rerun()
+    if col3.button("Use Default", disabled=sku not in overrides):
+        error = set_low_stock_threshold(*sku, None)
+        if error:
+            st.error(error)
+        else:
+            st.rerun()
+
+    if overrides:
+        st.dataframe(
+            pd.DataFrame([(*key, value) for key, value in sorted(overrides.items())],
+                         columns=['product_name', 'color', 'packing_option', 'product_grade', 'threshold']),
+            use_container_width=True, hide_index=True,
+        )
@@ -2,28 +2,28 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from bq_database import get_inventory_records, get_all_product_stock
-from datetime import datetime, timedelta
+from bq_database import (
+    get_all_product_stock, get_transaction_filter_options, fetch_concurrently,
+    get_low_stock_alerts, get_low_stock_thresholds,
+)
+from analytics_queries import get_transaction_date_range, get_daily_flow, get_top_sellers, get_stock_distribution
+from datetime import datetime
 
 def show_analytics():
     st.markdown("### 📈 Advanced Analytics")
-    
-    # --- CHANGE 1: Initialize the slider's value in session_state ---
-    # This sets the default value only once per session.
-    if 'low_stock_threshold' not in st.session_state:
-        st.session_state.low_stock_threshold = 20
 
-    # Load data from BigQuery
-    transactions_df = get_inventory_records()
-    live_stock_df = get_all_product_stock()
+    # Load the (small) stock table and filter metadata in parallel; transaction series are aggregated by the database below
+    (first_transaction, _), live_stock_df, filter_options = fetch_concurrently(
+        get_transaction_date_range,
+        lambda: get_all_product_stock(['product_name', 'color', 'packing_option', 'product_grade', 'current_quantity']),
+        get_transaction_filter_options,
+    )
 
-    if live_stock_df.empty or transactions_df.empty:
+    if live_stock_df.empty or first_transaction is None:
         st.info("Insufficient data for analytics. Please add transactions.")
         return
 
     # --- Data Preprocessing ---
-    transactions_df['transaction_date'] = pd.to_datetime(transactions_df['transaction_date'])
-    transactions_df['quantity_change'] = pd.to_numeric(transactions_df['quantity_change'])
     live_stock_df['current_quantity'] = pd.to_numeric(live_stock_df['current_quantity'])
 
     # --- Page Filters ---
@@ -31,7 +31,7 @@ def show_analytics():
         col1, col2 = st.columns(2)
         
         with col1:
-            min_date = transactions_df['transaction_date'].min().date()
+            min_date = pd.Timestamp(first_transaction).date()
             max_date = datetime.now().date()
             start_date, end_date = st.date_input(
                 "Select Date Range",
@@ -41,39 +41,33 @@ def show_analytics():
             )
         
         with col2:
-            product_list = ["All"] + sorted(transactions_df['product_name'].unique().tolist())
+            product_list = ["All"] + filter_options['product_name']
             selected_products = st.multiselect("Select Products", product_list, default=["All"])
 
-    # --- Filtering Logic ---
-    start_datetime = pd.to_datetime(start_date).tz_localize('UTC')
-    end_datetime = (pd.to_datetime(end_date) + timedelta(days=1)).tz_localize('UTC')
-
-    filtered_transactions = transactions_df[
-        (transactions_df['transaction_date'] >= start_datetime) & 
-        (transactions_df['transaction_date'] < end_datetime)
-    ]
-    
+    # --- Filtering Logic (pushed down to the database) ---
     if "All" not in selected_products and selected_products:
-        filtered_transactions = filtered_transactions[filtered_transactions['product_name'].isin(selected_products)]
+        product_filter = selected_products
         filtered_stock = live_stock_df[live_stock_df['product_name'].isin(selected_products)]
     else:
+        product_filter = None
         filtered_stock = live_stock_df.copy()
 
-    if filtered_transactions.empty:
+    (daily_flow, (top_5_selling, total_sales_quantity), stock_distribution) = fetch_concurrently(
+        lambda: get_daily_flow(start_date, end_date, product_filter),
+        lambda: get_top_sellers(start_date, end_date, product_filter, limit=5),
+        lambda: get_stock_distribution(product_filter),
+    )
+
+    if daily_flow.empty:
         st.warning("No transaction data found for the selected filters.")
         return
 
     # --- KPI Section ---
     st.markdown("#### Key Performance Indicators (KPIs)")
     
-    sales_df = filtered_transactions[filtered_transactions['entry_type'] == 'Sales']
-    total_sales_quantity = sales_df['quantity_change'].sum()
-    
-    production_df = filtered_transactions[filtered_transactions['entry_type'] == 'Production']
-    
     avg_stock_quantity = filtered_stock['current_quantity'].mean()
     stock_turnover = (total_sales_quantity / avg_stock_quantity) if avg_stock_quantity else 0
-    best_seller = sales_df.groupby('product_name')['quantity_change'].sum().idxmax() if not sales_df.empty else "N/A"
+    best_seller = top_5_selling['product_name'].iloc[0] if not top_5_selling.empty else "N/A"
 
     col1, col2, col3 = st.columns(3)
     col1.metric("Total Sales (Units)", f"{total_sales_quantity:,.0f}")
@@ -87,7 +81,6 @@ def show_analytics():
 
     with tab1:
         st.subheader("Product Performance")
-        top_5_selling = sales_df.groupby('product_name')['quantity_change'].sum().nlargest(5).reset_index()
         fig_top_selling = px.bar(
             top_5_selling, x='product_name', y='quantity_change', 
             title="Top 5 Best-Selling Products", labels={'product_name': 'Product', 'quantity_change': 'Units Sold'}
@@ -103,8 +96,8 @@ def show_analytics():
 
     with tab2:
         st.subheader("Inventory Inflow vs. Outflow Over Time")
-        inflow = filtered_transactions[filtered_transactions['entry_type'].isin(['Production', 'Purchase'])].set_index('transaction_date').resample('D')['quantity_change'].sum()
-        outflow = filtered_transactions[filtered_transactions['entry_type'].isin(['Sales', 'Breakage'])].set_index('transaction_date').resample('D')['quantity_change'].sum()
+        inflow = daily_flow['inflow']
+        outflow = daily_flow['outflow']
 
         fig_flow = go.Figure()
         fig_flow.add_trace(go.Bar(x=inflow.index, y=inflow, name='Inflow', marker_color='green'))
@@ -115,7 +108,7 @@ def show_analytics():
     with tab3:
         st.subheader("Current Stock Distribution")
         fig_dist = px.pie(
-            filtered_stock,
+            stock_distribution,
             values='current_quantity',
             names='product_name',
             title="Stock Distribution by Product"
@@ -126,20 +119,12 @@ def show_analytics():
     st.write("---")
     st.markdown("### ⚠️ Low Stock Alerts")
 
-    # --- CHANGE 2: Use the 'key' to link the slider to session_state ---
-    st.slider(
-        "Low Stock Threshold", 
-        min_value=0, 
-        max_value=100, 
-        key='low_stock_threshold'
-    )
-    
-    # The filter now reads the value from st.session_state
-    low_stock_items = filtered_stock[filtered_stock['current_quantity'] <= st.session_state.low_stock_threshold]
-    
+    st.caption(f"SKUs at or below their alert threshold (default {get_low_stock_thresholds()[0]}). Thresholds are set in the Admin Panel.")
+
+    low_stock_items = get_low_stock_alerts(product_filter)
+
     if not low_stock_items.empty:
         st.warning(f"⚠️ {len(low_stock_items)} items are running low on stock!")
-        st.dataframe(low_stock_items[['product_name', 'color', 'current_quantity']], use_container_width=True)
+        st.dataframe(low_stock_items[['product_name', 'color', 'packing_option', 'product_grade', 'current_quantity', 'threshold']], use_container_width=True)
     else:
         st.success("✅ All items have sufficient stock levels!")
-
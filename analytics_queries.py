@@ -0,0 +1,58 @@
+# analytics_queries.py
+
+import bq_database
+from bq_database import read_cache, STOCK_TABLE, TRANSACTION_TABLE
+
+# Small, ready-to-plot frames for the Analytics page. Each series is aggregated
+# by the backend for the selected date range and products and cached until the
+# next write to the table it is derived from. With DAILY_ROLLUP_READS on, flows
+# and top sellers are summed from the daily rollup instead of raw transactions.
+
+def _range_filters(start_date, end_date, products):
+    filters = {'start_date': start_date, 'end_date': end_date}
+    if products:
+        filters['product_names'] = tuple(sorted(products))
+    return filters
+
+def _cached(name, table, filters, loader):
+    key = (name, tuple(sorted(filters.items())))
+    return read_cache.get_or_load(key, table, loader)
+
+def get_transaction_date_range():
+    """Returns the (earliest, latest) transaction timestamps in the log."""
+    backend = bq_database.get_backend()
+    return read_cache.get_or_load('get_transaction_date_range', TRANSACTION_TABLE, backend.get_transaction_date_range)
+
+def get_daily_flow(start_date, end_date, products=None):
+    """Daily inflow (Production + Purchase) and outflow (Sales + Breakage), indexed by day."""
+    backend = bq_database.get_backend()
+    filters = _range_filters(start_date, end_date, products)
+    rollup = bq_database.use_daily_rollup()
+    loader = backend.get_rollup_daily_flow if rollup else backend.get_daily_flow
+    df = _cached(('get_daily_flow', rollup), TRANSACTION_TABLE, filters, lambda: loader(filters))
+    return df.set_index('day')
+
+def get_top_sellers(start_date, end_date, products=None, limit=5):
+    """Top `limit` products by units sold, plus the total units sold across all products.
+
+    Returns (frame of product_name / quantity_change, total_sales).
+    """
+    backend = bq_database.get_backend()
+    filters = _range_filters(start_date, end_date, products)
+    rollup = bq_database.use_daily_rollup()
+    loader = backend.get_rollup_sales_by_product if rollup else backend.get_sales_by_product
+    df = _cached(
+        ('get_top_sellers', limit, rollup), TRANSACTION_TABLE, filters,
+        lambda: loader(filters, limit),
+    )
+    total_sales = int(df['total_sales'].iloc[0]) if not df.empty else 0
+    return df[['product_name', 'quantity_change']], total_sales
+
+def get_stock_distribution(products=None):
+    """Current stock summed per product."""
+    backend = bq_database.get_backend()
+    product_names = tuple(sorted(products)) if products else None
+    return read_cache.get_or_load(
+        ('get_stock_distribution', product_names), STOCK_TABLE,
+        lambda: backend.get_stock_distribution(product_names),
+    )
@@ -1,13 +1,22 @@
+import importlib
 import streamlit as st
 from utils import initialize_session_state
 from styles import custom_css
-from dashboard import show_dashboard
-from add_record import show_add_record
-from view_records import show_view_records
-from analytics import show_analytics
-from edit_record import show_edit_record
-from register import main as register_main
-from admin_panel import show_admin_panel
+
+# Page modules (and the plotting/data libraries they pull in) are imported the
+# first time their route is opened, so the login screen loads only what it uses.
+PAGES = {
+    "Dashboard": ("dashboard", "show_dashboard"),
+    "Add Transaction": ("add_record", "show_add_record"),
+    "Correction Transaction": ("edit_record", "show_edit_record"),
+    "View Transactions": ("view_records", "show_view_records"),
+    "Analytics": ("analytics", "show_analytics"),
+    "Admin Panel": ("admin_panel", "show_admin_panel"),
+}
+
+def render_page(page):
+    module_name, function_name = PAGES[page]
+    getattr(importlib.import_module(module_name), function_name)()
 
 # Initialize session state variables
 initialize_session_state()
@@ -19,10 +28,21 @@ custom_css()
 
 # Check if the user is logged in
 if 'user' not in st.session_state or st.session_state['user'] is None:
+    from register import main as register_main
     register_main()
     
 else:
     st.sidebar.markdown(f"## Welcome, {st.session_state['user']}! <small>({st.session_state.get('user_role')})</small>", unsafe_allow_html=True)
+
+    # Read from the in-process low-stock tracker, so this costs no query on most reruns.
+    # The badge is a convenience; a database error must not break navigation.
+    from bq_database import get_low_stock_count
+    try:
+        low_stock_count = get_low_stock_count()
+    except Exception:
+        low_stock_count = 0
+    if low_stock_count:
+        st.sidebar.warning(f"⚠️ {low_stock_count} SKU(s) low on stock")
     
     # Role-Based Navigation
     page_options = []
@@ -52,15 +72,4 @@ else:
         st.rerun()
 
     # Page routing
-    if page == "Dashboard":
-        show_dashboard()
-    elif page == "Add Transaction":
-        show_add_record()
-    elif page == "Correction Transaction":
-        show_edit_record()
-    elif page == "View Transactions":
-        show_view_records()
-    elif page == "Analytics":
-        show_analytics()
-    elif page == "Admin Panel":
-        show_admin_panel()
\ No newline at end of file
+    render_page(page)
\ No newline at end of file
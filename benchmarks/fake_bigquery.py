@@ -0,0 +1,451 @@
+# benchmarks/fake_bigquery.py
+
+import io
+import json
+import re
+import threading
+import time
+import uuid
+import pandas as pd
+from storage_backend import ROLLUP_COLUMNS, ROLLUP_KEY_COLUMNS
+
+class FakeRow(dict):
+    """Row that supports both row["col"] and row.col, like google.cloud.bigquery.Row."""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+class FakeRowIterator:
+    """Single-pass row iterator; like RowIterator it supports both next() and for-loops."""
+
+    def __init__(self, frame, page_size=None):
+        self._frame = frame
+        self._rows = iter([FakeRow(r) for r in frame.to_dict('records')])
+        self.total_rows = len(frame)
+        self.page_size = page_size
+
+    def to_dataframe_iterable(self, **kwargs):
+        step = self.page_size or max(len(self._frame), 1)
+        for start in range(0, len(self._frame), step):
+            yield self._frame.iloc[start:start + step].reset_index(drop=True)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._rows)
+
+class FakeQueryJob:
+    def __init__(self, frame, bytes_processed=0, dml_affected_rows=None):
+        self._frame = frame
+        self.job_id = f"fake-{uuid.uuid4().hex[:12]}"
+        self.total_bytes_processed = bytes_processed
+        # BigQuery bills at least 10 MB per query
+        self.total_bytes_billed = max(bytes_processed, 10 * 1024 * 1024) if bytes_processed else 0
+        self.slot_millis = 0
+        self.cache_hit = False
+        self.num_dml_affected_rows = dml_affected_rows
+        self.errors = None
+
+    def result(self, page_size=None, **kwargs):
+        return FakeRowIterator(self._frame, page_size)
+
+    def to_dataframe(self, **kwargs):
+        return self._frame.copy()
+
+class FakeLoadJob:
+    def __init__(self, output_rows):
+        self.job_id = f"fake-load-{uuid.uuid4().hex[:12]}"
+        self.output_rows = output_rows
+        self.errors = None
+
+    def result(self):
+        return self
+
+class FakeBigQueryClient:
+    """In-process stand-in for the parts of bigquery.Client that BigQueryBackend uses.
+
+    Tables are pandas frames. `query()` recognizes the statement shapes issued by
+    BigQueryBackend (reads, filtered pages, aggregates, point-in-time stock
+    deltas and SKU histories, single and bulk MERGE scripts, staged bulk updates,
+    stock repairs, daily rollup maintenance, stale-day marks and reads, and
+    low-stock thresholds) and evaluates them with pandas, so the backend's real
+    code path runs end to end without a project. `latency_ms` adds a fixed
+    per-job delay to model the BigQuery round trip. Bytes processed are estimated
+    from the scanned columns. The users table is not emulated.
+    """
+
+    def __init__(self, stock_table_id, transaction_table_id, stock=None, transactions=None, latency_ms=0.0,
+                 rollup_table_id=None, threshold_table_id=None):
+        self.stock_table_id = stock_table_id
+        self.transaction_table_id = transaction_table_id
+        self.rollup_table_id = rollup_table_id
+        self.threshold_table_id = threshold_table_id
+        self.thresholds = pd.DataFrame(columns=['product_name', 'color', 'packing_option', 'product_grade', 'threshold'])
+        self.rollup = pd.DataFrame(columns=ROLLUP_COLUMNS)
+        self.rollup_stale = set()
+        self.latency = latency_ms / 1000
+        self.stock = (stock if stock is not None else pd.DataFrame(
+            columns=['product_name', 'color', 'packing_option', 'product_grade', 'current_quantity'])).reset_index(drop=True)
+        self._transactions = transactions if transactions is not None else pd.DataFrame(
+            columns=['transaction_id', 'transaction_date', 'product_name', 'color', 'packing_option',
+                     'product_grade', 'entry_type', 'quantity_change', 'user_name', 'invoice_number', 'remarks'])
+        self._pending_rows = []
+        self._staging = {}
+        self._lock = threading.RLock()
+        self.jobs = 0
+
+    # --- Table state ---
+    @property
+    def transactions(self):
+        with self._lock:
+            if self._pending_rows:
+                pending = pd.DataFrame(self._pending_rows)
+                pending['transaction_date'] = pd.to_datetime(pending['transaction_date'], utc=True)
+                self._transactions = pd.concat([self._transactions, pending], ignore_index=True)
+                self._pending_rows = []
+            return self._transactions
+
+    def insert_rows_json(self, table, json_rows, **kwargs):
+        self._round_trip()
+        if table != self.transaction_table_id:
+            raise NotImplementedError(f"FakeBigQueryClient only streams into {self.transaction_table_id}")
+        with self._lock:
+            self._pending_rows.extend(dict(r) for r in json_rows)
+        return []
+
+    def load_table_from_file(self, file_obj, table, job_config=None, **kwargs):
+        self._round_trip()
+        payload = file_obj.read()
+        if payload[:4] == b'PAR1':
+            rows = pd.read_parquet(io.BytesIO(payload)).to_dict('records')
+        else:
+            rows = [json.loads(line) for line in payload.decode().splitlines() if line.strip()]
+        with self._lock:
+            if table in self._staging:
+                self._staging[table].extend(rows)
+            else:
+                self._pending_rows.extend(rows)
+        return FakeLoadJob(len(rows))
+
+    # Scratch tables (bulk update staging) hold plain row lists.
+    def create_table(self, table, **kwargs):
+        self._round_trip()
+        with self._lock:
+            self._staging[f"{table.project}.{table.dataset_id}.{table.table_id}"] = []
+        return table
+
+    def delete_table(self, table, not_found_ok=False, **kwargs):
+        self._round_trip()
+        with self._lock:
+            if self._staging.pop(str(table), None) is None and not not_found_ok:
+                raise KeyError(table)
+
+    # --- Queries ---
+    def query(self, query, job_config=None, **kwargs):
+        self._round_trip()
+        sql = " ".join(query.split())
+        params = self._params(job_config)
+        with self._lock:
+            return self._dispatch(sql, params)
+
+    def _round_trip(self):
+        self.jobs += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    @staticmethod
+    def _params(job_config):
+        params = {}
+        for p in getattr(job_config, 'query_parameters', None) or []:
+            if hasattr(p, 'array_type'):
+                params[p.name] = [getattr(v, 'struct_values', v) for v in p.values]
+            else:
+                params[p.name] = p.value
+        return params
+
+    def _dispatch(self, sql, params):
+        tx_table = f"`{self.transaction_table_id}`"
+        stock_table = f"`{self.stock_table_id}`"
+        if self.rollup_table_id and f"`{self.rollup_table_id}_stale`" in sql and not sql.startswith("DECLARE written"):
+            return self._dispatch_rollup_stale(sql, params)
+        if self.rollup_table_id and f"`{self.rollup_table_id}`" in sql:
+            return self._dispatch_rollup(sql, params)
+        if self.threshold_table_id and f"`{self.threshold_table_id}`" in sql:
+            return self._dispatch_thresholds(sql, params)
+        if sql.startswith("DECLARE repaired"):
+            return self._repair_stock(params)
+        if sql.startswith("DECLARE shortfall"):
+            staged = re.search(r"FROM `([^`]+)` S", sql)
+            return self._bulk_merge(self._staging[staged.group(1)] if staged else params['updates'])
+        if sql.startswith("MERGE"):
+            return self._single_merge(params)
+        if tx_table in sql:
+            tx = self.transactions
+            if "UNION ALL" in sql:
+                return self._dashboard_totals(tx)
+            if "ARRAY_AGG(DISTINCT" in sql:
+                row = {c: sorted(tx[c].dropna().unique().tolist()) for c in ('product_name', 'color', 'entry_type')}
+                return self._job(pd.DataFrame([row]), tx, ['product_name', 'color', 'entry_type'])
+            if "MIN(transaction_date)" in sql:
+                row = {'first_date': tx['transaction_date'].min() if len(tx) else None,
+                       'last_date': tx['transaction_date'].max() if len(tx) else None}
+                return self._job(pd.DataFrame([row]), tx, ['transaction_date'])
+            if "AS expected_quantity" in sql:
+                return self._stock_deltas(tx, params)
+            if "= @packing_option" in sql:
+                return self._sku_history(tx, params)
+            filtered = self._filter_transactions(tx, params)
+            if "AS inflow" in sql:
+                return self._daily_flow(filtered, params, tx)
+            if "OVER ()" in sql:
+                sales = filtered.groupby('product_name', as_index=False)['quantity_change'].sum()
+                sales = sales.sort_values('quantity_change', ascending=False)
+                sales['total_sales'] = sales['quantity_change'].sum()
+                limit = int(re.search(r"LIMIT (\d+)", sql).group(1))
+                return self._job(sales.head(limit).reset_index(drop=True), tx, ['product_name', 'entry_type', 'quantity_change', 'transaction_date'])
+            if "COUNT(1) AS cnt" in sql:
+                return self._job(pd.DataFrame([{'cnt': len(filtered)}]), tx, self._filter_columns(params))
+            if "ORDER BY transaction_date DESC" in sql:
+                limit = re.search(r"LIMIT (\d+)", sql)
+                page = filtered.sort_values(['transaction_date', 'transaction_id'], ascending=False)
+                page = page.head(int(limit.group(1))) if limit else page
+                return self._job(page.reset_index(drop=True), tx, list(tx.columns))
+            return self._job(self._project(sql, filtered), tx, self._selected_columns(sql, tx))
+        if stock_table in sql:
+            stock = self.stock
+            if "GROUP BY product_name" in sql:
+                if params.get('product_names'):
+                    stock = stock[stock['product_name'].isin(params['product_names'])]
+                return self._job(stock.groupby('product_name', as_index=False)['current_quantity'].sum(), self.stock, ['product_name', 'current_quantity'])
+            return self._job(self._project(sql, stock), stock, self._selected_columns(sql, stock))
+        raise NotImplementedError(f"FakeBigQueryClient does not emulate: {sql[:120]}")
+
+    def _job(self, frame, scanned=None, columns=None, dml_affected_rows=None):
+        bytes_processed = 0
+        if scanned is not None and len(scanned):
+            columns = [c for c in (columns or scanned.columns) if c in scanned.columns]
+            bytes_processed = int(scanned[columns].memory_usage(index=False).sum())
+        return FakeQueryJob(frame, bytes_processed, dml_affected_rows)
+
+    # --- Reads ---
+    @staticmethod
+    def _selected_columns(sql, frame):
+        select = re.match(r"SELECT (.+?) FROM", sql).group(1)
+        return list(frame.columns) if select.strip() == "*" else [c.strip() for c in select.split(",")]
+
+    def _project(self, sql, frame):
+        return frame[self._selected_columns(sql, frame)].reset_index(drop=True)
+
+    @staticmethod
+    def _filter_columns(params):
+        mapping = {'start_ts': 'transaction_date', 'end_ts': 'transaction_date', 'since': 'transaction_date',
+                   'product_names': 'product_name', 'after_ts': 'transaction_date', 'after_id': 'transaction_id'}
+        return sorted({mapping.get(name, name) for name in params})
+
+    @staticmethod
+    def _filter_transactions(tx, params):
+        mask = pd.Series(True, index=tx.index)
+        for column in ('product_name', 'color', 'entry_type'):
+            if column in params:
+                mask &= tx[column] == params[column]
+        if 'product_names' in params:
+            mask &= tx['product_name'].isin(params['product_names'])
+        if 'invoice_number' in params:
+            mask &= tx['invoice_number'].fillna('').str.contains(params['invoice_number'], case=False, regex=False)
+        if 'since' in params:
+            mask &= tx['transaction_date'] >= pd.Timestamp(params['since'])
+        if 'start_ts' in params:
+            mask &= tx['transaction_date'] >= pd.Timestamp(params['start_ts'])
+        if 'end_ts' in params:
+            mask &= tx['transaction_date'] < pd.Timestamp(params['end_ts'])
+        if 'after_ts' in params:
+            after_ts = pd.Timestamp(params['after_ts'])
+            mask &= (tx['transaction_date'] < after_ts) | ((tx['transaction_date'] == after_ts) & (tx['transaction_id'] < params['after_id']))
+        return tx[mask]
+
+    def _daily_flow(self, filtered, params, tx):
+        day = filtered['transaction_date'].dt.date
+        inflow = filtered['quantity_change'].where(filtered['entry_type'].isin(params['inflow_types']), 0)
+        outflow = filtered['quantity_change'].where(filtered['entry_type'].isin(params['outflow_types']), 0)
+        flow = pd.DataFrame({'day': day, 'inflow': inflow, 'outflow': outflow}).groupby('day', as_index=False).sum()
+        return self._job(flow, tx, ['transaction_date', 'entry_type', 'quantity_change', *self._filter_columns(params)])
+
+    # --- Point-in-time stock ---
+    def _stock_deltas(self, tx, params):
+        in_range = self._filter_transactions(tx, params)
+        sign = in_range['entry_type'].map(
+            {**{t: 1 for t in params['increase_types']}, **{t: -1 for t in params['decrease_types']}}).fillna(0)
+        deltas = in_range[ROLLUP_KEY_COLUMNS[:4]].fillna('').assign(
+            expected_quantity=(pd.to_numeric(in_range['quantity_change']).fillna(0) * sign).astype('int64'))
+        deltas = deltas.groupby(ROLLUP_KEY_COLUMNS[:4], sort=False, as_index=False)['expected_quantity'].sum()
+        return self._job(deltas, tx, ['transaction_date', 'entry_type', 'quantity_change', *ROLLUP_KEY_COLUMNS[:4]])
+
+    def _sku_history(self, tx, params):
+        keys = ROLLUP_KEY_COLUMNS[:4]
+        mask = (tx[keys].fillna('') == pd.Series({k: params[k] for k in keys})).all(axis=1)
+        history = tx[mask].sort_values(['transaction_date', 'transaction_id'])
+        return self._job(history[['transaction_date', 'entry_type', 'quantity_change']].reset_index(drop=True),
+                         tx, ['transaction_date', 'entry_type', 'quantity_change', *keys])
+
+    def _dashboard_totals(self, tx):
+        totals = tx.dropna(subset=['entry_type']).groupby('entry_type', as_index=False)['quantity_change'].sum()
+        totals = totals.rename(columns={'quantity_change': 'total'})
+        stock_row = pd.DataFrame([{'entry_type': None, 'total': int(self.stock['current_quantity'].sum())}])
+        return self._job(pd.concat([totals, stock_row], ignore_index=True), tx, ['entry_type', 'quantity_change'])
+
+    # --- Low-stock thresholds ---
+    def _dispatch_thresholds(self, sql, params):
+        keys = ['product_name', 'color', 'packing_option', 'product_grade']
+        if sql.startswith("SELECT"):
+            return self._job(self.thresholds.reset_index(drop=True), self.thresholds)
+        if sql.startswith("MERGE") or sql.startswith("DELETE"):
+            row = (self.thresholds[keys] == pd.Series({k: params[k] for k in keys})).all(axis=1)
+            self.thresholds = self.thresholds[~row]
+            if sql.startswith("MERGE"):
+                self.thresholds = pd.concat([self.thresholds, pd.DataFrame([{k: params[k] for k in [*keys, 'threshold']}])],
+                                            ignore_index=True)
+            return self._job(pd.DataFrame(), dml_affected_rows=1)
+        raise NotImplementedError(f"FakeBigQueryClient does not emulate: {sql[:120]}")
+
+    # --- Daily rollup ---
+    def _dispatch_rollup(self, sql, params):
+        if sql.startswith("MERGE"):
+            deltas = pd.DataFrame(params['deltas'], columns=ROLLUP_COLUMNS)
+            self.rollup = pd.concat([self.rollup, deltas], ignore_index=True).groupby(
+                ROLLUP_KEY_COLUMNS, sort=False, as_index=False)[['quantity', 'transactions']].sum()
+            return self._job(pd.DataFrame(), self.rollup, dml_affected_rows=len(deltas))
+        if sql.startswith("DECLARE written"):
+            return self._rebuild_rollup(params)
+        rollup = self._filter_rollup(self.rollup, params)
+        if "UNION ALL" in sql:
+            totals = self.rollup[self.rollup['entry_type'] != ''].groupby('entry_type', as_index=False)['quantity'].sum()
+            stock_row = pd.DataFrame([{'entry_type': None, 'total': int(self.stock['current_quantity'].sum())}])
+            return self._job(pd.concat([totals.rename(columns={'quantity': 'total'}), stock_row], ignore_index=True),
+                             self.rollup, ['entry_type', 'quantity'])
+        if "AS inflow" in sql:
+            inflow = rollup['quantity'].where(rollup['entry_type'].isin(params['inflow_types']), 0)
+            outflow = rollup['quantity'].where(rollup['entry_type'].isin(params['outflow_types']), 0)
+            flow = pd.DataFrame({'day': rollup['day'], 'inflow': inflow, 'outflow': outflow}).groupby('day', as_index=False).sum()
+            return self._job(flow, self.rollup, ['day', 'entry_type', 'quantity', 'product_name'])
+        if "OVER ()" in sql:
+            sales = rollup.groupby('product_name', as_index=False)['quantity'].sum().rename(columns={'quantity': 'quantity_change'})
+            sales = sales.sort_values('quantity_change', ascending=False)
+            sales['total_sales'] = sales['quantity_change'].sum()
+            limit = int(re.search(r"LIMIT (\d+)", sql).group(1))
+            return self._job(sales.head(limit).reset_index(drop=True), self.rollup, ['day', 'entry_type', 'quantity', 'product_name'])
+        raise NotImplementedError(f"FakeBigQueryClient does not emulate: {sql[:120]}")
+
+    def _dispatch_rollup_stale(self, sql, params):
+        if sql.startswith("MERGE"):
+            added = set(params['days']) - self.rollup_stale
+            self.rollup_stale |= added
+            return self._job(pd.DataFrame(), dml_affected_rows=len(added))
+        if sql.startswith("SELECT day"):
+            return self._job(pd.DataFrame({'day': sorted(self.rollup_stale)}, columns=['day']))
+        raise NotImplementedError(f"FakeBigQueryClient does not emulate: {sql[:120]}")
+
+    @staticmethod
+    def _filter_rollup(rollup, params):
+        mask = pd.Series(True, index=rollup.index)
+        for column in ('product_name', 'color', 'entry_type'):
+            if column in params:
+                mask &= rollup[column] == params[column]
+        if 'product_names' in params:
+            mask &= rollup['product_name'].isin(params['product_names'])
+        if 'start_day' in params:
+            mask &= rollup['day'] >= params['start_day']
+        if 'end_day' in params:
+            mask &= rollup['day'] <= params['end_day']
+        return rollup[mask]
+
+    def _rebuild_rollup(self, params):
+        tx = self.transactions
+        day = tx['transaction_date'].dt.date
+        in_range = pd.Series(True, index=tx.index)
+        if 'start_day' in params:
+            in_range &= day >= params['start_day']
+        if 'end_day' in params:
+            in_range &= day <= params['end_day']
+        rebuilt = tx[in_range].assign(day=day[in_range]).fillna({col: '' for col in ROLLUP_KEY_COLUMNS if col != 'day'})
+        rebuilt = rebuilt.groupby(ROLLUP_KEY_COLUMNS, sort=False, as_index=False).agg(
+            quantity=('quantity_change', 'sum'), transactions=('quantity_change', 'size'))
+        if 'start_day' in params or 'end_day' in params:
+            keep = ~self.rollup.index.isin(self._filter_rollup(self.rollup, params).index)
+        else:
+            keep = pd.Series(False, index=self.rollup.index)
+        self.rollup = pd.concat([self.rollup[keep], rebuilt], ignore_index=True)
+        self.rollup_stale = {
+            d for d in self.rollup_stale
+            if d < params.get('start_day', d) or d > params.get('end_day', d)
+        }
+        return self._job(pd.DataFrame([{'written': len(rebuilt)}]), tx, ['transaction_date', 'quantity_change', *ROLLUP_KEY_COLUMNS])
+
+    # --- Writes ---
+    def _key_mask(self, u):
+        s = self.stock
+        return (s['product_name'] == u['product_name']) & (s['color'] == u['color']) & \
+            (s['packing_option'] == u['packing_option']) & (s['product_grade'] == u['product_grade'])
+
+    def _single_merge(self, params):
+        mask = self._key_mask(params)
+        adjustment = params['adjustment']
+        if mask.any():
+            if not (self.stock.loc[mask, 'current_quantity'] + adjustment >= 0).all():
+                return self._job(pd.DataFrame(), self.stock, dml_affected_rows=0)
+            self.stock.loc[mask, 'current_quantity'] += adjustment
+            return self._job(pd.DataFrame(), self.stock, dml_affected_rows=int(mask.sum()))
+        if adjustment > 0:
+            self._append_stock([{**{k: params[k] for k in ('product_name', 'color', 'packing_option', 'product_grade')},
+                                 'current_quantity': adjustment}])
+            return self._job(pd.DataFrame(), self.stock, dml_affected_rows=1)
+        return self._job(pd.DataFrame(), self.stock, dml_affected_rows=0)
+
+    def _merged_with_stock(self, updates):
+        keys = ['product_name', 'color', 'packing_option', 'product_grade']
+        frame = pd.DataFrame(updates, columns=[*keys, 'adjustment'])
+        return frame.merge(self.stock, on=keys, how='left'), keys
+
+    def _shortfalls(self, updates):
+        merged, _ = self._merged_with_stock(updates)
+        short = merged[(merged['adjustment'] < 0) & (merged['current_quantity'].fillna(0) + merged['adjustment'] < 0)]
+        return short['product_name'] + " (" + short['color'] + ")"
+
+    def _bulk_merge(self, updates):
+        labels = self._shortfalls(updates)
+        if len(labels):
+            return self._job(pd.DataFrame([{'shortfall': ", ".join(labels)}]), self.stock)
+        merged, keys = self._merged_with_stock(updates)
+        matched = merged['current_quantity'].notna()
+        if matched.any():
+            stock = self.stock.set_index(keys)
+            deltas = merged[matched].set_index(keys)['adjustment']
+            stock.loc[deltas.index, 'current_quantity'] += deltas
+            self.stock = stock.reset_index()
+        new_rows = merged[~matched & (merged['adjustment'] > 0)]
+        if len(new_rows):
+            self._append_stock(new_rows[keys].assign(current_quantity=new_rows['adjustment']).to_dict('records'))
+        return self._job(pd.DataFrame([{'shortfall': None}]), self.stock, dml_affected_rows=len(updates))
+
+    def _repair_stock(self, params):
+        keys = ['product_name', 'color', 'packing_option', 'product_grade']
+        repairs = pd.DataFrame(params['repairs'], columns=[*keys, 'difference'])
+        balances = self._stock_deltas(self.transactions, params)._frame.rename(columns={'expected_quantity': 'balance'})
+        merged = repairs.merge(balances, on=keys, how='left').merge(self.stock, on=keys, how='left')
+        merged['balance'] = merged['balance'].fillna(0).astype('int64')
+        repaired = merged[(merged['current_quantity'].fillna(0) - merged['balance'] == merged['difference']) & (merged['balance'] >= 0)]
+        stock = self.stock.set_index(keys)
+        matched = repaired[repaired['current_quantity'].notna()].set_index(keys)['balance']
+        stock.loc[matched.index, 'current_quantity'] = matched
+        self.stock = stock.reset_index()
+        new_rows = repaired[repaired['current_quantity'].isna()]
+        if len(new_rows):
+            self._append_stock(new_rows[keys].assign(current_quantity=new_rows['balance']).to_dict('records'))
+        return self._job(repaired[keys].reset_index(drop=True), self.transactions,
+                         ['entry_type', 'quantity_change', *keys], dml_affected_rows=len(repaired))
+
+    def _append_stock(self, rows):
+        self.stock = pd.concat([self.stock, pd.DataFrame(rows)], ignore_index=True)
@@ -0,0 +1,216 @@
+# benchmarks/load_test.py
+#
+# Simulates N counter clerks working at the same time against a local backend:
+#
+#   python -m benchmarks.load_test --clerks 20 --duration 30
+#   python -m benchmarks.load_test --clerks 50 --backend fake-bigquery --latency-ms 150 --skew 1.4
+#
+# Every clerk is a thread running a weighted mix of single entries, bulk entries,
+# dashboard loads and transaction-log pages. Writes go through transaction_entry,
+# the same code the Add Record forms call, so the stock checks, write coordinator
+# and stock index are all under test. SKU choice follows a Zipf distribution, so
+# a handful of hot products take most of the traffic. At the end the run reports
+# throughput, latency percentiles and error rates per operation, then checks stock
+# consistency three ways: no SKU below zero, product_stock equal to the replayed
+# log, and product_stock equal to the opening stock plus every write the clerks
+# were told succeeded.
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+import bq_database
+from reconciliation import KEY_COLUMNS, signed_totals, find_mismatches
+from transaction_entry import build_transaction, stock_update_for, submit_transaction, submit_transactions
+from benchmarks.synthetic_data import make_transactions, derive_stock, zipf_weights
+from benchmarks.run_benchmarks import build_backend, dashboard_path, view_records_path
+
+# Share of operations each clerk performs
+DEFAULT_MIX = {'sale': 0.45, 'restock': 0.15, 'bulk_entry': 0.05, 'dashboard': 0.15, 'view_records': 0.20}
+REJECTION_MARKER = 'insufficient stock'
+
+class LoadTestRun:
+    """Shared state of one run: the SKU sampler, per-operation samples and the accepted-write ledger."""
+
+    def __init__(self, skus, skew, max_quantity, bulk_rows, think_ms, seed):
+        self.skus = skus
+        self.weights = zipf_weights(len(skus), skew)
+        self.max_quantity = max_quantity
+        self.bulk_rows = bulk_rows
+        self.think = think_ms / 1000
+        self.seed = seed
+        self.samples = []
+        self.accepted = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, operation, started, error, applied=()):
+        latency_ms = (time.perf_counter() - started) * 1000
+        if not error:
+            outcome = 'ok'
+        elif REJECTION_MARKER in str(error).lower():
+            outcome = 'rejected'
+        else:
+            outcome = 'error'
+        with self._lock:
+            self.samples.append((operation, latency_ms, outcome, None if outcome == 'ok' else str(error)))
+            if outcome == 'ok':
+                for update in applied:
+                    self.accepted[tuple(update[col] for col in KEY_COLUMNS)] += update['adjustment']
+
+    # --- Clerk operations ---
+    def single_entry(self, rng, clerk, entry_type):
+        sku = self.skus[rng.choice(len(self.skus), p=self.weights)]
+        record, adjustment = build_transaction(*sku, entry_type, int(rng.integers(1, self.max_quantity + 1)), clerk)
+        started = time.perf_counter()
+        try:
+            error = submit_transaction(record, adjustment)
+        except Exception as e:
+            error = f"An Error Occurred: {e}"
+        self.record(entry_type, started, error, [stock_update_for(record, adjustment)])
+
+    def bulk_entry(self, rng, clerk):
+        entry_type = 'Sales' if rng.random() < 0.5 else 'Production'
+        records, stock_updates = [], []
+        for index in rng.choice(len(self.skus), size=self.bulk_rows, p=self.weights):
+            record, adjustment = build_transaction(*self.skus[index], entry_type, int(rng.integers(1, self.max_quantity + 1)), clerk)
+            records.append(record)
+            stock_updates.append(stock_update_for(record, adjustment))
+        started = time.perf_counter()
+        try:
+            error = submit_transactions(records, stock_updates)
+        except Exception as e:
+            error = f"An Error Occurred: {e}"
+        self.record('bulk_entry', started, error, stock_updates)
+
+    def page_load(self, operation, load):
+        started = time.perf_counter()
+        try:
+            load()
+            error = None
+        except Exception as e:
+            error = f"An Error Occurred: {e}"
+        self.record(operation, started, error)
+
+    def clerk(self, number, mix, deadline, barrier):
+        rng = np.random.default_rng(self.seed + number)
+        name = f"loadtest-clerk{number:03d}"
+        operations, weights = list(mix), np.array(list(mix.values())) / sum(mix.values())
+        barrier.wait()
+        while time.perf_counter() < deadline:
+            operation = operations[rng.choice(len(operations), p=weights)]
+            if operation == 'sale':
+                self.single_entry(rng, name, 'Sales')
+            elif operation == 'restock':
+                self.single_entry(rng, name, 'Production')
+            elif operation == 'bulk_entry':
+                self.bulk_entry(rng, name)
+            elif operation == 'dashboard':
+                self.page_load('dashboard', dashboard_path)
+            else:
+                self.page_load('view_records', view_records_path)
+            if self.think:
+                time.sleep(random.uniform(0, 2 * self.think))
+
+# --- Reporting ---
+def summarize(samples, elapsed):
+    df = pd.DataFrame(samples, columns=['operation', 'latency_ms', 'outcome', 'error'])
+    rows = []
+    for operation, group in df.groupby('operation'):
+        latency = group['latency_ms']
+        rows.append({
+            'operation': operation, 'count': len(group), 'per_sec': round(len(group) / elapsed, 1),
+            'ok': int((group['outcome'] == 'ok').sum()), 'rejected': int((group['outcome'] == 'rejected').sum()),
+            'errors': int((group['outcome'] == 'error').sum()),
+            'error_rate_%': round(100 * (group['outcome'] == 'error').mean(), 2),
+            'p50_ms': round(latency.quantile(0.50), 1), 'p95_ms': round(latency.quantile(0.95), 1),
+            'p99_ms': round(latency.quantile(0.99), 1), 'max_ms': round(latency.max(), 1),
+        })
+    return pd.DataFrame(rows), df
+
+def check_consistency(opening_stock, accepted):
+    """Returns (negative stock rows, log vs stock mismatches, ledger vs stock mismatches)."""
+    backend = bq_database.get_backend()
+    stock = backend.get_all_product_stock()
+    negative = stock[pd.to_numeric(stock['current_quantity']) < 0]
+
+    expected_from_log, _ = signed_totals(backend.get_inventory_records())
+    log_mismatches = find_mismatches(expected_from_log, stock)
+
+    ledger = opening_stock.rename(columns={'current_quantity': 'expected_quantity'})[KEY_COLUMNS + ['expected_quantity']]
+    if accepted:
+        deltas = pd.DataFrame([(*key, adjustment) for key, adjustment in accepted.items()], columns=KEY_COLUMNS + ['expected_quantity'])
+        ledger = pd.concat([ledger, deltas], ignore_index=True).groupby(KEY_COLUMNS, as_index=False)['expected_quantity'].sum()
+    ledger_mismatches = find_mismatches(ledger, stock)
+    return negative, log_mismatches, ledger_mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-clerk load test against a local backend.")
+    parser.add_argument('--clerks', type=int, default=20, help="Simultaneous simulated users.")
+    parser.add_argument('--duration', type=float, default=20.0, help="Seconds to run.")
+    parser.add_argument('--backend', choices=['sqlite', 'fake-bigquery'], default='sqlite')
+    parser.add_argument('--sqlite-path', help="SQLite file to use (default: a temporary file).")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Simulated round trip per BigQuery job (fake-bigquery only).")
+    parser.add_argument('--history', type=int, default=20_000, help="Synthetic transactions loaded before the run.")
+    parser.add_argument('--products', type=int, default=50, help="Distinct products in the catalog (x30 SKUs).")
+    parser.add_argument('--skew', type=float, default=1.2, help="Zipf exponent of SKU popularity; higher means hotter hot SKUs.")
+    parser.add_argument('--max-quantity', type=int, default=25, help="Largest quantity on a single entry line.")
+    parser.add_argument('--bulk-rows', type=int, default=8, help="Lines per bulk entry.")
+    parser.add_argument('--think-ms', type=float, default=0.0, help="Mean pause between a clerk's operations.")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    history = make_transactions(args.history, products=args.products, skew=args.skew, seed=args.seed)
+    opening_stock = derive_stock(history)
+    with tempfile.TemporaryDirectory() as scratch:
+        sqlite_path = args.sqlite_path or os.path.join(scratch, 'loadtest.db')
+        bq_database.set_backend(build_backend(args.backend, history, opening_stock, args.latency_ms, sqlite_path))
+
+        skus = [tuple(row) for row in opening_stock[KEY_COLUMNS].itertuples(index=False)]
+        run = LoadTestRun(skus, args.skew, args.max_quantity, args.bulk_rows, args.think_ms, args.seed)
+        barrier = threading.Barrier(args.clerks + 1)
+        deadline = time.perf_counter() + args.duration
+        threads = [
+            threading.Thread(target=run.clerk, args=(n, DEFAULT_MIX, deadline, barrier), daemon=True)
+            for n in range(args.clerks)
+        ]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        table, samples = summarize(run.samples, elapsed)
+        negative, log_mismatches, ledger_mismatches = check_consistency(opening_stock, run.accepted)
+
+    print(f"\n{args.clerks} clerks for {elapsed:.1f}s on {args.backend} "
+          f"({len(history):,} seeded transactions, {len(skus)} SKUs, skew {args.skew})")
+    print(f"Throughput: {len(samples) / elapsed:.1f} ops/s "
+          f"({(samples['operation'].isin(['Sales', 'Production', 'bulk_entry'])).sum() / elapsed:.1f} writes/s)\n")
+    print(table.to_string(index=False))
+
+    errors = samples[samples['outcome'] == 'error']
+    if not errors.empty:
+        print("\nMost common errors:")
+        print(errors['error'].str.slice(0, 120).value_counts().head(5).to_string())
+
+    writes = bq_database.get_write_stats()
+    print(f"\nWrite coordinator: {writes}")
+    print("\nStock consistency:")
+    print(f"  SKUs below zero (oversells):        {len(negative)}")
+    print(f"  SKUs where stock != replayed log:   {len(log_mismatches)}")
+    print(f"  SKUs where stock != accepted writes: {len(ledger_mismatches)}")
+    for label, frame in (('Oversold', negative), ('Log drift', log_mismatches), ('Lost or phantom writes', ledger_mismatches)):
+        if not frame.empty:
+            print(f"\n{label}:")
+            print(frame.head(20).to_string(index=False))
+
+if __name__ == '__main__':
+    main()
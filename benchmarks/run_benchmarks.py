@@ -0,0 +1,185 @@
+# benchmarks/run_benchmarks.py
+#
+# Times each page's data path and the write functions against synthetic data,
+# without a BigQuery project:
+#
+#   python -m benchmarks.run_benchmarks --sizes 10000 100000 1000000 --backend fake-bigquery
+#   python -m benchmarks.run_benchmarks --backend sqlite --repeat 5 --latency-ms 80
+#
+# fake-bigquery runs the real BigQueryBackend code against an in-process client
+# (benchmarks/fake_bigquery.py), so timings cover query building, parameter
+# binding and frame conversion but not network or slot time; --latency-ms adds a
+# fixed per-job delay to approximate the round trip. The read cache is cleared
+# before every timed call so each number is a cold read.
+
+import argparse
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+import pandas as pd
+import bq_database
+import analytics_queries
+from bq_database import read_cache
+from benchmarks.synthetic_data import make_transactions, derive_stock
+
+DATASET = 'benchmark'
+
+def build_backend(kind, transactions, stock, latency_ms, sqlite_path=':memory:'):
+    if kind == 'fake-bigquery':
+        from bigquery_backend import BigQueryBackend
+        from benchmarks.fake_bigquery import FakeBigQueryClient
+        project = 'offline'
+        client = FakeBigQueryClient(
+            f"{project}.{DATASET}.{bq_database.STOCK_TABLE}", f"{project}.{DATASET}.{bq_database.TRANSACTION_TABLE}",
+            stock=stock.copy(), transactions=transactions.copy(), latency_ms=latency_ms,
+            rollup_table_id=f"{project}.{DATASET}.{bq_database.DAILY_ROLLUP_TABLE}",
+            threshold_table_id=f"{project}.{DATASET}.{bq_database.LOW_STOCK_THRESHOLD_TABLE}",
+        )
+        return BigQueryBackend(
+            project, DATASET, bq_database.STOCK_TABLE, bq_database.TRANSACTION_TABLE, bq_database.USER_TABLE,
+            load_job_threshold=bq_database.LOAD_JOB_THRESHOLD, client=client, rollup_table=bq_database.DAILY_ROLLUP_TABLE,
+            threshold_table=bq_database.LOW_STOCK_THRESHOLD_TABLE,
+        )
+    if kind == 'sqlite':
+        from sqlite_backend import SQLiteBackend
+        backend = SQLiteBackend(sqlite_path)
+        rows = transactions.assign(transaction_date=transactions['transaction_date'].dt.strftime('%Y-%m-%d %H:%M:%S'))
+        backend.bulk_insert_transaction_records(rows.to_dict('records'))
+        backend.bulk_update_product_stock(stock.rename(columns={'current_quantity': 'adjustment'}).to_dict('records'))
+        return backend
+    raise ValueError(f"Unknown backend '{kind}'. Expected 'fake-bigquery' or 'sqlite'.")
+
+# --- Page data paths ---
+# Each mirrors the calls the page makes on a fresh load, through the same facade functions.
+
+def dashboard_path():
+    bq_database.fetch_concurrently(
+        lambda: bq_database.get_all_product_stock(['product_name', 'color', 'packing_option', 'product_grade', 'current_quantity']),
+        bq_database.get_dashboard_kpis,
+    )
+
+def analytics_path():
+    (first, last), _, options = bq_database.fetch_concurrently(
+        analytics_queries.get_transaction_date_range,
+        lambda: bq_database.get_all_product_stock(['product_name', 'color', 'packing_option', 'product_grade', 'current_quantity']),
+        bq_database.get_transaction_filter_options,
+    )
+    end_date = pd.Timestamp(last).date()
+    start_date = end_date - timedelta(days=30)
+    bq_database.fetch_concurrently(
+        lambda: analytics_queries.get_daily_flow(start_date, end_date),
+        lambda: analytics_queries.get_top_sellers(start_date, end_date, limit=5),
+        analytics_queries.get_stock_distribution,
+    )
+
+def view_records_path():
+    bq_database.get_transaction_filter_options()
+    first_page = bq_database.query_inventory_records({}, page_size=100)
+    bq_database.count_inventory_records({})
+    last_row = first_page.iloc[-1]
+    bq_database.query_inventory_records({}, page_size=100, after=(pd.Timestamp(last_row['transaction_date']), last_row['transaction_id']))
+
+def view_records_filtered_path():
+    filters = {'product_name': 'Product 000', 'entry_type': 'Sales'}
+    bq_database.query_inventory_records(filters, page_size=100)
+    bq_database.count_inventory_records(filters)
+
+def full_log_scan():
+    """The pre-pushdown access pattern: download the whole log and filter in pandas."""
+    bq_database.get_inventory_records()
+
+# --- Write paths ---
+
+def _record(product_name, entry_type, quantity):
+    return {
+        'transaction_id': str(uuid.uuid4()),
+        'transaction_date': pd.Timestamp.now(tz='UTC').strftime('%Y-%m-%d %H:%M:%S'),
+        'product_name': product_name, 'color': 'Red', 'packing_option': 'Box', 'product_grade': 'A',
+        'entry_type': entry_type, 'quantity_change': quantity, 'user_name': 'benchmark',
+        'invoice_number': '', 'remarks': 'benchmark',
+    }
+
+def single_write_path():
+    error = bq_database.update_product_stock('Product 000', 'Red', 'Box', 'A', 5)
+    error = error or bq_database.insert_transaction_record(_record('Product 000', 'Production', 5))
+    if error:
+        raise RuntimeError(error)
+
+def bulk_write_path(rows=200):
+    updates = [
+        {'product_name': f"Product {i % 50:03d}", 'color': 'Red', 'packing_option': 'Box', 'product_grade': 'A', 'adjustment': 3}
+        for i in range(rows)
+    ]
+    error = bq_database.bulk_update_product_stock(updates)
+    error = error or bq_database.bulk_insert_transaction_records([
+        _record(u['product_name'], 'Production', u['adjustment']) for u in updates
+    ])
+    if error:
+        raise RuntimeError(error)
+
+BENCHMARKS = [
+    ('dashboard', dashboard_path),
+    ('analytics', analytics_path),
+    ('view_records', view_records_path),
+    ('view_records (filtered)', view_records_filtered_path),
+    ('full log scan (legacy)', full_log_scan),
+    ('single write', single_write_path),
+    ('bulk write (200 rows)', bulk_write_path),
+]
+
+def time_call(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        read_cache.clear()
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+def run(sizes, kind, repeat, latency_ms, only=None, rollup=False):
+    if rollup:
+        bq_database.DAILY_ROLLUP_WRITES = bq_database.DAILY_ROLLUP_READS = True
+    results = []
+    for size in sizes:
+        transactions = make_transactions(size)
+        stock = derive_stock(transactions)
+        bq_database.set_backend(build_backend(kind, transactions, stock, latency_ms))
+        if rollup:
+            bq_database.backfill_daily_rollup()
+        bq_database.clear_query_stats()
+        for name, function in BENCHMARKS:
+            if only and name not in only:
+                continue
+            timings = time_call(function, repeat)
+            results.append({
+                'rows': len(transactions), 'benchmark': name,
+                'median_ms': round(statistics.median(timings), 2),
+                'min_ms': round(min(timings), 2), 'max_ms': round(max(timings), 2),
+            })
+            print(f"{kind:>13} {len(transactions):>9,} rows  {name:<24} {results[-1]['median_ms']:>10.2f} ms")
+    return pd.DataFrame(results)
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the page data paths and write functions.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000], help="Transaction counts to generate.")
+    parser.add_argument('--backend', choices=['fake-bigquery', 'sqlite'], default='fake-bigquery')
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per benchmark; the median is reported.")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Simulated round trip per BigQuery job (fake-bigquery only).")
+    parser.add_argument('--only', nargs='+', help="Run only these benchmark names.")
+    parser.add_argument('--rollup', action='store_true', help="Maintain and read the daily rollup (backfilled before timing).")
+    parser.add_argument('--csv', help="Also write the results table to this path.")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.backend, args.repeat, args.latency_ms, args.only, args.rollup)
+    table = results.pivot(index='benchmark', columns='rows', values='median_ms').reindex(
+        [name for name, _ in BENCHMARKS if name in set(results['benchmark'])]
+    )
+    print(f"\nMedian wall time (ms), backend={args.backend}, repeat={args.repeat}{', rollup' if args.rollup else ''}")
+    print(table.to_string())
+    if args.csv:
+        results.to_csv(args.csv, index=False)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# benchmarks/synthetic_data.py
+
+import numpy as np
+import pandas as pd
+from reconciliation import signed_totals
+
+PRODUCTS = 200
+COLORS = ['Red', 'Blue', 'Green', 'White', 'Black']
+PACKING_OPTIONS = ['Box', 'Bag', 'Loose']
+PRODUCT_GRADES = ['A', 'B']
+ENTRY_TYPE_WEIGHTS = {
+    'Production': 0.30, 'Purchase': 0.20, 'Sales': 0.40, 'Breakage': 0.05,
+    'Correction - Add': 0.03, 'Correction - Subtract': 0.02,
+}
+
+def sku_catalog(products=PRODUCTS):
+    """Every (product_name, color, packing_option, product_grade) combination for `products` products."""
+    index = pd.MultiIndex.from_product(
+        [[f"Product {i:03d}" for i in range(products)], COLORS, PACKING_OPTIONS, PRODUCT_GRADES],
+        names=['product_name', 'color', 'packing_option', 'product_grade'],
+    )
+    return index.to_frame(index=False)
+
+def zipf_weights(n, skew=1.1):
+    """Popularity weights where a few items take most of the traffic (rank-based Zipf)."""
+    weights = 1.0 / np.arange(1, n + 1) ** skew
+    return weights / weights.sum()
+
+def make_transactions(rows, products=PRODUCTS, days=730, skew=1.1, seed=0):
+    """Builds `rows` transactions spread over the last `days` days with skewed SKU popularity."""
+    rng = np.random.default_rng(seed)
+    catalog = sku_catalog(products)
+    sku = rng.choice(len(catalog), size=rows, p=zipf_weights(len(catalog), skew))
+    entry_types = rng.choice(list(ENTRY_TYPE_WEIGHTS), size=rows, p=list(ENTRY_TYPE_WEIGHTS.values()))
+    end = pd.Timestamp.now(tz='UTC').floor('s')
+    offsets = np.sort(rng.integers(0, days * 86400, size=rows))[::-1]
+    df = catalog.iloc[sku].reset_index(drop=True)
+    df.insert(0, 'transaction_id', [f"txn-{i:09d}" for i in range(rows)])
+    df.insert(1, 'transaction_date', end - pd.to_timedelta(offsets, unit='s'))
+    df['entry_type'] = entry_types
+    df['quantity_change'] = rng.integers(1, 50, size=rows)
+    df['user_name'] = rng.choice([f"clerk{i:02d}" for i in range(30)], size=rows)
+    invoiced = np.isin(entry_types, ['Sales', 'Purchase'])
+    df['invoice_number'] = np.where(invoiced, [f"{i % 999999:06d}" for i in range(rows)], '')
+    df['remarks'] = ''
+    return _with_opening_balances(df)
+
+def _with_opening_balances(df):
+    """Prepends one Production row per SKU that would otherwise end below zero, so the log is replayable."""
+    balances, _ = signed_totals(df)
+    short = balances[balances['expected_quantity'] < 0]
+    if short.empty:
+        return df
+    opening = short.drop(columns='expected_quantity').reset_index(drop=True)
+    opening.insert(0, 'transaction_id', [f"open-{i:06d}" for i in range(len(opening))])
+    opening.insert(1, 'transaction_date', df['transaction_date'].min() - pd.Timedelta(days=1))
+    opening['entry_type'] = 'Production'
+    opening['quantity_change'] = -short['expected_quantity'].to_numpy() + 100
+    opening['user_name'] = 'opening'
+    opening['invoice_number'] = ''
+    opening['remarks'] = 'Opening balance'
+    return pd.concat([opening, df], ignore_index=True)
+
+def derive_stock(transactions):
+    """The product_stock table implied by replaying `transactions`."""
+    balances, _ = signed_totals(transactions)
+    return balances.rename(columns={'expected_quantity': 'current_quantity'})
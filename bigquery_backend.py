@@ -0,0 +1,850 @@
+# bigquery_backend.py
+
+import io
+import json
+import sys
+import threading
+import time as timer
+import uuid
+from datetime import datetime, time, timedelta, timezone
+import pandas as pd
+from google.cloud import bigquery
+from query_stats import query_stats
+from write_coordinator import PARTIAL_APPLY_MARKER
+from storage_backend import (
+    StorageBackend, INFLOW_TYPES, OUTFLOW_TYPES, STOCK_INCREASE_TYPES, STOCK_DECREASE_TYPES,
+    STOCK_COLUMNS, TRANSACTION_COLUMNS, ROLLUP_COLUMNS, select_list,
+)
+
+try:
+    from google.cloud import bigquery_storage  # noqa: F401  (optional Arrow-based read path)
+    BQSTORAGE_AVAILABLE = True
+except ImportError:
+    BQSTORAGE_AVAILABLE = False
+
+def iter_chunks(rows, max_rows, max_bytes):
+    """Splits dict rows into lists bounded by row count and by an estimate of their encoded size."""
+    chunk, chunk_bytes = [], 0
+    for row in rows:
+        row_bytes = sum(len(str(value)) + 16 for value in row.values())
+        if chunk and (len(chunk) >= max_rows or chunk_bytes + row_bytes > max_bytes):
+            yield chunk
+            chunk, chunk_bytes = [], 0
+        chunk.append(row)
+        chunk_bytes += row_bytes
+    if chunk:
+        yield chunk
+
+# One client per project for the whole process; bigquery.Client is thread-safe and
+# creating it runs credential discovery, so it is built once, on first use.
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_client(project, http_pool_size=None):
+    """Returns the shared bigquery.Client for `project`, creating it if needed."""
+    client = _clients.get(project)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(project)
+            if client is None:
+                client = bigquery.Client(project=project)
+                if http_pool_size:
+                    _widen_connection_pool(client, http_pool_size)
+                _clients[project] = client
+    return client
+
+def _widen_connection_pool(client, size):
+    # requests keeps 10 keep-alive connections per host by default; with concurrent
+    # fetches and sessions the rest are opened and discarded on every query.
+    from requests.adapters import HTTPAdapter
+    client._http.mount("https://", HTTPAdapter(pool_connections=size, pool_maxsize=size))
+
+def _day_start(day):
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+class BigQueryBackend(StorageBackend):
+    """Stores inventory, transactions and users in Google BigQuery."""
+
+    name = "bigquery"
+
+    def __init__(self, project, dataset, stock_table, transaction_table, user_table,
+                 bulk_chunk_rows=2000, bulk_chunk_bytes=2 * 1024 * 1024,
+                 load_job_threshold=500, load_job_format='json', client=None, http_pool_size=None,
+                 rollup_table='inventory_daily_rollup', threshold_table='low_stock_thresholds'):
+        self.project = project
+        self.dataset = dataset
+        self.stock_table_id = f"{project}.{dataset}.{stock_table}"
+        self.transaction_table_id = f"{project}.{dataset}.{transaction_table}"
+        self.rollup_table_id = f"{project}.{dataset}.{rollup_table}"
+        self.rollup_stale_table_id = f"{project}.{dataset}.{rollup_table}_stale"
+        self.threshold_table_id = f"{project}.{dataset}.{threshold_table}"
+        self.user_table = user_table
+        self.bulk_chunk_rows = bulk_chunk_rows
+        self.bulk_chunk_bytes = bulk_chunk_bytes
+        self.load_job_threshold = load_job_threshold
+        self.load_job_format = load_job_format
+        self.http_pool_size = http_pool_size
+        # An explicit client lets tools run this backend against a stand-in (see benchmarks/).
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_client(self.project, self.http_pool_size)
+        return self._client
+
+    # --- Inventory-related methods ---
+    def update_product_stock(self, product_name, color, packing_option, product_grade, quantity_adjustment):
+        # One conditional MERGE: a decrement only matches while enough stock remains, so the
+        # sufficiency check and the update happen in the same job and cannot interleave.
+        try:
+            query = f"""
+                MERGE `{self.stock_table_id}` T
+                USING (SELECT @product_name AS product_name, @color AS color, @packing_option AS packing_option, @product_grade AS product_grade) S
+                ON T.product_name = S.product_name AND T.color = S.color AND T.packing_option = S.packing_option AND T.product_grade = S.product_grade
+                WHEN MATCHED AND T.current_quantity + @adjustment >= 0 THEN
+                  UPDATE SET current_quantity = T.current_quantity + @adjustment
+                WHEN NOT MATCHED BY TARGET AND @adjustment > 0 THEN
+                  INSERT (product_name, color, packing_option, product_grade, current_quantity)
+                  VALUES (S.product_name, S.color, S.packing_option, S.product_grade, @adjustment)
+            """
+            params = [
+                bigquery.ScalarQueryParameter("product_name", "STRING", product_name),
+                bigquery.ScalarQueryParameter("color", "STRING", color),
+                bigquery.ScalarQueryParameter("packing_option", "STRING", packing_option),
+                bigquery.ScalarQueryParameter("product_grade", "STRING", product_grade),
+                bigquery.ScalarQueryParameter("adjustment", "INT64", quantity_adjustment),
+            ]
+            job_config = bigquery.QueryJobConfig(query_parameters=params)
+            job = self._query(query, job_config=job_config)
+            job.result()
+            if quantity_adjustment < 0 and not job.num_dml_affected_rows:
+                return f"Error: Insufficient stock for {product_name} ({color})."
+            return None
+        except Exception as e:
+            return f"An Error Occurred: {e}"
+
+    def insert_transaction_record(self, record: dict):
+        try:
+            started = timer.perf_counter()
+            errors = self.client.insert_rows_json(self.transaction_table_id, [record])
+            query_stats.record('insert_transaction_record', (timer.perf_counter() - started) * 1000, rows=1)
+            if errors:
+                return f"Failed to insert transaction log: {errors}"
+            return None
+        except Exception as e:
+            return f"An Error Occurred: {e}"
+
+    def _query(self, query, job_config=None):
+        """Runs a query job, waits for it and records its wall time, bytes, slots and cache hit.
+
+        The stat is attributed to the backend method that issued the query.
+        """
+        function = sys._getframe(1).f_code.co_name
+        started = timer.perf_counter()
+        try:
+            job = self.client.query(query, job_config=job_config)
+            result = job.result()
+        except Exception:
+            query_stats.record(function, (timer.perf_counter() - started) * 1000)
+            raise
+        rows = job.num_dml_affected_rows if job.num_dml_affected_rows is not None else getattr(result, 'total_rows', None)
+        job.query_stat = query_stats.record(
+            function, (timer.perf_counter() - started) * 1000,
+            bytes_processed=job.total_bytes_processed, bytes_billed=job.total_bytes_billed,
+            slot_ms=job.slot_millis, cache_hit=job.cache_hit, rows=rows, job_id=job.job_id,
+        )
+        return job
+
+    def _to_frame(self, job):
+        # The Storage Read API streams Arrow record batches, which is much faster for large results.
+        started = timer.perf_counter()
+        df = job.to_dataframe(create_bqstorage_client=BQSTORAGE_AVAILABLE)
+        stat = getattr(job, 'query_stat', None)
+        if stat is not None:
+            # Count the download in the caller's latency, not just the job execution.
+            stat['wall_ms'] = round(stat['wall_ms'] + (timer.perf_counter() - started) * 1000, 2)
+            stat['rows'] = len(df)
+        return df
+
+    def get_all_product_stock(self, columns=None):
+        query = f"SELECT {select_list(columns, STOCK_COLUMNS)} FROM `{self.stock_table_id}`"
+        return self._to_frame(self._query(query))
+
+    def get_inventory_records(self, columns=None):
+        query = f"SELECT {select_list(columns, TRANSACTION_COLUMNS)} FROM `{self.transaction_table_id}`"
+        return self._to_frame(self._query(query))
+
+    def get_inventory_records_since(self, since):
+        query = f"SELECT * FROM `{self.transaction_table_id}` WHERE transaction_date >= @since"
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ScalarQueryParameter("since", "TIMESTAMP", since.to_pydatetime())]
+        )
+        return self._to_frame(self._query(query, job_config=job_config))
+
+    def bulk_insert_transaction_records(self, records: list):
+        # Small interactive batches stream; imports and backfills go through a (free) load job.
+        if self.load_job_threshold and len(records) >= self.load_job_threshold:
+            return self.load_transaction_records(records)
+        try:
+            started = timer.perf_counter()
+            errors = self.client.insert_rows_json(self.transaction_table_id, records)
+            query_stats.record('bulk_insert_transaction_records', (timer.perf_counter() - started) * 1000, rows=len(records))
+            if errors:
+                return f"Failed to insert transaction logs: {errors}"
+            return None
+        except Exception as e:
+            return f"An Error Occurred: {e}"
+
+    def load_transaction_records(self, records: list):
+        """Appends records with a single load job staged in memory as NDJSON or Parquet.
+
+        Unlike streaming inserts, loaded rows are not billed per row and are
+        immediately visible to DML (no streaming buffer).
+        """
+        try:
+            if self.load_job_format == 'parquet':
+                df = pd.DataFrame(records)
+                df['transaction_date'] = pd.to_datetime(df['transaction_date'], utc=True)
+                payload = io.BytesIO()
+                df.to_parquet(payload, index=False)
+                source_format = bigquery.SourceFormat.PARQUET
+            else:
+                payload = io.BytesIO("\n".join(json.dumps(r, default=str) for r in records).encode())
+                source_format = bigquery.SourceFormat.NEWLINE_DELIMITED_JSON
+            payload.seek(0)
+            job_config = bigquery.LoadJobConfig(
+                source_format=source_format,
+                write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+            )
+            started = timer.perf_counter()
+            job = self.client.load_table_from_file(payload, self.transaction_table_id, job_config=job_config)
+            job.result()
+            query_stats.record(
+                'load_transaction_records', (timer.perf_counter() - started) * 1000,
+                rows=job.output_rows, job_id=job.job_id,
+            )
+            if job.errors:
+                return f"Failed to load transaction logs: {job.errors}"
+            return None
+        except Exception as e:
+            return f"An Error Occurred during load job: {e}"
+
+    @staticmethod
+    def _stock_updates_parameter(updates):
+        return bigquery.ArrayQueryParameter("updates", "STRUCT", [
+            bigquery.StructQueryParameter(
+                None,
+                bigquery.ScalarQueryParameter("product_name", "STRING", u['product_name']),
+                bigquery.ScalarQueryParameter("color", "STRING", u['color']),
+                bigquery.ScalarQueryParameter("packing_option", "STRING", u['packing_option']),
+                bigquery.ScalarQueryParameter("product_grade", "STRING", u['product_grade']),
+                bigquery.ScalarQueryParameter("adjustment", "INT64", int(u['adjustment'])),
+            )
+            for u in updates
+        ])
+
+    def _bulk_merge_script(self, source):
+        """Scripted transaction over `source` (an UNNEST or a table) that applies every row or none."""
+        return f"""
+            DECLARE shortfall STRING;
+            BEGIN TRANSACTION;
+            SET shortfall = (
+                SELECT STRING_AGG(FORMAT('%s (%s)', S.product_name, S.color), ', ')
+                FROM {source} S
+                LEFT JOIN `{self.stock_table_id}` T
+                ON T.product_name = S.product_name AND T.color = S.color AND T.packing_option = S.packing_option AND T.product_grade = S.product_grade
+                WHERE S.adjustment < 0 AND IFNULL(T.current_quantity, 0) + S.adjustment < 0
+            );
+            IF shortfall IS NULL THEN
+                MERGE `{self.stock_table_id}` T
+                USING {source} S
+                ON T.product_name = S.product_name AND T.color = S.color AND T.packing_option = S.packing_option AND T.product_grade = S.product_grade
+                WHEN MATCHED THEN
+                  UPDATE SET current_quantity = T.current_quantity + S.adjustment
+                WHEN NOT MATCHED BY TARGET AND S.adjustment > 0 THEN
+                  INSERT (product_name, color, packing_option, product_grade, current_quantity)
+                  VALUES (S.product_name, S.color, S.packing_option, S.product_grade, S.adjustment);
+                COMMIT TRANSACTION;
+            ELSE
+                ROLLBACK TRANSACTION;
+            END IF;
+            SELECT shortfall AS shortfall;
+        """
+
+    def _stage_stock_updates(self, updates):
+        """Loads the rows into a short-lived staging table with one (free) load job and returns its id."""
+        staging_id = f"{self.project}.{self.dataset}._stock_updates_{uuid.uuid4().hex}"
+        table = bigquery.Table(staging_id, schema=[
+            bigquery.SchemaField("product_name", "STRING"),
+            bigquery.SchemaField("color", "STRING"),
+            bigquery.SchemaField("packing_option", "STRING"),
+            bigquery.SchemaField("product_grade", "STRING"),
+            bigquery.SchemaField("adjustment", "INT64"),
+        ])
+        # Expires on its own if the cleanup below never runs
+        table.expires = datetime.now(timezone.utc) + timedelta(hours=1)
+        self.client.create_table(table)
+        payload = io.BytesIO("\n".join(json.dumps({**u, 'adjustment': int(u['adjustment'])}) for u in updates).encode())
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+            write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+        )
+        started = timer.perf_counter()
+        job = self.client.load_table_from_file(payload, staging_id, job_config=job_config)
+        job.result()
+        query_stats.record('bulk_update_product_stock', (timer.perf_counter() - started) * 1000, rows=len(updates), job_id=job.job_id)
+        return staging_id
+
+    def bulk_update_product_stock(self, updates: list):
+        """Applies pre-coalesced (one row per SKU) adjustments, all or nothing.
+
+        Batches that fit one chunk travel as an ARRAY<STRUCT> query parameter.
+        Larger ones are loaded into a staging table first, so either way a single
+        scripted transaction checks every negative row and applies the whole batch,
+        or rolls back and reports the SKUs that are short. A failure therefore never
+        leaves part of a batch written.
+        """
+        if not updates:
+            return None
+        staging_id = None
+        try:
+            chunks = iter_chunks(updates, self.bulk_chunk_rows, self.bulk_chunk_bytes)
+            first = next(chunks)
+            if next(chunks, None) is None:
+                script = self._bulk_merge_script("UNNEST(@updates)")
+                job_config = bigquery.QueryJobConfig(query_parameters=[self._stock_updates_parameter(first)])
+            else:
+                staging_id = self._stage_stock_updates(updates)
+                script = self._bulk_merge_script(f"`{staging_id}`")
+                job_config = None
+            rows = list(self._query(script, job_config=job_config).result())
+            shortfall = rows[0]["shortfall"] if rows else None
+            if shortfall:
+                return f"Error: Insufficient stock for {shortfall}."
+            return None
+        except Exception as e:
+            return f"An Error Occurred during bulk update: {e}"
+        finally:
+            if staging_id:
+                try:
+                    self.client.delete_table(staging_id, not_found_ok=True)
+                except Exception:
+                    pass
+
+    @staticmethod
+    def _stock_repairs_parameter(repairs):
+        return bigquery.ArrayQueryParameter("repairs", "STRUCT", [
+            bigquery.StructQueryParameter(
+                None,
+                bigquery.ScalarQueryParameter("product_name", "STRING", r['product_name']),
+                bigquery.ScalarQueryParameter("color", "STRING", r['color']),
+                bigquery.ScalarQueryParameter("packing_option", "STRING", r['packing_option']),
+                bigquery.ScalarQueryParameter("product_grade", "STRING", r['product_grade']),
+                bigquery.ScalarQueryParameter("difference", "INT64", int(r['difference'])),
+            )
+            for r in repairs
+        ])
+
+    def repair_product_stock(self, repairs: list):
+        """Each chunk is one scripted transaction; the log balance is read inside it, so it matches the stock it is compared with."""
+        script = f"""
+            DECLARE repaired ARRAY<STRUCT<product_name STRING, color STRING, packing_option STRING, product_grade STRING, balance INT64>>;
+            BEGIN TRANSACTION;
+            SET repaired = (
+                SELECT ARRAY_AGG(STRUCT(R.product_name, R.color, R.packing_option, R.product_grade, IFNULL(L.balance, 0) AS balance))
+                FROM UNNEST(@repairs) R
+                LEFT JOIN (
+                    SELECT IFNULL(product_name, '') AS product_name, IFNULL(color, '') AS color,
+                           IFNULL(packing_option, '') AS packing_option, IFNULL(product_grade, '') AS product_grade,
+                           SUM(CASE WHEN entry_type IN UNNEST(@increase_types) THEN quantity_change
+                                    WHEN entry_type IN UNNEST(@decrease_types) THEN -quantity_change ELSE 0 END) AS balance
+                    FROM `{self.transaction_table_id}`
+                    WHERE product_name IN (SELECT product_name FROM UNNEST(@repairs))
+                    GROUP BY 1, 2, 3, 4
+                ) L
+                ON L.product_name = R.product_name AND L.color = R.color AND L.packing_option = R.packing_option AND L.product_grade = R.product_grade
+                LEFT JOIN `{self.stock_table_id}` T
+                ON T.product_name = R.product_name AND T.color = R.color AND T.packing_option = R.packing_option AND T.product_grade = R.product_grade
+                WHERE IFNULL(T.current_quantity, 0) - IFNULL(L.balance, 0) = R.difference AND IFNULL(L.balance, 0) >= 0
+            );
+            MERGE `{self.stock_table_id}` T
+            USING UNNEST(repaired) S
+            ON T.product_name = S.product_name AND T.color = S.color AND T.packing_option = S.packing_option AND T.product_grade = S.product_grade
+            WHEN MATCHED THEN
+              UPDATE SET current_quantity = S.balance
+            WHEN NOT MATCHED BY TARGET THEN
+              INSERT (product_name, color, packing_option, product_grade, current_quantity)
+              VALUES (S.product_name, S.color, S.packing_option, S.product_grade, S.balance);
+            COMMIT TRANSACTION;
+            SELECT product_name, color, packing_option, product_grade FROM UNNEST(repaired);
+        """
+        repaired, committed = [], 0
+        try:
+            for chunk in iter_chunks(repairs, self.bulk_chunk_rows, self.bulk_chunk_bytes):
+                job_config = bigquery.QueryJobConfig(query_parameters=[
+                    self._stock_repairs_parameter(chunk),
+                    bigquery.ArrayQueryParameter("increase_types", "STRING", list(STOCK_INCREASE_TYPES)),
+                    bigquery.ArrayQueryParameter("decrease_types", "STRING", list(STOCK_DECREASE_TYPES)),
+                ])
+                rows = self._query(script, job_config=job_config).result()
+                repaired.extend((r["product_name"], r["color"], r["packing_option"], r["product_grade"]) for r in rows)
+                committed += len(chunk)
+            return repaired, None
+        except Exception as e:
+            if committed:
+                return repaired, f"Error: Stock repair {PARTIAL_APPLY_MARKER} ({committed} of {len(repairs)} SKUs checked): {e}"
+            return [], f"An Error Occurred during stock repair: {e}"
+
+    @staticmethod
+    def _transaction_filter_clause(filters, after=None):
+        conditions, params = [], []
+        for column in ('product_name', 'color', 'entry_type'):
+            if filters.get(column):
+                conditions.append(f"{column} = @{column}")
+                params.append(bigquery.ScalarQueryParameter(column, "STRING", filters[column]))
+        if filters.get('product_names'):
+            conditions.append("product_name IN UNNEST(@product_names)")
+            params.append(bigquery.ArrayQueryParameter("product_names", "STRING", list(filters['product_names'])))
+        if filters.get('invoice_number'):
+            conditions.append("STRPOS(LOWER(IFNULL(invoice_number, '')), LOWER(@invoice_number)) > 0")
+            params.append(bigquery.ScalarQueryParameter("invoice_number", "STRING", filters['invoice_number']))
+        if filters.get('start_date'):
+            conditions.append("transaction_date >= @start_ts")
+            params.append(bigquery.ScalarQueryParameter("start_ts", "TIMESTAMP", _day_start(filters['start_date'])))
+        if filters.get('end_date'):
+            conditions.append("transaction_date < @end_ts")
+            params.append(bigquery.ScalarQueryParameter("end_ts", "TIMESTAMP", _day_start(filters['end_date'] + timedelta(days=1))))
+        if after is not None:
+            conditions.append("(transaction_date < @after_ts OR (transaction_date = @after_ts AND transaction_id < @after_id))")
+            params.append(bigquery.ScalarQueryParameter("after_ts", "TIMESTAMP", after[0].to_pydatetime()))
+            params.append(bigquery.ScalarQueryParameter("after_id", "STRING", after[1]))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, params
+
+    def query_inventory_records(self, filters, page_size, after=None):
+        where, params = self._transaction_filter_clause(filters, after)
+        query = f"""
+            SELECT * FROM `{self.transaction_table_id}`
+            {where}
+            ORDER BY transaction_date DESC, transaction_id DESC
+            LIMIT {int(page_size)}
+        """
+        job_config = bigquery.QueryJobConfig(query_parameters=params)
+        return self._to_frame(self._query(query, job_config=job_config))
+
+    def iter_inventory_records(self, filters, page_size):
+        # One job for the whole export; its result pages are then read from the job's
+        # result table, so the filtered range is scanned (and billed) once, not per page.
+        where, params = self._transaction_filter_clause(filters)
+        query = f"""
+            SELECT * FROM `{self.transaction_table_id}`
+            {where}
+            ORDER BY transaction_date DESC, transaction_id DESC
+        """
+        job = self._query(query, job_config=bigquery.QueryJobConfig(query_parameters=params))
+        yield from job.result(page_size=int(page_size)).to_dataframe_iterable()
+
+    def count_inventory_records(self, filters):
+        where, params = self._transaction_filter_clause(filters)
+        query = f"SELECT COUNT(1) AS cnt FROM `{self.transaction_table_id}` {where}"
+        job_config = bigquery.QueryJobConfig(query_parameters=params)
+        return next(self._query(query, job_config=job_config).result())["cnt"]
+
+    def get_transaction_filter_options(self):
+        query = f"""
+            SELECT
+              ARRAY_AGG(DISTINCT product_name IGNORE NULLS) AS product_name,
+              ARRAY_AGG(DISTINCT color IGNORE NULLS) AS color,
+              ARRAY_AGG(DISTINCT entry_type IGNORE NULLS) AS entry_type
+            FROM `{self.transaction_table_id}`
+        """
+        row = next(self._query(query).result())
+        return {column: sorted(row[column] or []) for column in ('product_name', 'color', 'entry_type')}
+
+    # --- Analytics aggregates ---
+    def get_transaction_date_range(self):
+        query = f"SELECT MIN(transaction_date) AS first_date, MAX(transaction_date) AS last_date FROM `{self.transaction_table_id}`"
+        row = next(self._query(query).result())
+        return row["first_date"], row["last_date"]
+
+    def get_daily_flow(self, filters):
+        where, params = self._transaction_filter_clause(filters)
+        query = f"""
+            SELECT
+              DATE(transaction_date) AS day,
+              SUM(IF(entry_type IN UNNEST(@inflow_types), quantity_change, 0)) AS inflow,
+              SUM(IF(entry_type IN UNNEST(@outflow_types), quantity_change, 0)) AS outflow
+            FROM `{self.transaction_table_id}`
+            {where}
+            GROUP BY day
+            ORDER BY day
+        """
+        params += [
+            bigquery.ArrayQueryParameter("inflow_types", "STRING", list(INFLOW_TYPES)),
+            bigquery.ArrayQueryParameter("outflow_types", "STRING", list(OUTFLOW_TYPES)),
+        ]
+        job_config = bigquery.QueryJobConfig(query_parameters=params)
+        return self._to_frame(self._query(query, job_config=job_config))
+
+    def get_sales_by_product(self, filters, limit):
+        where, params = self._transaction_filter_clause({**filters, 'entry_type': 'Sales'})
+        query = f"""
+            SELECT product_name, SUM(quantity_change) AS quantity_change, SUM(SUM(quantity_change)) OVER () AS total_sales
+            FROM `{self.transaction_table_id}`
+            {where}
+            GROUP BY product_name
+            ORDER BY quantity_change DESC
+            LIMIT {int(limit)}
+        """
+        job_config = bigquery.QueryJobConfig(query_parameters=params)
+        return self._to_frame(self._query(query, job_config=job_config))
+
+    def get_stock_distribution(self, product_names=None):
+        where, params = "", []
+        if product_names:
+            where = "WHERE product_name IN UNNEST(@product_names)"
+            params.append(bigquery.ArrayQueryParameter("product_names", "STRING", list(product_names)))
+        query = f"""
+            SELECT product_name, SUM(current_quantity) AS current_quantity
+            FROM `{self.stock_table_id}`
+            {where}
+            GROUP BY product_name
+        """
+        job_config = bigquery.QueryJobConfig(query_parameters=params)
+        return self._to_frame(self._query(query, job_config=job_config))
+
+    def get_dashboard_totals(self):
+        query = f"""
+            SELECT entry_type, SUM(quantity_change) AS total
+            FROM `{self.transaction_table_id}`
+            WHERE entry_type IS NOT NULL
+            GROUP BY entry_type
+            UNION ALL
+            SELECT NULL AS entry_type, SUM(current_quantity) AS total
+            FROM `{self.stock_table_id}`
+        """
+        entry_totals, total_stock = {}, 0
+        for row in self._query(query).result():
+            if row["entry_type"] is None:
+                total_stock = int(row["total"] or 0)
+            else:
+                entry_totals[row["entry_type"]] = int(row["total"] or 0)
+        return entry_totals, total_stock
+
+    # --- Point-in-time stock ---
+    def get_stock_deltas(self, start=None, end=None):
+        conditions, params = ["TRUE"], [
+            bigquery.ArrayQueryParameter("increase_types", "STRING", list(STOCK_INCREASE_TYPES)),
+            bigquery.ArrayQueryParameter("decrease_types", "STRING", list(STOCK_DECREASE_TYPES)),
+        ]
+        if start is not None:
+            conditions.append("transaction_date >= @start_ts")
+            params.append(bigquery.ScalarQueryParameter("start_ts", "TIMESTAMP", start.to_pydatetime()))
+        if end is not None:
+            conditions.append("transaction_date < @end_ts")
+            params.append(bigquery.ScalarQueryParameter("end_ts", "TIMESTAMP", end.to_pydatetime()))
+        query = f"""
+            SELECT IFNULL(product_name, '') AS product_name, IFNULL(color, '') AS color,
+                   IFNULL(packing_option, '') AS packing_option, IFNULL(product_grade, '') AS product_grade,
+                   SUM(CASE WHEN entry_type IN UNNEST(@increase_types) THEN quantity_change
+                            WHEN entry_type IN UNNEST(@decrease_types) THEN -quantity_change ELSE 0 END) AS expected_quantity
+            FROM `{self.transaction_table_id}`
+            WHERE {' AND '.join(conditions)}
+            GROUP BY 1, 2, 3, 4
+        """
+        job_config = bigquery.QueryJobConfig(query_parameters=params)
+        return self._to_frame(self._query(query, job_config=job_config))
+
+    def get_sku_history(self, product_name, color, packing_option, product_grade):
+        query = f"""
+            SELECT transaction_date, entry_type, quantity_change FROM `{self.transaction_table_id}`
+            WHERE product_name = @product_name AND IFNULL(color, '') = @color
+              AND IFNULL(packing_option, '') = @packing_option AND IFNULL(product_grade, '') = @product_grade
+            ORDER BY transaction_date, transaction_id
+        """
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter("product_name", "STRING", product_name),
+            bigquery.ScalarQueryParameter("color", "STRING", color or ''),
+            bigquery.ScalarQueryParameter("packing_option", "STRING", packing_option or ''),
+            bigquery.ScalarQueryParameter("product_grade", "STRING", product_grade or ''),
+        ])
+        return self._to_frame(self._query(query, job_config=job_config))
+
+    # --- Daily rollup ---
+    @staticmethod
+    def _rollup_deltas_parameter(deltas):
+        return bigquery.ArrayQueryParameter("deltas", "STRUCT", [
+            bigquery.StructQueryParameter(
+                None,
+                *[bigquery.ScalarQueryParameter(col, "STRING", d[col]) for col in ('product_name', 'color', 'packing_option', 'product_grade')],
+                bigquery.ScalarQueryParameter("day", "DATE", d['day']),
+                bigquery.ScalarQueryParameter("entry_type", "STRING", d['entry_type']),
+                bigquery.ScalarQueryParameter("quantity", "INT64", int(d['quantity'])),
+                bigquery.ScalarQueryParameter("transactions", "INT64", int(d['transactions'])),
+            )
+            for d in deltas
+        ])
+
+    def apply_rollup_deltas(self, deltas: list):
+        # The constant day list on the target side lets BigQuery prune the MERGE to the touched partitions.
+        query = f"""
+            MERGE `{self.rollup_table_id}` T
+            USING UNNEST(@deltas) S
+            ON T.day IN UNNEST(@days) AND T.day = S.day AND T.entry_type = S.entry_type
+              AND T.product_name = S.product_name AND T.color = S.color AND T.packing_option = S.packing_option AND T.product_grade = S.product_grade
+            WHEN MATCHED THEN
+              UPDATE SET quantity = T.quantity + S.quantity, transactions = T.transactions + S.transactions
+            WHEN NOT MATCHED BY TARGET THEN
+              INSERT ({', '.join(ROLLUP_COLUMNS)})
+              VALUES ({', '.join(f'S.{col}' for col in ROLLUP_COLUMNS)})
+        """
+        # Each chunk commits on its own; once one has, a failure must not be retried as a whole.
+        applied = 0
+        try:
+            for chunk in iter_chunks(deltas, self.bulk_chunk_rows, self.bulk_chunk_bytes):
+                job_config = bigquery.QueryJobConfig(query_parameters=[
+                    self._rollup_deltas_parameter(chunk),
+                    bigquery.ArrayQueryParameter("days", "DATE", sorted({d['day'] for d in chunk})),
+                ])
+                self._query(query, job_config=job_config)
+                applied += len(chunk)
+            return None
+        except Exception as e:
+            if applied:
+                return f"Error: Rollup update {PARTIAL_APPLY_MARKER} ({applied} of {len(deltas)} rows): {e}"
+            return f"An Error Occurred: {e}"
+
+    def rebuild_rollup(self, start_date=None, end_date=None):
+        day_conditions, log_conditions, params = ["TRUE"], ["TRUE"], []
+        if start_date:
+            day_conditions.append("day >= @start_day")
+            log_conditions.append("transaction_date >= @start_ts")
+            params += [
+                bigquery.ScalarQueryParameter("start_day", "DATE", start_date),
+                bigquery.ScalarQueryParameter("start_ts", "TIMESTAMP", _day_start(start_date)),
+            ]
+        if end_date:
+            day_conditions.append("day <= @end_day")
+            log_conditions.append("transaction_date < @end_ts")
+            params += [
+                bigquery.ScalarQueryParameter("end_day", "DATE", end_date),
+                bigquery.ScalarQueryParameter("end_ts", "TIMESTAMP", _day_start(end_date + timedelta(days=1))),
+            ]
+        script = f"""
+            DECLARE written INT64 DEFAULT 0;
+            BEGIN TRANSACTION;
+            DELETE FROM `{self.rollup_table_id}` WHERE {' AND '.join(day_conditions)};
+            DELETE FROM `{self.rollup_stale_table_id}` WHERE {' AND '.join(day_conditions)};
+            INSERT INTO `{self.rollup_table_id}` ({', '.join(ROLLUP_COLUMNS)})
+            SELECT IFNULL(product_name, ''), IFNULL(color, ''), IFNULL(packing_option, ''), IFNULL(product_grade, ''),
+                   DATE(transaction_date), IFNULL(entry_type, ''), SUM(quantity_change), COUNT(1)
+            FROM `{self.transaction_table_id}`
+            WHERE {' AND '.join(log_conditions)}
+            GROUP BY 1, 2, 3, 4, 5, 6;
+            SET written = @@row_count;
+            COMMIT TRANSACTION;
+            SELECT written AS written;
+        """
+        job_config = bigquery.QueryJobConfig(query_parameters=params)
+        rows = list(self._query(script, job_config=job_config).result())
+        return int(rows[0]["written"] or 0) if rows else 0
+
+    def mark_rollup_stale(self, days):
+        query = f"""
+            MERGE `{self.rollup_stale_table_id}` T
+            USING (SELECT d AS day FROM UNNEST(@days) AS d) S
+            ON T.day = S.day
+            WHEN NOT MATCHED THEN INSERT (day) VALUES (S.day)
+        """
+        try:
+            job_config = bigquery.QueryJobConfig(query_parameters=[
+                bigquery.ArrayQueryParameter("days", "DATE", sorted(set(days))),
+            ])
+            self._query(query, job_config=job_config)
+            return None
+        except Exception as e:
+            return f"An Error Occurred: {e}"
+
+    def get_rollup_stale_days(self):
+        query = f"SELECT day FROM `{self.rollup_stale_table_id}` ORDER BY day"
+        return [row["day"] for row in self._query(query).result()]
+
+    @staticmethod
+    def _rollup_filter_clause(filters):
+        conditions, params = [], []
+        for column in ('product_name', 'color', 'entry_type'):
+            if filters.get(column):
+                conditions.append(f"{column} = @{column}")
+                params.append(bigquery.ScalarQueryParameter(column, "STRING", filters[column]))
+        if filters.get('product_names'):
+            conditions.append("product_name IN UNNEST(@product_names)")
+            params.append(bigquery.ArrayQueryParameter("product_names", "STRING", list(filters['product_names'])))
+        if filters.get('start_date'):
+            conditions.append("day >= @start_day")
+            params.append(bigquery.ScalarQueryParameter("start_day", "DATE", filters['start_date']))
+        if filters.get('end_date'):
+            conditions.append("day <= @end_day")
+            params.append(bigquery.ScalarQueryParameter("end_day", "DATE", filters['end_date']))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, params
+
+    def get_rollup_daily_flow(self, filters):
+        where, params = self._rollup_filter_clause(filters)
+        query = f"""
+            SELECT
+              day,
+              SUM(IF(entry_type IN UNNEST(@inflow_types), quantity, 0)) AS inflow,
+              SUM(IF(entry_type IN UNNEST(@outflow_types), quantity, 0)) AS outflow
+            FROM `{self.rollup_table_id}`
+            {where}
+            GROUP BY day
+            ORDER BY day
+        """
+        params += [
+            bigquery.ArrayQueryParameter("inflow_types", "STRING", list(INFLOW_TYPES)),
+            bigquery.ArrayQueryParameter("outflow_types", "STRING", list(OUTFLOW_TYPES)),
+        ]
+        job_config = bigquery.QueryJobConfig(query_parameters=params)
+        return self._to_frame(self._query(query, job_config=job_config))
+
+    def get_rollup_sales_by_product(self, filters, limit):
+        where, params = self._rollup_filter_clause({**filters, 'entry_type': 'Sales'})
+        query = f"""
+            SELECT product_name, SUM(quantity) AS quantity_change, SUM(SUM(quantity)) OVER () AS total_sales
+            FROM `{self.rollup_table_id}`
+            {where}
+            GROUP BY product_name
+            ORDER BY quantity_change DESC
+            LIMIT {int(limit)}
+        """
+        job_config = bigquery.QueryJobConfig(query_parameters=params)
+        return self._to_frame(self._query(query, job_config=job_config))
+
+    def get_rollup_dashboard_totals(self):
+        query = f"""
+            SELECT entry_type, SUM(quantity) AS total
+            FROM `{self.rollup_table_id}`
+            WHERE entry_type != ''
+            GROUP BY entry_type
+            UNION ALL
+            SELECT NULL AS entry_type, SUM(current_quantity) AS total
+            FROM `{self.stock_table_id}`
+        """
+        entry_totals, total_stock = {}, 0
+        for row in self._query(query).result():
+            if row["entry_type"] is None:
+                total_stock = int(row["total"] or 0)
+            else:
+                entry_totals[row["entry_type"]] = int(row["total"] or 0)
+        return entry_totals, total_stock
+
+    # --- Low-stock thresholds ---
+    def get_low_stock_thresholds(self):
+        query = f"SELECT product_name, color, packing_option, product_grade, threshold FROM `{self.threshold_table_id}`"
+        return self._to_frame(self._query(query))
+
+    def set_low_stock_threshold(self, key, threshold):
+        params = [
+            bigquery.ScalarQueryParameter(column, "STRING", value)
+            for column, value in zip(('product_name', 'color', 'packing_option', 'product_grade'), key)
+        ]
+        if threshold is None:
+            query = f"""
+                DELETE FROM `{self.threshold_table_id}`
+                WHERE product_name = @product_name AND color = @color AND packing_option = @packing_option AND product_grade = @product_grade
+            """
+        else:
+            params.append(bigquery.ScalarQueryParameter("threshold", "INT64", int(threshold)))
+            query = f"""
+                MERGE `{self.threshold_table_id}` T
+                USING (SELECT @product_name AS product_name, @color AS color, @packing_option AS packing_option,
+                              @product_grade AS product_grade, @threshold AS threshold) S
+                ON T.product_name = S.product_name AND T.color = S.color AND T.packing_option = S.packing_option AND T.product_grade = S.product_grade
+                WHEN MATCHED THEN
+                  UPDATE SET threshold = S.threshold
+                WHEN NOT MATCHED THEN
+                  INSERT (product_name, color, packing_option, product_grade, threshold)
+                  VALUES (S.product_name, S.color, S.packing_option, S.product_grade, S.threshold)
+            """
+        try:
+            self._query(query, job_config=bigquery.QueryJobConfig(query_parameters=params))
+            return None
+        except Exception as e:
+            return f"An Error Occurred: {e}"
+
+    # --- User-related methods ---
+    def email_exists(self, email):
+        query = f"SELECT COUNT(1) as cnt FROM `{self.user_table}` WHERE email=@email"
+        job_config = bigquery.QueryJobConfig(query_parameters=[bigquery.ScalarQueryParameter("email", "STRING", email)])
+        result = self._query(query, job_config=job_config).result()
+        return next(result)["cnt"] > 0
+
+    def username_exists(self, username):
+        query = f"SELECT COUNT(1) as cnt FROM `{self.user_table}` WHERE username=@username"
+        job_config = bigquery.QueryJobConfig(query_parameters=[bigquery.ScalarQueryParameter("username", "STRING", username)])
+        result = self._query(query, job_config=job_config).result()
+        return next(result)["cnt"] > 0
+
+    def create_user(self, user_id, username, email, password_hash):
+        query = f"""
+        INSERT INTO `{self.user_table}` (user_id, username, email, password_hash, created_at, user_role, allowed_transaction)
+        VALUES (@user_id, @username, @email, @password_hash, CURRENT_DATETIME(), 'user', 'all')
+        """
+        query_params = [
+            bigquery.ScalarQueryParameter("user_id", "STRING", user_id),
+            bigquery.ScalarQueryParameter("username", "STRING", username),
+            bigquery.ScalarQueryParameter("email", "STRING", email),
+            bigquery.ScalarQueryParameter("password_hash", "STRING", password_hash)
+        ]
+        job_config = bigquery.QueryJobConfig(query_parameters=query_params)
+        self._query(query, job_config=job_config).result()
+
+    def get_user_credentials(self, email):
+        query = f"SELECT user_id, username, password_hash, user_role, allowed_transaction FROM `{self.user_table}` WHERE email=@email"
+        job_config = bigquery.QueryJobConfig(query_parameters=[bigquery.ScalarQueryParameter("email", "STRING", email)])
+        results = list(self._query(query, job_config=job_config).result())
+        return results[0] if results else None
+
+    def get_all_users(self):
+        query = f"SELECT user_id, username, email, user_role, allowed_transaction FROM `{self.user_table}`"
+        return self._to_frame(self._query(query))
+
+    def update_user_role(self, user_id, new_role):
+        query = f"UPDATE `{self.user_table}` SET user_role=@role WHERE user_id=@user_id"
+        query_params = [
+            bigquery.ScalarQueryParameter("role", "STRING", new_role),
+            bigquery.ScalarQueryParameter("user_id", "STRING", user_id),
+        ]
+        job_config = bigquery.QueryJobConfig(query_parameters=query_params)
+        self._query(query, job_config=job_config).result()
+
+    def update_user_restriction(self, user_id, restriction_value):
+        query = f"UPDATE `{self.user_table}` SET allowed_transaction=@restriction WHERE user_id=@user_id"
+        query_params = [
+            bigquery.ScalarQueryParameter("restriction", "STRING", restriction_value),
+            bigquery.ScalarQueryParameter("user_id", "STRING", user_id),
+        ]
+        job_config = bigquery.QueryJobConfig(query_parameters=query_params)
+        self._query(query, job_config=job_config).result()
+
+    def get_user_by_email(self, email):
+        query = f"SELECT user_id FROM `{self.user_table}` WHERE email=@email"
+        job_config = bigquery.QueryJobConfig(query_parameters=[bigquery.ScalarQueryParameter("email", "STRING", email)])
+        results = list(self._query(query, job_config=job_config).result())
+        return results[0] if results else None
+
+    def update_user_password(self, email, password_hash):
+        query = f"UPDATE `{self.user_table}` SET password_hash=@password_hash WHERE email=@email"
+        query_params = [
+            bigquery.ScalarQueryParameter("password_hash", "STRING", password_hash),
+            bigquery.ScalarQueryParameter("email", "STRING", email)
+        ]
+        job_config = bigquery.QueryJobConfig(query_parameters=query_params)
+        self._query(query, job_config=job_config).result()
+
+    def delete_user(self, user_id):
+        query = f"DELETE FROM `{self.user_table}` WHERE user_id=@user_id"
+        query_params = [bigquery.ScalarQueryParameter("user_id", "STRING", user_id)]
+        job_config = bigquery.QueryJobConfig(query_parameters=query_params)
+        self._query(query, job_config=job_config).result()
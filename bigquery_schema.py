@@ -0,0 +1,235 @@
+# bigquery_schema.py
+
+import argparse
+import sys
+from datetime import datetime
+from google.api_core.exceptions import NotFound
+import bq_database
+from bigquery_backend import get_client
+
+# Target layout of the BigQuery tables. The transaction log is partitioned by day
+# on transaction_date, so any query with a date bound (analytics ranges, the view
+# page's date filter, incremental refreshes) only scans the partitions in range;
+# clustering then narrows the blocks read for product / entry type filters.
+TRANSACTION_SPEC = {
+    'columns': [
+        ('transaction_id', 'STRING', 'REQUIRED'),
+        ('transaction_date', 'TIMESTAMP', 'REQUIRED'),
+        ('product_name', 'STRING', 'NULLABLE'),
+        ('color', 'STRING', 'NULLABLE'),
+        ('packing_option', 'STRING', 'NULLABLE'),
+        ('product_grade', 'STRING', 'NULLABLE'),
+        ('entry_type', 'STRING', 'NULLABLE'),
+        ('quantity_change', 'INT64', 'NULLABLE'),
+        ('user_name', 'STRING', 'NULLABLE'),
+        ('invoice_number', 'STRING', 'NULLABLE'),
+        ('remarks', 'STRING', 'NULLABLE'),
+    ],
+    'partition_field': 'transaction_date',
+    'clustering': ['product_name', 'entry_type'],
+}
+STOCK_SPEC = {
+    'columns': [
+        ('product_name', 'STRING', 'NULLABLE'),
+        ('color', 'STRING', 'NULLABLE'),
+        ('packing_option', 'STRING', 'NULLABLE'),
+        ('product_grade', 'STRING', 'NULLABLE'),
+        ('current_quantity', 'INT64', 'NULLABLE'),
+    ],
+    'partition_field': None,
+    'clustering': ['product_name', 'color', 'packing_option', 'product_grade'],
+}
+ROLLUP_SPEC = {
+    'columns': [
+        ('product_name', 'STRING', 'REQUIRED'),
+        ('color', 'STRING', 'REQUIRED'),
+        ('packing_option', 'STRING', 'REQUIRED'),
+        ('product_grade', 'STRING', 'REQUIRED'),
+        ('day', 'DATE', 'REQUIRED'),
+        ('entry_type', 'STRING', 'REQUIRED'),
+        ('quantity', 'INT64', 'REQUIRED'),
+        ('transactions', 'INT64', 'REQUIRED'),
+    ],
+    'partition_field': 'day',
+    'clustering': ['product_name', 'entry_type'],
+}
+# Days whose rollup rows missed an update; analytics reads the raw log while any are listed
+ROLLUP_STALE_SPEC = {
+    'columns': [
+        ('day', 'DATE', 'REQUIRED'),
+    ],
+    'partition_field': None,
+    'clustering': [],
+}
+# Low-stock alert thresholds per SKU; the row with every key column '' holds the default
+THRESHOLD_SPEC = {
+    'columns': [
+        ('product_name', 'STRING', 'REQUIRED'),
+        ('color', 'STRING', 'REQUIRED'),
+        ('packing_option', 'STRING', 'REQUIRED'),
+        ('product_grade', 'STRING', 'REQUIRED'),
+        ('threshold', 'INT64', 'REQUIRED'),
+    ],
+    'partition_field': None,
+    'clustering': [],
+}
+USER_SPEC = {
+    'columns': [
+        ('user_id', 'STRING', 'NULLABLE'),
+        ('username', 'STRING', 'NULLABLE'),
+        ('email', 'STRING', 'NULLABLE'),
+        ('password_hash', 'STRING', 'NULLABLE'),
+        ('created_at', 'DATETIME', 'NULLABLE'),
+        ('user_role', 'STRING', 'NULLABLE'),
+        ('allowed_transaction', 'STRING', 'NULLABLE'),
+    ],
+    'partition_field': None,
+    'clustering': [],
+}
+
+# The API reports legacy type names for some columns
+_TYPE_ALIASES = {'INTEGER': 'INT64', 'FLOAT': 'FLOAT64', 'BOOLEAN': 'BOOL', 'RECORD': 'STRUCT'}
+
+def table_specs():
+    """Fully qualified table id -> spec, for the tables configured in bq_database."""
+    prefix = f"{bq_database.BIGQUERY_PROJECT}.{bq_database.BIGQUERY_DATASET}"
+    return {
+        f"{prefix}.{bq_database.TRANSACTION_TABLE}": TRANSACTION_SPEC,
+        f"{prefix}.{bq_database.STOCK_TABLE}": STOCK_SPEC,
+        f"{prefix}.{bq_database.DAILY_ROLLUP_TABLE}": ROLLUP_SPEC,
+        f"{prefix}.{bq_database.DAILY_ROLLUP_TABLE}_stale": ROLLUP_STALE_SPEC,
+        f"{prefix}.{bq_database.LOW_STOCK_THRESHOLD_TABLE}": THRESHOLD_SPEC,
+        bq_database.USER_TABLE: USER_SPEC,
+    }
+
+# --- DDL ---
+def _layout_clause(spec):
+    clauses = []
+    if spec['partition_field']:
+        field = spec['partition_field']
+        field_type = next(type_ for name, type_, _ in spec['columns'] if name == field)
+        clauses.append(f"PARTITION BY {field}" if field_type == 'DATE' else f"PARTITION BY DATE({field})")
+    if spec['clustering']:
+        clauses.append(f"CLUSTER BY {', '.join(spec['clustering'])}")
+    return "\n".join(clauses)
+
+def create_table_ddl(table_id, spec):
+    columns = ",\n".join(
+        f"  {name} {type_}{' NOT NULL' if mode == 'REQUIRED' else ''}" for name, type_, mode in spec['columns']
+    )
+    layout = _layout_clause(spec)
+    return f"CREATE TABLE IF NOT EXISTS `{table_id}` (\n{columns}\n){chr(10) + layout if layout else ''};"
+
+def rebuild_ddl(table_id, spec, suffix):
+    """Copy-and-swap statements that move an existing table onto the target partitioning and clustering.
+
+    BigQuery cannot change a table's partitioning in place, so the data is copied
+    into a new table, the original is kept as `<table>_backup_<suffix>`, and the
+    copy takes its name. Writes must be paused while this runs; rows that land in
+    the original table after the copy starts end up only in the backup.
+    """
+    project_dataset, table = table_id.rsplit('.', 1)
+    staging = f"{table}_migrating_{suffix}"
+    return [
+        f"CREATE TABLE `{project_dataset}.{staging}`\n{_layout_clause(spec)}\nAS SELECT * FROM `{table_id}`;",
+        f"ALTER TABLE `{table_id}` RENAME TO `{table}_backup_{suffix}`;",
+        f"ALTER TABLE `{project_dataset}.{staging}` RENAME TO `{table}`;",
+    ]
+
+# --- Live schema checks ---
+def _live_layout(table):
+    partitioning = table.time_partitioning
+    partition_field = partitioning.field if partitioning is not None else None
+    return partition_field, list(table.clustering_fields or [])
+
+def inspect_table(client, table_id, spec):
+    """Returns (exists, problems, missing column specs) for one live table."""
+    try:
+        table = client.get_table(table_id)
+    except NotFound:
+        return False, [f"{table_id}: table does not exist"], []
+    problems, missing = [], []
+    live = {field.name: _TYPE_ALIASES.get(field.field_type, field.field_type) for field in table.schema}
+    for name, type_, mode in spec['columns']:
+        if name not in live:
+            problems.append(f"{table_id}: missing column {name} {type_}")
+            missing.append((name, type_, mode))
+        elif live[name] != type_:
+            problems.append(f"{table_id}: column {name} is {live[name]}, expected {type_} (needs a manual migration)")
+    partition_field, clustering = _live_layout(table)
+    if partition_field != spec['partition_field']:
+        problems.append(f"{table_id}: partitioned on {partition_field or 'nothing'}, expected {spec['partition_field'] or 'no partitioning'}")
+    if clustering != spec['clustering']:
+        problems.append(f"{table_id}: clustered by {clustering or 'nothing'}, expected {spec['clustering'] or 'no clustering'}")
+    return True, problems, missing
+
+def verify_schema(client, specs=None):
+    """Lists every difference between the live tables and their specs (empty when everything matches)."""
+    problems = []
+    for table_id, spec in (specs or table_specs()).items():
+        problems += inspect_table(client, table_id, spec)[1]
+    return problems
+
+def plan_migration(client, specs=None, suffix=None):
+    """DDL statements that create missing tables and upgrade existing ones; empty when up to date.
+
+    Plans are derived from the live state, so running the tool again after a
+    successful migration is a no-op. If a rebuild stops part-way, the data is in
+    the staging or backup table named by the failed statement. Column type
+    changes are reported by verify_schema but never planned automatically.
+    """
+    suffix = suffix or datetime.now().strftime('%Y%m%d%H%M%S')
+    statements = []
+    for table_id, spec in (specs or table_specs()).items():
+        exists, _, missing = inspect_table(client, table_id, spec)
+        if not exists:
+            statements.append(create_table_ddl(table_id, spec))
+            continue
+        # Nullable columns can be added in place; REQUIRED ones cannot be added to existing rows.
+        statements += [f"ALTER TABLE `{table_id}` ADD COLUMN IF NOT EXISTS {name} {type_};" for name, type_, _ in missing]
+        partition_field, clustering = _live_layout(client.get_table(table_id))
+        if partition_field != spec['partition_field'] or clustering != spec['clustering']:
+            statements += rebuild_ddl(table_id, spec, suffix)
+    return statements
+
+def apply_migration(client, statements):
+    """Runs planned statements in order and stops at the first failure. Returns None or an error message."""
+    for index, statement in enumerate(statements, start=1):
+        try:
+            client.query(statement).result()
+        except Exception as e:
+            return f"Statement {index} of {len(statements)} failed: {e}"
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Create, verify or upgrade the BigQuery inventory tables.")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--ddl', action='store_true', help="print CREATE statements for every table (no connection needed)")
+    mode.add_argument('--verify', action='store_true', help="compare the live tables with the target schema")
+    mode.add_argument('--plan', action='store_true', help="print the statements needed to migrate the live tables")
+    mode.add_argument('--apply', action='store_true', help="run the migration plan")
+    args = parser.parse_args()
+
+    if args.ddl:
+        print("\n\n".join(create_table_ddl(table_id, spec) for table_id, spec in table_specs().items()))
+        return 0
+
+    client = get_client(bq_database.BIGQUERY_PROJECT)
+    if args.verify:
+        problems = verify_schema(client)
+        print("\n".join(problems) if problems else "All tables match the target schema.")
+        return 1 if problems else 0
+
+    statements = plan_migration(client)
+    if not statements:
+        print("Nothing to do; all tables are up to date.")
+        return 0
+    print("\n\n".join(statements))
+    if args.apply:
+        error = apply_migration(client, statements)
+        print(f"\n{error}" if error else f"\nApplied {len(statements)} statement(s).")
+        return 1 if error else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,20 @@
 import os
-import pandas as pd
-from google.cloud import bigquery
-from datetime import datetime
+import threading
 import bcrypt
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from read_cache import ReadCache
+from incremental_log import IncrementalTransactionLog
+from stock_index import StockIndex, STOCK_KEY_COLUMNS
+from low_stock import LowStockTracker
+from storage_backend import ROLLUP_KEY_COLUMNS
+from write_coordinator import WriteCoordinator
+from query_stats import query_stats
+
+# Storage backend selection: "bigquery" (default) or "sqlite" for a local embedded database
+INVENTORY_BACKEND = os.getenv('INVENTORY_BACKEND', 'bigquery').lower()
+SQLITE_DB_PATH = os.getenv('SQLITE_DB_PATH', 'inventory.db')
 
 # Set up BigQuery client and table info
 BIGQUERY_PROJECT = os.getenv('BIGQUERY_PROJECT', 'Project_name')
@@ -12,200 +23,506 @@ STOCK_TABLE = os.getenv('STOCK_TABLE', 'product_stock')
 TRANSACTION_TABLE = os.getenv('TRANSACTION_TABLE', 'inventory_transactions')
 USER_TABLE = os.getenv('users', f'{BIGQUERY_PROJECT}.{BIGQUERY_DATASET}.users')
 
-client = bigquery.Client(project=BIGQUERY_PROJECT)
+# Bulk log inserts of at least this many rows use a load job instead of streaming (0 = always stream)
+LOAD_JOB_THRESHOLD = int(os.getenv('LOAD_JOB_THRESHOLD', '500'))
+LOAD_JOB_FORMAT = os.getenv('LOAD_JOB_FORMAT', 'json').lower()
+
+# Keep-alive HTTPS connections the shared BigQuery client holds open (requests defaults to 10)
+BIGQUERY_HTTP_POOL_SIZE = int(os.getenv('BIGQUERY_HTTP_POOL_SIZE', '32'))
+
+# Shared read cache for the stock and transaction tables (set the TTL to 0 to disable)
+READ_CACHE_TTL_SECONDS = float(os.getenv('READ_CACHE_TTL_SECONDS', '60'))
+READ_CACHE_MAX_MB = float(os.getenv('READ_CACHE_MAX_MB', '256'))
+read_cache = ReadCache(ttl_seconds=READ_CACHE_TTL_SECONDS, max_bytes=int(READ_CACHE_MAX_MB * 1024 * 1024))
+
+# In-process SKU -> quantity index used to reject insufficient-stock adjustments before any job runs
+STOCK_INDEX = os.getenv('STOCK_INDEX', 'true').lower() in ('1', 'true', 'yes')
+STOCK_INDEX_MAX_AGE_SECONDS = float(os.getenv('STOCK_INDEX_MAX_AGE_SECONDS', '30'))
+
+# SKUs at or below their low-stock threshold, kept current by the stock write functions
+LOW_STOCK_DEFAULT_THRESHOLD = int(os.getenv('LOW_STOCK_DEFAULT_THRESHOLD', '20'))
+# Thresholds edited in the Admin Panel are stored in this table (BigQuery; SQLite uses low_stock_thresholds)
+LOW_STOCK_THRESHOLD_TABLE = os.getenv('LOW_STOCK_THRESHOLD_TABLE', 'low_stock_thresholds')
+
+# Stock writes are serialized per SKU; concurrent-modification errors are retried with jittered backoff
+WRITE_MAX_RETRIES = int(os.getenv('WRITE_MAX_RETRIES', '5'))
+WRITE_BACKOFF_BASE_MS = float(os.getenv('WRITE_BACKOFF_BASE_MS', '100'))
+WRITE_BACKOFF_MAX_MS = float(os.getenv('WRITE_BACKOFF_MAX_MS', '3000'))
+write_coordinator = WriteCoordinator(WRITE_MAX_RETRIES, WRITE_BACKOFF_BASE_MS / 1000, WRITE_BACKOFF_MAX_MS / 1000)
+
+# Worker threads used by fetch_concurrently to overlap independent queries
+FETCH_WORKERS = int(os.getenv('FETCH_WORKERS', '8'))
+_fetch_pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="bq-fetch")
+
+# Fetched frames use categorical / Arrow string columns and 32-bit integers to cut per-session memory
+COMPACT_FRAMES = os.getenv('COMPACT_FRAMES', 'true').lower() in ('1', 'true', 'yes')
+CATEGORY_COLUMNS = ['product_name', 'color', 'packing_option', 'product_grade', 'entry_type', 'user_name']
+TEXT_COLUMNS = ['transaction_id', 'invoice_number', 'remarks']
+
+# Incremental mode keeps the transaction log in memory and only fetches rows past the last watermark
+INCREMENTAL_TRANSACTIONS = os.getenv('INCREMENTAL_TRANSACTIONS', 'false').lower() in ('1', 'true', 'yes')
+
+# Per SKU x day x entry_type sums kept next to the log. Turn on writes first, backfill the days
+# before that (python daily_rollup.py), then turn on reads for analytics and dashboard totals.
+DAILY_ROLLUP_TABLE = os.getenv('DAILY_ROLLUP_TABLE', 'inventory_daily_rollup')
+DAILY_ROLLUP_WRITES = os.getenv('DAILY_ROLLUP_WRITES', 'false').lower() in ('1', 'true', 'yes')
+DAILY_ROLLUP_READS = os.getenv('DAILY_ROLLUP_READS', 'false').lower() in ('1', 'true', 'yes')
+
+def create_backend(name=INVENTORY_BACKEND):
+    """Builds the storage backend registered under `name`."""
+    if name == 'bigquery':
+        from bigquery_backend import BigQueryBackend
+        return BigQueryBackend(
+            BIGQUERY_PROJECT, BIGQUERY_DATASET, STOCK_TABLE, TRANSACTION_TABLE, USER_TABLE,
+            load_job_threshold=LOAD_JOB_THRESHOLD, load_job_format=LOAD_JOB_FORMAT,
+            http_pool_size=BIGQUERY_HTTP_POOL_SIZE, rollup_table=DAILY_ROLLUP_TABLE,
+            threshold_table=LOW_STOCK_THRESHOLD_TABLE,
+        )
+    if name == 'sqlite':
+        from sqlite_backend import SQLiteBackend
+        return SQLiteBackend(SQLITE_DB_PATH)
+    raise ValueError(f"Unknown INVENTORY_BACKEND '{name}'. Expected 'bigquery' or 'sqlite'.")
+
+# The backend (and with it the BigQuery SDK and client) is created on first use, not at import,
+# so the login screen renders without waiting on credential discovery.
+_backend = None
+_transaction_log = None
+_backend_lock = threading.Lock()
+stock_index = StockIndex(lambda: get_backend().get_all_product_stock(), STOCK_INDEX_MAX_AGE_SECONDS)
+low_stock_tracker = LowStockTracker(
+    lambda: get_backend().get_all_product_stock(), LOW_STOCK_DEFAULT_THRESHOLD,
+    lambda: get_backend().get_low_stock_thresholds(),
+    lambda key, threshold: get_backend().set_low_stock_threshold(key, threshold),
+    STOCK_INDEX_MAX_AGE_SECONDS,
+)
+
+def get_backend():
+    """The shared backend instance, built by the first caller; concurrent first calls build it once."""
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _install_backend(create_backend())
+    return _backend
+
+def _install_backend(new_backend):
+    global _backend, _transaction_log
+    _transaction_log = IncrementalTransactionLog(new_backend)
+    _backend = new_backend
+
+def _get_transaction_log():
+    get_backend()
+    return _transaction_log
+
+def set_backend(new_backend):
+    """Swaps the active backend, e.g. to point a benchmark at a scratch database."""
+    with _backend_lock:
+        _install_backend(new_backend)
+    stock_index.invalidate()
+    low_stock_tracker.invalidate()
+    read_cache.clear()
+
+def fetch_concurrently(*loaders):
+    """Runs independent zero-argument read functions at the same time and returns their results in order.
+
+    Page latency becomes that of the slowest query rather than the sum of all
+    of them. The first exception raised by any loader is re-raised.
+    """
+    if len(loaders) <= 1:
+        return [loader() for loader in loaders]
+    futures = [_fetch_pool.submit(loader) for loader in loaders]
+    return [future.result() for future in futures]
 
 # --- Inventory-related functions ---
+# Writes invalidate unconditionally: a failed call may still have been partially applied.
 def update_product_stock(product_name, color, packing_option, product_grade, quantity_adjustment):
-    stock_table_id = f"{BIGQUERY_PROJECT}.{BIGQUERY_DATASET}.{STOCK_TABLE}"
+    update = {
+        'product_name': product_name, 'color': color, 'packing_option': packing_option,
+        'product_grade': product_grade, 'adjustment': quantity_adjustment,
+    }
+    if _index_shortfalls([update]):
+        return f"Error: Insufficient stock for {product_name} ({color})."
     try:
-        if quantity_adjustment < 0:
-            query_check = f"""
-                SELECT current_quantity FROM `{stock_table_id}`
-                WHERE product_name = @product_name AND color = @color AND packing_option = @packing_option AND product_grade = @product_grade
-            """
-            params = [
-                bigquery.ScalarQueryParameter("product_name", "STRING", product_name),
-                bigquery.ScalarQueryParameter("color", "STRING", color),
-                bigquery.ScalarQueryParameter("packing_option", "STRING", packing_option),
-                bigquery.ScalarQueryParameter("product_grade", "STRING", product_grade),
-            ]
-            job_config = bigquery.QueryJobConfig(query_parameters=params)
-            rows = list(client.query(query_check, job_config=job_config).result())
-            if not rows or rows[0].current_quantity < abs(quantity_adjustment):
-                return f"Error: Insufficient stock for {product_name} ({color})."
-        
-        query = f"""
-            MERGE `{stock_table_id}` T
-            USING (SELECT @product_name AS product_name, @color AS color, @packing_option AS packing_option, @product_grade AS product_grade) S
-            ON T.product_name = S.product_name AND T.color = S.color AND T.packing_option = S.packing_option AND T.product_grade = S.product_grade
-            WHEN MATCHED THEN
-              UPDATE SET current_quantity = T.current_quantity + @adjustment
-            WHEN NOT MATCHED BY TARGET AND @adjustment > 0 THEN
-              INSERT (product_name, color, packing_option, product_grade, current_quantity)
-              VALUES (S.product_name, S.color, S.packing_option, S.product_grade, @adjustment)
-        """
-        params = [
-            bigquery.ScalarQueryParameter("product_name", "STRING", product_name),
-            bigquery.ScalarQueryParameter("color", "STRING", color),
-            bigquery.ScalarQueryParameter("packing_option", "STRING", packing_option),
-            bigquery.ScalarQueryParameter("product_grade", "STRING", product_grade),
-            bigquery.ScalarQueryParameter("adjustment", "INT64", quantity_adjustment),
-        ]
-        job_config = bigquery.QueryJobConfig(query_parameters=params)
-        client.query(query, job_config=job_config).result()
-        return None
-    except Exception as e:
-        return f"An Error Occurred: {e}"
+        error = write_coordinator.run(
+            [_stock_key(update)],
+            lambda: get_backend().update_product_stock(product_name, color, packing_option, product_grade, quantity_adjustment),
+        )
+    finally:
+        read_cache.invalidate(STOCK_TABLE)
+    _sync_stock_index([update], error)
+    return error
 
 def insert_transaction_record(record: dict):
-    transaction_table_id = f"{BIGQUERY_PROJECT}.{BIGQUERY_DATASET}.{TRANSACTION_TABLE}"
     try:
-        errors = client.insert_rows_json(transaction_table_id, [record])
-        if errors:
-            return f"Failed to insert transaction log: {errors}"
+        error = get_backend().insert_transaction_record(record)
+        if not error:
+            _update_daily_rollup([record])
+        return error
+    finally:
+        read_cache.invalidate(TRANSACTION_TABLE)
+
+def get_all_product_stock(columns=None):
+    """Returns the stock table, optionally projected to `columns`, with compact dtypes."""
+    columns = list(columns) if columns else None
+    return read_cache.get_or_load(
+        ('get_all_product_stock', tuple(columns or ())), STOCK_TABLE,
+        lambda: compact_frame(get_backend().get_all_product_stock(columns)),
+    )
+
+def get_inventory_records(columns=None):
+    """Returns the transaction log, optionally projected to `columns`, with compact dtypes."""
+    columns = list(columns) if columns else None
+    if INCREMENTAL_TRANSACTIONS:
+        # The in-memory log keeps every column so later deltas can be appended to it.
+        def loader():
+            records = _get_transaction_log().get_records()
+            return records[columns] if columns else records
+    else:
+        loader = lambda: get_backend().get_inventory_records(columns)
+    return read_cache.get_or_load(
+        ('get_inventory_records', tuple(columns or ())), TRANSACTION_TABLE,
+        lambda: compact_frame(loader()),
+    )
+
+def _arrow_string_dtype():
+    try:
+        return pd.StringDtype(storage='pyarrow')
+    except ImportError:
         return None
-    except Exception as e:
-        return f"An Error Occurred: {e}"
 
-def get_all_product_stock():
-    stock_table_id = f"{BIGQUERY_PROJECT}.{BIGQUERY_DATASET}.{STOCK_TABLE}"
-    query = f"SELECT * FROM `{stock_table_id}`"
-    return client.query(query).to_dataframe()
-    
-def get_inventory_records():
-    transaction_table_id = f"{BIGQUERY_PROJECT}.{BIGQUERY_DATASET}.{TRANSACTION_TABLE}"
-    query = f"SELECT * FROM `{transaction_table_id}`"
-    return client.query(query).to_dataframe()
+def compact_frame(df):
+    """Converts low-cardinality text to categoricals, free text to Arrow strings and ints to at most 32 bits."""
+    if not COMPACT_FRAMES or df.empty:
+        return df
+    string_dtype = _arrow_string_dtype()
+    for col in df.columns:
+        if col in CATEGORY_COLUMNS:
+            df[col] = df[col].astype('category')
+        elif col in TEXT_COLUMNS and string_dtype is not None:
+            df[col] = df[col].astype(string_dtype)
+        elif pd.api.types.is_integer_dtype(df[col]):
+            # Keep at least 32 bits so quantity arithmetic on the frame cannot overflow in practice.
+            downcast = pd.to_numeric(df[col], downcast='integer')
+            if downcast.dtype.itemsize < 4:
+                downcast = downcast.astype('Int32' if pd.api.types.is_extension_array_dtype(downcast) else 'int32')
+            df[col] = downcast
+    return df
+
+def _transaction_filters(filters):
+    """Drops unset filters ("", None, "All") and returns a hashable, order-independent form."""
+    return tuple(sorted((k, v) for k, v in (filters or {}).items() if v not in (None, '', 'All')))
+
+def query_inventory_records(filters=None, page_size=100, after=None):
+    """Returns one page of transactions matching `filters`, newest first.
+
+    Filtering, ordering and the page limit all run in the database. Pass the
+    (transaction_date, transaction_id) of the previous page's last row as
+    `after` to fetch the next page (keyset pagination).
+    """
+    key = _transaction_filters(filters)
+    return read_cache.get_or_load(
+        ('query_inventory_records', key, page_size, after), TRANSACTION_TABLE,
+        lambda: get_backend().query_inventory_records(dict(key), page_size, after),
+    )
+
+def count_inventory_records(filters=None):
+    key = _transaction_filters(filters)
+    return read_cache.get_or_load(
+        ('count_inventory_records', key), TRANSACTION_TABLE,
+        lambda: get_backend().count_inventory_records(dict(key)),
+    )
+
+def get_transaction_filter_options():
+    """Distinct product names, colors and entry types for the filter dropdowns."""
+    return read_cache.get_or_load('get_transaction_filter_options', TRANSACTION_TABLE, get_backend().get_transaction_filter_options)
+
+def get_dashboard_kpis():
+    """Returns the per-entry_type quantity totals and the total current stock.
+
+    The backend aggregates server-side, so only a handful of numbers cross the wire.
+    """
+    backend = get_backend()
+    rollup = use_daily_rollup()
+    loader = backend.get_rollup_dashboard_totals if rollup else backend.get_dashboard_totals
+    return read_cache.get_or_load(('get_dashboard_kpis', 'rollup' if rollup else 'log'), (STOCK_TABLE, TRANSACTION_TABLE), loader)
 
 def bulk_insert_transaction_records(records: list):
-    transaction_table_id = f"{BIGQUERY_PROJECT}.{BIGQUERY_DATASET}.{TRANSACTION_TABLE}"
     try:
-        errors = client.insert_rows_json(transaction_table_id, records)
-        if errors:
-            return f"Failed to insert transaction logs: {errors}"
+        error = get_backend().bulk_insert_transaction_records(records)
+        if not error:
+            _update_daily_rollup(records)
+        return error
+    finally:
+        read_cache.invalidate(TRANSACTION_TABLE)
+
+def bulk_update_product_stock(updates: list):
+    coalesced = coalesce_stock_updates(updates)
+    shortfalls = _index_shortfalls(coalesced)
+    if shortfalls:
+        labels = ', '.join(f"{u['product_name']} ({u['color']})" for u in shortfalls)
+        return f"Error: Insufficient stock for {labels}."
+    try:
+        error = write_coordinator.run(
+            [_stock_key(u) for u in coalesced],
+            lambda: get_backend().bulk_update_product_stock(coalesced),
+        )
+    finally:
+        read_cache.invalidate(STOCK_TABLE)
+    _sync_stock_index(coalesced, error)
+    return error
+
+def repair_product_stock(repairs: list):
+    """Sets drifted SKUs back to their log balance (see StorageBackend.repair_product_stock).
+
+    Returns (list of repaired SKU keys, None or an error message).
+    """
+    repaired = []
+    def operation():
+        keys, error = get_backend().repair_product_stock(repairs)
+        repaired[:] = keys
+        return error
+    try:
+        error = write_coordinator.run([_stock_key(r) for r in repairs], operation)
+    finally:
+        read_cache.invalidate(STOCK_TABLE)
+    # Quantities were set rather than adjusted, so the indexes reload instead of applying deltas.
+    stock_index.invalidate()
+    low_stock_tracker.invalidate()
+    return list(repaired), error
+
+# --- Daily rollup ---
+_rollup_state = {'updates': 0, 'failures': 0, 'last_error': None}
+# Days this process failed to mark stale in the database; retried on the next rollup check
+_rollup_unmarked_days = set()
+_rollup_lock = threading.Lock()
+
+def rollup_deltas(records: list):
+    """Sums logged records into rollup delta rows, one per (SKU, day, entry_type)."""
+    totals = {}
+    for r in records:
+        logged_at = pd.Timestamp(r['transaction_date'])
+        if logged_at.tzinfo is not None:
+            logged_at = logged_at.tz_convert('UTC')
+        key = (*(r.get(col) or '' for col in STOCK_KEY_COLUMNS), logged_at.date(), r.get('entry_type') or '')
+        quantity, transactions = totals.get(key, (0, 0))
+        totals[key] = (quantity + int(r['quantity_change'] or 0), transactions + 1)
+    return [
+        {**dict(zip(ROLLUP_KEY_COLUMNS, key)), 'quantity': quantity, 'transactions': transactions}
+        for key, (quantity, transactions) in totals.items()
+    ]
+
+def _update_daily_rollup(records):
+    """Folds freshly logged records into the rollup.
+
+    The log write has already succeeded, so a failure here does not fail the
+    caller; it marks the affected days stale in the database, and every process
+    reads the raw log until a backfill (daily_rollup.py) covering those days has run.
+    """
+    if not DAILY_ROLLUP_WRITES:
+        return
+    deltas = rollup_deltas(records)
+    error = write_coordinator.run(
+        [('daily_rollup', d['day'], *_stock_key(d)) for d in deltas],
+        lambda: get_backend().apply_rollup_deltas(deltas),
+    )
+    with _rollup_lock:
+        _rollup_state['updates'] += 1
+        if error:
+            _rollup_state['failures'] += 1
+            _rollup_state['last_error'] = error
+            _rollup_unmarked_days.update(d['day'] for d in deltas)
+    if error:
+        _mark_unmarked_days()
+
+def _mark_unmarked_days():
+    with _rollup_lock:
+        days = set(_rollup_unmarked_days)
+    if days and not get_backend().mark_rollup_stale(days):
+        with _rollup_lock:
+            _rollup_unmarked_days.difference_update(days)
+        read_cache.invalidate(DAILY_ROLLUP_TABLE)
+
+def get_rollup_stale_days():
+    """Days marked stale by any process (cached like other reads), plus any this process could not mark yet."""
+    _mark_unmarked_days()
+    stale = read_cache.get_or_load('get_rollup_stale_days', DAILY_ROLLUP_TABLE, get_backend().get_rollup_stale_days)
+    with _rollup_lock:
+        return sorted(set(stale) | _rollup_unmarked_days)
+
+def use_daily_rollup():
+    """Whether analytics and dashboard totals should read the rollup instead of the raw log."""
+    if not DAILY_ROLLUP_READS:
+        return False
+    try:
+        return not get_rollup_stale_days()
+    except Exception:
+        # Without the stale list the rollup cannot be trusted; the raw log is always correct.
+        return False
+
+def backfill_daily_rollup(start_date=None, end_date=None):
+    """Rebuilds the rollup for days in [start_date, end_date] from the log and clears their stale marks.
+
+    Returns the number of rollup rows written.
+    """
+    written = get_backend().rebuild_rollup(start_date, end_date)
+    with _rollup_lock:
+        _rollup_unmarked_days.difference_update([
+            day for day in _rollup_unmarked_days
+            if (start_date is None or day >= start_date) and (end_date is None or day <= end_date)
+        ])
+    read_cache.invalidate(DAILY_ROLLUP_TABLE)
+    read_cache.invalidate(TRANSACTION_TABLE)
+    return written
+
+def get_rollup_status():
+    try:
+        stale_days = [str(day) for day in get_rollup_stale_days()]
+    except Exception as e:
+        stale_days = f"An Error Occurred: {e}"
+    reads = use_daily_rollup()
+    with _rollup_lock:
+        return {'writes': DAILY_ROLLUP_WRITES, 'reads': reads, 'stale_days': stale_days, **_rollup_state}
+
+def _stock_key(update):
+    return tuple(update[col] or '' for col in STOCK_KEY_COLUMNS)
+
+def get_performance_snapshot():
+    """Everything the admin Performance tab shows: per-function query stats, recent jobs, cache and write counters."""
+    recent = query_stats.records()
+    return {
+        'summary': query_stats.summary(),
+        'recent': recent.tail(200).iloc[::-1] if not recent.empty else recent,
+        'read_cache': read_cache.stats(),
+        'writes': write_coordinator.stats(),
+        'daily_rollup': get_rollup_status(),
+        'stats_file': query_stats.path,
+    }
+
+def flush_query_stats():
+    return query_stats.flush()
+
+def clear_query_stats():
+    query_stats.clear()
+
+def get_write_stats():
+    """Counts of coordinated stock writes, conflict retries and writes that ran out of retries."""
+    return write_coordinator.stats()
+
+def _index_shortfalls(updates):
+    """Negative updates the stock index already knows cannot be satisfied (empty if the index is off or unavailable)."""
+    if not STOCK_INDEX or not any(u['adjustment'] < 0 for u in updates):
+        return []
+    try:
+        return stock_index.find_shortfalls(updates)
+    except Exception:
+        # The database check still applies; the index is only a shortcut.
+        return []
+
+def _sync_stock_index(updates, error):
+    if error:
+        # The write failed or only partly applied, so the indexed quantities can no longer be trusted.
+        stock_index.invalidate()
+        low_stock_tracker.invalidate()
+    else:
+        stock_index.apply(updates)
+        low_stock_tracker.apply(updates)
+
+def get_stock_quantity(product_name, color, packing_option, product_grade):
+    """Current quantity of one SKU from the in-process index (None if the SKU is not stocked)."""
+    return stock_index.get((product_name, color or '', packing_option or '', product_grade or ''))
+
+def get_stock_skus(product_name):
+    """(product_name, color, packing_option, product_grade) keys stocked for a product, from the index."""
+    return stock_index.skus_for_product(product_name)
+
+def get_stocked_product_names():
+    return stock_index.product_names()
+
+# --- Low stock ---
+def get_low_stock_alerts(product_names=None):
+    """SKUs at or below their threshold, lowest quantity first: key columns, current_quantity, threshold."""
+    rows = [(*key, quantity, threshold) for key, quantity, threshold in low_stock_tracker.alerts()]
+    df = pd.DataFrame(rows, columns=list(STOCK_KEY_COLUMNS) + ['current_quantity', 'threshold'])
+    if product_names:
+        df = df[df['product_name'].isin(product_names)].reset_index(drop=True)
+    return df
+
+def get_low_stock_count():
+    return low_stock_tracker.count()
+
+def get_low_stock_thresholds():
+    """Returns (default threshold, {SKU key: threshold} for SKUs with their own)."""
+    return low_stock_tracker.default_threshold, low_stock_tracker.overrides()
+
+def set_low_stock_threshold(product_name, color, packing_option, product_grade, threshold):
+    """Sets one SKU's low-stock threshold; None returns it to the default."""
+    try:
+        low_stock_tracker.set_threshold((product_name, color or '', packing_option or '', product_grade or ''), threshold)
         return None
     except Exception as e:
         return f"An Error Occurred: {e}"
 
-def bulk_update_product_stock(updates: list):
-    stock_table_id = f"{BIGQUERY_PROJECT}.{BIGQUERY_DATASET}.{STOCK_TABLE}"
+def set_default_low_stock_threshold(threshold):
     try:
-        using_clause_parts = []
-        for u in updates:
-            using_clause_parts.append(
-                f"('{u['product_name']}', '{u['color']}', '{u['packing_option']}', '{u['product_grade']}', {u['adjustment']})"
-            )
-        using_clause = ", ".join(using_clause_parts)
-        query = f"""
-            MERGE `{stock_table_id}` T
-            USING (
-                SELECT * FROM UNNEST([
-                    STRUCT<product_name STRING, color STRING, packing_option STRING, product_grade STRING, adjustment INT64>
-                    {using_clause}
-                ])
-            ) S
-            ON T.product_name = S.product_name AND T.color = S.color AND T.packing_option = S.packing_option AND T.product_grade = S.product_grade
-            WHEN MATCHED THEN
-              UPDATE SET current_quantity = T.current_quantity + S.adjustment
-            WHEN NOT MATCHED BY TARGET AND S.adjustment > 0 THEN
-              INSERT (product_name, color, packing_option, product_grade, current_quantity)
-              VALUES (S.product_name, S.color, S.packing_option, S.product_grade, S.adjustment)
-        """
-        client.query(query).result()
+        low_stock_tracker.set_default_threshold(threshold)
         return None
     except Exception as e:
-        return f"An Error Occurred during bulk update: {e}"
+        return f"An Error Occurred: {e}"
+
+def coalesce_stock_updates(updates: list):
+    """Sums adjustments that target the same SKU so each key appears once in a MERGE source.
+
+    Rows that net out to zero are dropped; first-seen order is kept.
+    """
+    if not updates:
+        return []
+    df = pd.DataFrame(updates, columns=[*STOCK_KEY_COLUMNS, 'adjustment'])
+    df[list(STOCK_KEY_COLUMNS)] = df[list(STOCK_KEY_COLUMNS)].fillna('')
+    df['adjustment'] = pd.to_numeric(df['adjustment']).astype('int64')
+    merged = df.groupby(list(STOCK_KEY_COLUMNS), sort=False, as_index=False)['adjustment'].sum()
+    merged = merged[merged['adjustment'] != 0]
+    return merged.to_dict('records')
 
 # --- User Authentication Functions ---
 
 def email_exists(email):
-    query = f"SELECT COUNT(1) as cnt FROM `{USER_TABLE}` WHERE email=@email"
-    job_config = bigquery.QueryJobConfig(query_parameters=[bigquery.ScalarQueryParameter("email", "STRING", email)])
-    result = client.query(query, job_config=job_config).result()
-    return next(result)["cnt"] > 0
+    return get_backend().email_exists(email)
 
 def username_exists(username):
-    query = f"SELECT COUNT(1) as cnt FROM `{USER_TABLE}` WHERE username=@username"
-    job_config = bigquery.QueryJobConfig(query_parameters=[bigquery.ScalarQueryParameter("username", "STRING", username)])
-    result = client.query(query, job_config=job_config).result()
-    return next(result)["cnt"] > 0
+    return get_backend().username_exists(username)
 
 def create_user(username, email, password):
     password_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
     user_id = str(uuid.uuid4())
-    ## FIXED: Added `allowed_transaction` to the INSERT statement with a default of 'all'
-    query = f"""
-    INSERT INTO `{USER_TABLE}` (user_id, username, email, password_hash, created_at, user_role, allowed_transaction)
-    VALUES (@user_id, @username, @email, @password_hash, CURRENT_DATETIME(), 'user', 'all')
-    """
-    query_params = [
-        bigquery.ScalarQueryParameter("user_id", "STRING", user_id),
-        bigquery.ScalarQueryParameter("username", "STRING", username),
-        bigquery.ScalarQueryParameter("email", "STRING", email),
-        bigquery.ScalarQueryParameter("password_hash", "STRING", password_hash)
-    ]
-    job_config = bigquery.QueryJobConfig(query_parameters=query_params)
-    client.query(query, job_config=job_config).result()
+    get_backend().create_user(user_id, username, email, password_hash)
 
 def authenticate(email, password):
-    ## FIXED: Added `allowed_transaction` to the SELECT statement
-    query = f"SELECT user_id, username, password_hash, user_role, allowed_transaction FROM `{USER_TABLE}` WHERE email=@email"
-    job_config = bigquery.QueryJobConfig(query_parameters=[bigquery.ScalarQueryParameter("email", "STRING", email)])
-    results = list(client.query(query, job_config=job_config).result())
-    if not results:
+    user = get_backend().get_user_credentials(email)
+    if not user:
         return False, None, None, None, None
-    user = results[0]
     if bcrypt.checkpw(password.encode(), user["password_hash"].encode()):
         return True, user["username"], user["user_id"], user["user_role"], user["allowed_transaction"]
     return False, None, None, None, None
 
 def get_all_users():
     """Fetches all users for the admin panel."""
-    ## FIXED: Added `allowed_transaction` to the SELECT statement
-    query = f"SELECT user_id, username, email, user_role, allowed_transaction FROM `{USER_TABLE}`"
-    return client.query(query).to_dataframe()
+    return get_backend().get_all_users()
 
 def update_user_role(user_id, new_role):
     """Updates the role for a specific user."""
-    query = f"UPDATE `{USER_TABLE}` SET user_role=@role WHERE user_id=@user_id"
-    query_params = [
-        bigquery.ScalarQueryParameter("role", "STRING", new_role),
-        bigquery.ScalarQueryParameter("user_id", "STRING", user_id),
-    ]
-    job_config = bigquery.QueryJobConfig(query_parameters=query_params)
-    client.query(query, job_config=job_config).result()
+    get_backend().update_user_role(user_id, new_role)
 
 def update_user_restriction(user_id, restriction_list: list):
     """Updates the allowed_transaction for a specific user."""
     restriction_value = ','.join(restriction_list) if restriction_list else 'all'
-    
-    query = f"UPDATE `{USER_TABLE}` SET allowed_transaction=@restriction WHERE user_id=@user_id"
-    query_params = [
-        bigquery.ScalarQueryParameter("restriction", "STRING", restriction_value),
-        bigquery.ScalarQueryParameter("user_id", "STRING", user_id),
-    ]
-    job_config = bigquery.QueryJobConfig(query_parameters=query_params)
-    client.query(query, job_config=job_config).result()
+    get_backend().update_user_restriction(user_id, restriction_value)
 
 def get_user_by_email(email):
-    query = f"SELECT user_id FROM `{USER_TABLE}` WHERE email=@email"
-    job_config = bigquery.QueryJobConfig(query_parameters=[bigquery.ScalarQueryParameter("email", "STRING", email)])
-    results = list(client.query(query, job_config=job_config).result())
-    return results[0] if results else None
+    return get_backend().get_user_by_email(email)
 
 def update_user_password(email, new_password):
     password_hash = bcrypt.hashpw(new_password.encode(), bcrypt.gensalt()).decode()
-    query = f"UPDATE `{USER_TABLE}` SET password_hash=@password_hash WHERE email=@email"
-    query_params = [
-        bigquery.ScalarQueryParameter("password_hash", "STRING", password_hash),
-        bigquery.ScalarQueryParameter("email", "STRING", email)
-    ]
-    job_config = bigquery.QueryJobConfig(query_parameters=query_params)
-    client.query(query, job_config=job_config).result()
+    get_backend().update_user_password(email, password_hash)
 
 def delete_user(user_id):
     """Deletes a user from the users table."""
-    query = f"DELETE FROM `{USER_TABLE}` WHERE user_id=@user_id"
-    query_params = [bigquery.ScalarQueryParameter("user_id", "STRING", user_id)]
-    job_config = bigquery.QueryJobConfig(query_parameters=query_params)
-    client.query(query, job_config=job_config).result()
+    get_backend().delete_user(user_id)
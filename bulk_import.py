@@ -0,0 +1,110 @@
+# bulk_import.py
+
+import uuid
+from datetime import datetime
+import pandas as pd
+from storage_backend import ENTRY_TYPE_SIGNS
+
+# Only admins and Sadmins may import these, as on the Correction Transaction page
+CORRECTION_TYPES = ['Correction - Add', 'Correction - Subtract']
+REQUIRED_COLUMNS = ['product_name', 'quantity']
+OPTIONAL_COLUMNS = ['entry_type', 'color', 'packing_option', 'product_grade', 'invoice_number', 'remarks']
+INVOICE_MAX_CHARS = 6
+READ_CHUNK_ROWS = 5000
+
+def read_import_file(uploaded_file, chunk_rows=READ_CHUNK_ROWS):
+    """Yields DataFrame chunks of a CSV or XLSX upload, every cell read as text.
+
+    CSV is parsed incrementally. Excel has no streaming reader in pandas, so the
+    sheet is parsed once and then handed out in the same chunk size.
+    """
+    uploaded_file.seek(0)
+    name = getattr(uploaded_file, 'name', '').lower()
+    if name.endswith(('.xlsx', '.xls')):
+        sheet = pd.read_excel(uploaded_file, dtype=str)
+        for start in range(0, len(sheet), chunk_rows):
+            yield sheet.iloc[start:start + chunk_rows]
+    else:
+        yield from pd.read_csv(uploaded_file, dtype=str, chunksize=chunk_rows, skip_blank_lines=True)
+
+def validate_import_chunk(chunk, allowed_types, default_entry_type=None, first_row_number=2):
+    """Normalizes one chunk and splits it into (valid rows, per-row errors).
+
+    All checks are vectorized column operations. `first_row_number` is the
+    spreadsheet row of the chunk's first record (row 1 is the header), so
+    error messages point at the line the user sees.
+    """
+    df = chunk.copy()
+    df.columns = [str(c).strip().lower().replace(' ', '_') for c in df.columns]
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if 'entry_type' not in df.columns and not default_entry_type:
+        missing.append('entry_type')
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+
+    for column in OPTIONAL_COLUMNS:
+        if column not in df.columns:
+            df[column] = ''
+    df = df[REQUIRED_COLUMNS + OPTIONAL_COLUMNS].fillna('')
+    text_columns = ['product_name', 'entry_type', 'color', 'packing_option', 'product_grade', 'invoice_number', 'remarks']
+    df[text_columns] = df[text_columns].apply(lambda col: col.astype(str).str.strip())
+    if default_entry_type:
+        df['entry_type'] = df['entry_type'].mask(df['entry_type'] == '', default_entry_type)
+    # Accept any capitalisation of the allowed entry types
+    canonical_types = {t.lower(): t for t in allowed_types}
+    df['entry_type'] = df['entry_type'].str.lower().map(canonical_types).fillna(df['entry_type'])
+    quantity = pd.to_numeric(df['quantity'], errors='coerce')
+    df['row_number'] = range(first_row_number, first_row_number + len(df))
+
+    checks = [
+        (df['product_name'] == '', "Product name is required"),
+        (~df['entry_type'].isin(allowed_types), f"Entry type must be one of: {', '.join(allowed_types)}"),
+        (quantity.isna() | (quantity % 1 != 0), "Quantity must be a whole number"),
+        (quantity <= 0, "Quantity must be greater than 0"),
+        (df['invoice_number'].str.len() > INVOICE_MAX_CHARS, f"Invoice number must be at most {INVOICE_MAX_CHARS} characters"),
+    ]
+    messages = pd.Series('', index=df.index)
+    for failed, message in checks:
+        failed = failed.fillna(False)
+        messages = messages.mask(failed, messages.where(messages == '', messages + '; ') + message)
+    has_error = messages != ''
+
+    errors = pd.DataFrame({'row_number': df.loc[has_error, 'row_number'], 'error': messages[has_error]})
+    valid = df.loc[~has_error].copy()
+    valid['quantity'] = quantity[~has_error].astype('int64')
+    return valid, errors
+
+def build_import_batch(valid, user_name):
+    """Turns validated rows into (transaction records, stock updates) for transaction_entry.submit_transactions."""
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    # Types without a known direction add stock, as in transaction_entry.build_transaction
+    sign = valid['entry_type'].map(ENTRY_TYPE_SIGNS).fillna(1).astype('int64')
+    records = [
+        {
+            'transaction_id': str(uuid.uuid4()), 'transaction_date': now,
+            'product_name': r['product_name'], 'color': r['color'], 'packing_option': r['packing_option'],
+            'product_grade': r['product_grade'], 'entry_type': r['entry_type'], 'quantity_change': int(r['quantity']),
+            'user_name': user_name, 'invoice_number': r['invoice_number'], 'remarks': r['remarks'],
+        }
+        for r in valid.to_dict('records')
+    ]
+    stock_updates = pd.DataFrame({
+        'product_name': valid['product_name'], 'color': valid['color'], 'packing_option': valid['packing_option'],
+        'product_grade': valid['product_grade'], 'adjustment': valid['quantity'] * sign,
+    }).to_dict('records')
+    return records, stock_updates
+
+def iter_valid_batches(chunks, allowed_types, default_entry_type=None, batch_rows=1000):
+    """Re-reads validated chunks and yields frames of at most `batch_rows` valid rows."""
+    pending, row_number = [], 2
+    for chunk in chunks:
+        valid, _ = validate_import_chunk(chunk, allowed_types, default_entry_type, row_number)
+        row_number += len(chunk)
+        pending.append(valid)
+        buffered = pd.concat(pending, ignore_index=True)
+        while len(buffered) >= batch_rows:
+            yield buffered.iloc[:batch_rows]
+            buffered = buffered.iloc[batch_rows:]
+        pending = [buffered]
+    if pending and len(pending[0]):
+        yield pending[0]
@@ -0,0 +1,56 @@
+# daily_rollup.py
+
+import argparse
+import sys
+from datetime import datetime, timedelta, timezone
+import bq_database
+
+# Backfill and check the per SKU x day x entry_type rollup.
+#
+# Rollout: enable DAILY_ROLLUP_WRITES so new transactions are folded in as they
+# are logged, then backfill the days before that (by default everything up to
+# yesterday, UTC), check, and finally enable DAILY_ROLLUP_READS. Rebuilding a day
+# that is still receiving writes can double count, so only pass --through-today
+# while writes are paused.
+
+def _parse_day(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def check_totals():
+    """Compares per-entry_type totals from the rollup with the raw log. Returns {entry_type: (log, rollup)} for mismatches."""
+    backend = bq_database.get_backend()
+    log_totals, _ = backend.get_dashboard_totals()
+    rollup_totals, _ = backend.get_rollup_dashboard_totals()
+    return {
+        entry_type: (log_totals.get(entry_type, 0), rollup_totals.get(entry_type, 0))
+        for entry_type in set(log_totals) | set(rollup_totals)
+        if log_totals.get(entry_type, 0) != rollup_totals.get(entry_type, 0)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the daily rollup from the transaction log.")
+    parser.add_argument('--since', type=_parse_day, help="first day to rebuild (YYYY-MM-DD); default: the beginning")
+    parser.add_argument('--until', type=_parse_day, help="last day to rebuild (YYYY-MM-DD); default: yesterday (UTC)")
+    parser.add_argument('--through-today', action='store_true', help="include today; only safe while writes are paused")
+    parser.add_argument('--check', action='store_true', help="only compare rollup totals with the log")
+    args = parser.parse_args()
+
+    if not args.check:
+        today = datetime.now(timezone.utc).date()
+        until = None if args.through_today and not args.until else (args.until or today - timedelta(days=1))
+        started = datetime.now()
+        written = bq_database.backfill_daily_rollup(args.since, until)
+        span = f"{args.since or 'the first day'} to {until or 'today'}"
+        print(f"Rebuilt {span}: {written} rollup rows in {(datetime.now() - started).total_seconds():.2f}s")
+
+    mismatches = check_totals()
+    if not mismatches:
+        print("Rollup totals match the transaction log.")
+        return 0
+    print("Rollup totals differ from the log (entry_type: log, rollup):")
+    for entry_type, (log_total, rollup_total) in sorted(mismatches.items()):
+        print(f"  {entry_type or '(none)'}: {log_total}, {rollup_total}")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
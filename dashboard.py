@@ -1,28 +1,26 @@
 import streamlit as st
 import pandas as pd
-from bq_database import get_inventory_records, get_all_product_stock
+from bq_database import get_dashboard_kpis, get_all_product_stock, fetch_concurrently
+
+STOCK_DISPLAY_COLUMNS = ['product_name', 'color', 'packing_option', 'product_grade', 'current_quantity']
 
 def show_dashboard():
     st.markdown("### 📊 Dashboard Overview")
     
-    # Fetch live stock data from the new 'product_stock' table
-    live_stock_df = get_all_product_stock()
-    
-    # Fetch all transaction data from the new 'inventory_transactions' table
-    transactions_df = get_inventory_records()
+    # Fetch live stock data and the per-entry_type totals (aggregated by the database) in parallel
+    live_stock_df, (entry_totals, total_current_stock) = fetch_concurrently(
+        lambda: get_all_product_stock(STOCK_DISPLAY_COLUMNS), get_dashboard_kpis
+    )
 
     if live_stock_df.empty:
         st.info("No current inventory data available.")
         return
 
-    # Calculate key metrics from the live stock and transactions
-    total_current_stock = int(live_stock_df["current_quantity"].sum())
-    
     # Metrics from the transaction log
-    total_production = int(transactions_df[transactions_df['entry_type'] == 'Production']['quantity_change'].sum())
-    total_purchase = int(transactions_df[transactions_df['entry_type'] == 'Purchase']['quantity_change'].sum())
-    total_sales = int(transactions_df[transactions_df['entry_type'] == 'Sales']['quantity_change'].sum())
-    total_breakage = int(transactions_df[transactions_df['entry_type'] == 'Breakage']['quantity_change'].sum())
+    total_production = entry_totals.get('Production', 0)
+    total_purchase = entry_totals.get('Purchase', 0)
+    total_sales = entry_totals.get('Sales', 0)
+    total_breakage = entry_totals.get('Breakage', 0)
     
     col1, col2, col3, col4, col5 = st.columns(5)
     col1.metric("Total Production", total_production)
@@ -35,7 +33,7 @@ def show_dashboard():
 
     # --- MODIFIED SECTION ---
     # 1. Define the list of columns you want to display
-    columns_to_show = ['product_name', 'color', 'packing_option', 'product_grade', 'current_quantity']
+    columns_to_show = STOCK_DISPLAY_COLUMNS
     
     # 2. Pass the filtered DataFrame to st.dataframe
     st.dataframe(live_stock_df[columns_to_show], use_container_width=True)
\ No newline at end of file
@@ -1,21 +1,21 @@
 import streamlit as st
 from datetime import datetime
-from bq_database import insert_transaction_record, update_product_stock, get_all_product_stock
+from bq_database import insert_transaction_record, update_product_stock, get_stocked_product_names, get_stock_skus, get_stock_quantity
 import uuid
 
 def show_edit_record():
     st.markdown("### 📝 Add a Correction Transaction")
     st.info("To maintain an accurate history, you should add a 'Correction' transaction instead of editing or deleting past records.")
 
-    # Fetch all unique products and their attributes to populate the dropdowns
-    stock_df = get_all_product_stock()
+    # Products and their attributes come from the in-process stock index (no table scan per rerun)
+    product_names = get_stocked_product_names()
 
-    if stock_df.empty:
+    if not product_names:
         st.warning("No products in stock. Please add a transaction first.")
         return
 
     # Create unique lists for the dropdowns
-    product_list = [""] + sorted(stock_df['product_name'].unique().tolist())
+    product_list = [""] + product_names
     
     with st.form("correction_form"):
         entered_by = st.text_input("Name of Person Entering Record*", value=st.session_state.get('user'), key="entered_by", help="Who is adding this record?")
@@ -24,13 +24,17 @@ def show_edit_record():
         
 
         selected_product = st.selectbox("Select Product Name*", options=product_list)   
-        product_specific_df = stock_df[stock_df['product_name'] == selected_product]
-        color_list = [""] + sorted(product_specific_df['color'].unique().tolist())
-        packing_list = [""] + sorted(product_specific_df['packing_option'].unique().tolist())
-        grade_list = [""] + sorted(product_specific_df['product_grade'].unique().tolist())
+        product_skus = get_stock_skus(selected_product)
+        color_list = [""] + sorted({sku[1] for sku in product_skus})
+        packing_list = [""] + sorted({sku[2] for sku in product_skus})
+        grade_list = [""] + sorted({sku[3] for sku in product_skus})
         selected_color = st.selectbox("Select Color*", options=color_list)
         selected_packing = st.selectbox("Select Packing Option*", options=packing_list)
         selected_grade = st.selectbox("Select Product Grade*", options=grade_list)
+
+        current_quantity = get_stock_quantity(selected_product, selected_color, selected_packing, selected_grade)
+        if current_quantity is not None:
+            st.caption(f"Current stock for this item: **{current_quantity}**")
             
         st.write("---")
             
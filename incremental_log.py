@@ -0,0 +1,72 @@
+# incremental_log.py
+
+import threading
+import time
+import pandas as pd
+
+class IncrementalTransactionLog:
+    """Keeps the transaction log in memory and only fetches rows newer than a watermark.
+
+    The watermark is the latest `transaction_date` seen. Each refresh re-reads a
+    short overlap window before it (rows are stamped by the client, so a slow
+    writer can land slightly "in the past") and drops ids that are already held.
+    A full reload runs every `full_reload_seconds` as a safety net.
+    """
+
+    def __init__(self, backend, overlap_seconds=300, full_reload_seconds=6 * 3600):
+        self.backend = backend
+        self.overlap = pd.Timedelta(seconds=overlap_seconds)
+        self.full_reload_seconds = full_reload_seconds
+        self._frame = None
+        self._watermark = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def watermark(self):
+        return self._watermark
+
+    def reset(self):
+        with self._lock:
+            self._frame = None
+            self._watermark = None
+
+    def get_records(self):
+        """Refreshes from the backend and returns a copy of the full log."""
+        with self._lock:
+            needs_full = self._frame is None or time.monotonic() - self._loaded_at > self.full_reload_seconds
+            if needs_full:
+                self._full_reload()
+            else:
+                self._apply_delta()
+            return self._frame.copy()
+
+    def _full_reload(self):
+        frame = self._normalize(self.backend.get_inventory_records())
+        self._frame = frame.sort_values('transaction_date', kind='stable').reset_index(drop=True)
+        self._watermark = self._frame['transaction_date'].max() if not self._frame.empty else None
+        self._loaded_at = time.monotonic()
+
+    def _apply_delta(self):
+        if self._watermark is None or pd.isna(self._watermark):
+            self._full_reload()
+            return
+        since = self._watermark - self.overlap
+        delta = self._normalize(self.backend.get_inventory_records_since(since))
+        if delta.empty:
+            return
+
+        # Only the overlap tail of the sorted frame can contain rows we fetched again.
+        split = int(self._frame['transaction_date'].searchsorted(since, side='left'))
+        head, tail = self._frame.iloc[:split], self._frame.iloc[split:]
+        delta = delta[~delta['transaction_id'].isin(tail['transaction_id'])]
+        if delta.empty:
+            return
+        tail = pd.concat([tail, delta], ignore_index=True).sort_values('transaction_date', kind='stable')
+        self._frame = pd.concat([head, tail], ignore_index=True)
+        self._watermark = max(self._watermark, delta['transaction_date'].max())
+
+    @staticmethod
+    def _normalize(df):
+        df['transaction_date'] = pd.to_datetime(df['transaction_date'], utc=True)
+        return df
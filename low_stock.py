@@ -0,0 +1,187 @@
+# low_stock.py
+
+import heapq
+import threading
+import time
+from stock_index import STOCK_KEY_COLUMNS, sku_key
+
+# Key of the threshold row that holds the default for every SKU without its own
+DEFAULT_THRESHOLD_KEY = ('', '', '', '')
+
+class LowStockTracker:
+    """In-process set of SKUs at or below their low-stock threshold, lowest quantity first.
+
+    Every SKU uses the default threshold unless it has its own. Loaded once from
+    the stock table, then the write functions pass each accepted adjustment to
+    `apply`, which re-checks only the SKUs it touches: a dict update plus a heap
+    push, O(log n). Heap entries that no longer match the SKU's current quantity
+    are skipped on read and dropped when they pile up.
+
+    To pick up stock changed by other replicas, data older than `max_age_seconds`
+    is reloaded on a background thread; reads keep answering from the current
+    data meanwhile, and never hold the lock while the stock table is read.
+
+    Thresholds live in the storage backend: `thresholds_loader` returns the rows
+    (key columns and threshold) and `thresholds_saver(key, threshold)` writes one,
+    returning None or an error. They are re-read with the stock on every reload,
+    so every replica picks up a change within `max_age_seconds`.
+    """
+
+    def __init__(self, loader, default_threshold=20, thresholds_loader=None, thresholds_saver=None, max_age_seconds=30):
+        self.loader = loader
+        self.thresholds_loader = thresholds_loader
+        self.thresholds_saver = thresholds_saver
+        self.max_age_seconds = max_age_seconds
+        self._fallback_default = default_threshold
+        self._default = default_threshold
+        self._overrides = {}
+        self._quantities = None
+        self._low = {}
+        self._heap = []
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._refreshing = False
+        self.last_error = None
+        self._lock = threading.RLock()
+
+    def _read_thresholds(self):
+        """Returns (default, {SKU key: threshold}) from the backend; the default falls back to the constructor's."""
+        if self.thresholds_loader is None:
+            return self._fallback_default, {}
+        df = self.thresholds_loader()
+        keys = zip(*(df[col].fillna('') for col in STOCK_KEY_COLUMNS))
+        thresholds = dict(zip(keys, df['threshold'].astype('int64').tolist()))
+        return thresholds.pop(DEFAULT_THRESHOLD_KEY, self._fallback_default), thresholds
+
+    def _save_threshold(self, key, threshold):
+        if self.thresholds_saver is None:
+            return
+        error = self.thresholds_saver(key, threshold)
+        if error:
+            raise RuntimeError(error)
+
+    def _ensure_fresh(self):
+        """Loads synchronously the first time; afterwards starts a background reload when the data is old."""
+        with self._lock:
+            loaded = self._quantities is not None
+            if loaded and (self._refreshing or time.monotonic() - self._loaded_at <= self.max_age_seconds):
+                return
+            if loaded:
+                self._refreshing = True
+        if not loaded:
+            self.reload()
+        else:
+            threading.Thread(target=self._background_reload, name="low-stock-refresh", daemon=True).start()
+
+    def _background_reload(self):
+        try:
+            self.reload()
+            self.last_error = None
+        except Exception as e:
+            # Keep serving the current data; the next read past max_age tries again.
+            self.last_error = str(e)
+        finally:
+            with self._lock:
+                self._refreshing = False
+                self._loaded_at = time.monotonic()
+
+    def reload(self):
+        with self._lock:
+            generation = self._generation
+        default, overrides = self._read_thresholds()
+        df = self.loader()
+        keys = zip(*(df[col].fillna('') for col in STOCK_KEY_COLUMNS))
+        quantities = dict(zip(keys, df['current_quantity'].astype('int64').tolist()))
+        with self._lock:
+            # A write or threshold change made while the tables were read may be missing; keep the current data.
+            if self._quantities is not None and generation != self._generation:
+                return
+            self._default, self._overrides = default, overrides
+            self._quantities = quantities
+            self._rebuild()
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._quantities = None
+            self._low = {}
+            self._heap = []
+            self._generation += 1
+
+    def _rebuild(self):
+        self._low = {key: qty for key, qty in self._quantities.items() if qty <= self.threshold_for(key)}
+        self._heap = [(qty, key) for key, qty in self._low.items()]
+        heapq.heapify(self._heap)
+
+    def _track(self, key):
+        quantity = self._quantities[key]
+        if quantity <= self.threshold_for(key):
+            self._low[key] = quantity
+            heapq.heappush(self._heap, (quantity, key))
+            if len(self._heap) > 2 * len(self._low) + 64:
+                self._heap = [(qty, k) for k, qty in self._low.items()]
+                heapq.heapify(self._heap)
+        else:
+            self._low.pop(key, None)
+
+    # --- Write path ---
+    def apply(self, updates):
+        """Records adjustments that the database has accepted."""
+        with self._lock:
+            if self._quantities is None:
+                return
+            self._generation += 1
+            for u in updates:
+                key = sku_key(*(u[col] for col in STOCK_KEY_COLUMNS))
+                self._quantities[key] = self._quantities.get(key, 0) + u['adjustment']
+                self._track(key)
+
+    # --- Thresholds ---
+    def threshold_for(self, key):
+        return self._overrides.get(key, self._default)
+
+    @property
+    def default_threshold(self):
+        self._ensure_fresh()
+        with self._lock:
+            return self._default
+
+    def set_default_threshold(self, threshold):
+        """Changes the threshold of every SKU without its own; re-checks the whole catalog."""
+        self._save_threshold(DEFAULT_THRESHOLD_KEY, int(threshold))
+        with self._lock:
+            self._generation += 1
+            self._default = int(threshold)
+            if self._quantities is not None:
+                self._rebuild()
+
+    def set_threshold(self, key, threshold):
+        """Sets one SKU's threshold; None returns it to the default."""
+        self._save_threshold(key, None if threshold is None else int(threshold))
+        with self._lock:
+            self._generation += 1
+            if threshold is None:
+                self._overrides.pop(key, None)
+            else:
+                self._overrides[key] = int(threshold)
+            if self._quantities is not None and key in self._quantities:
+                self._track(key)
+
+    def overrides(self):
+        self._ensure_fresh()
+        with self._lock:
+            return dict(self._overrides)
+
+    # --- Reads ---
+    def count(self):
+        self._ensure_fresh()
+        with self._lock:
+            return len(self._low)
+
+    def alerts(self, limit=None):
+        """(key, quantity, threshold) of every low SKU, lowest quantity first."""
+        self._ensure_fresh()
+        with self._lock:
+            live = [(qty, key) for qty, key in self._heap if self._low.get(key) == qty]
+            ordered = heapq.nsmallest(limit, set(live)) if limit else sorted(set(live))
+            return [(key, qty, self.threshold_for(key)) for qty, key in ordered]
@@ -0,0 +1,83 @@
+# query_stats.py
+
+import json
+import os
+import threading
+import time
+from collections import deque
+import pandas as pd
+
+QUERY_STATS_CAPACITY = int(os.getenv('QUERY_STATS_CAPACITY', '5000'))
+# When set, recorded jobs are appended to this file as JSON lines
+QUERY_STATS_FILE = os.getenv('QUERY_STATS_FILE', '')
+QUERY_STATS_FLUSH_EVERY = int(os.getenv('QUERY_STATS_FLUSH_EVERY', '100'))
+
+class QueryStatsRecorder:
+    """Bounded ring buffer of per-job statistics (latency, bytes, slots, cache hits).
+
+    Only the newest `capacity` jobs are kept in memory. With a `path`, records are
+    also appended to a JSON-lines file every `flush_every` jobs or on `flush()`.
+    """
+
+    def __init__(self, capacity=QUERY_STATS_CAPACITY, path=QUERY_STATS_FILE, flush_every=QUERY_STATS_FLUSH_EVERY):
+        self.path = path
+        self.flush_every = flush_every
+        self._records = deque(maxlen=capacity)
+        self._unflushed = []
+        self._lock = threading.Lock()
+
+    def record(self, function, wall_ms, bytes_processed=0, bytes_billed=0, slot_ms=0, cache_hit=False, rows=None, job_id=None):
+        entry = {
+            'timestamp': time.time(), 'function': function, 'wall_ms': round(wall_ms, 2),
+            'bytes_processed': bytes_processed or 0, 'bytes_billed': bytes_billed or 0,
+            'slot_ms': slot_ms or 0, 'cache_hit': bool(cache_hit), 'rows': rows, 'job_id': job_id,
+        }
+        with self._lock:
+            self._records.append(entry)
+            if self.path:
+                self._unflushed.append(entry)
+                should_flush = len(self._unflushed) >= self.flush_every
+            else:
+                should_flush = False
+        if should_flush:
+            self.flush()
+        return entry
+
+    def flush(self):
+        """Appends not-yet-written records to the stats file; returns how many were written."""
+        with self._lock:
+            pending, self._unflushed = self._unflushed, []
+        if not self.path or not pending:
+            return 0
+        with open(self.path, 'a') as f:
+            for entry in pending:
+                f.write(json.dumps(entry) + "\n")
+        return len(pending)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+    def records(self):
+        with self._lock:
+            return pd.DataFrame(list(self._records))
+
+    def summary(self):
+        """Per-function call count, p50/p95 latency, bytes and cache-hit rate, costliest first."""
+        df = self.records()
+        if df.empty:
+            return df
+        grouped = df.groupby('function')
+        summary = pd.DataFrame({
+            'calls': grouped.size(),
+            'p50_ms': grouped['wall_ms'].quantile(0.5),
+            'p95_ms': grouped['wall_ms'].quantile(0.95),
+            'total_bytes_processed': grouped['bytes_processed'].sum(),
+            'total_bytes_billed': grouped['bytes_billed'].sum(),
+            'avg_bytes_billed': grouped['bytes_billed'].mean(),
+            'total_slot_ms': grouped['slot_ms'].sum(),
+            'cache_hit_rate': grouped['cache_hit'].mean(),
+        })
+        return summary.sort_values(['total_bytes_billed', 'p95_ms'], ascending=False).reset_index()
+
+query_stats = QueryStatsRecorder()
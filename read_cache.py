@@ -0,0 +1,137 @@
+# read_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+
+def frame_size_bytes(value):
+    """Best-effort memory footprint of a cached value (DataFrames are measured deeply)."""
+    if hasattr(value, 'memory_usage'):
+        try:
+            return int(value.memory_usage(index=True, deep=True).sum())
+        except TypeError:
+            return int(value.memory_usage(index=True).sum())
+    return 0
+
+class ReadCache:
+    """Process-wide TTL + LRU cache for full-table reads, shared by all Streamlit sessions.
+
+    Every entry is tagged with the generation of the table it was read from.
+    Write functions call `invalidate(table)`, which bumps that generation, so
+    anything fetched before the write is treated as a miss afterwards. Entries
+    are evicted least-recently-used first once `max_bytes` is exceeded.
+
+    The cache only sees writes made by this process; writes from other replicas
+    become visible once the TTL expires.
+    """
+
+    def __init__(self, ttl_seconds=60, max_bytes=256 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.ttl_seconds > 0 and self.max_bytes > 0
+
+    def generation(self, table):
+        """Current generation of `table`, or a tuple of generations for a tuple of tables."""
+        with self._lock:
+            return self._generation(table)
+
+    def _generation(self, table):
+        if isinstance(table, tuple):
+            return tuple(self._generations.get(t, 0) for t in table)
+        return self._generations.get(table, 0)
+
+    @staticmethod
+    def _depends_on(entry, table):
+        return table == entry['table'] or (isinstance(entry['table'], tuple) and table in entry['table'])
+
+    def invalidate(self, table):
+        """Bumps the generation of `table` and drops its entries."""
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            for key in [k for k, entry in self._entries.items() if self._depends_on(entry, table)]:
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expired = time.monotonic() - entry['stored_at'] > self.ttl_seconds
+            stale = entry['generation'] != self._generation(entry['table'])
+            if expired or stale:
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry['value']
+
+    def put(self, key, table, value, generation):
+        size = frame_size_bytes(value)
+        with self._lock:
+            # A write landed while we were fetching, so this result may already be stale.
+            if generation != self._generation(table) or size > self.max_bytes:
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = {
+                'table': table, 'value': value, 'size': size,
+                'generation': generation, 'stored_at': time.monotonic(),
+            }
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes and self._entries:
+                oldest_key = next(iter(self._entries))
+                self._drop(oldest_key)
+                self.evictions += 1
+
+    def get_or_load(self, key, table, loader):
+        """Returns a private copy of the cached value for `key`, calling `loader()` on a miss.
+
+        `table` is the table the value is derived from, or a tuple of tables.
+
+        Concurrent misses for the same key wait for a single load instead of
+        all hitting the backend at once.
+        """
+        if not self.enabled:
+            return loader()
+        value = self.get(key)
+        if value is None:
+            with self._lock:
+                key_lock = self._key_locks.setdefault(key, threading.Lock())
+            with key_lock:
+                value = self.get(key)
+                if value is None:
+                    self.misses += 1
+                    generation = self.generation(table)
+                    value = loader()
+                    self.put(key, table, value, generation)
+                    return value.copy() if hasattr(value, 'copy') else value
+        self.hits += 1
+        # Pages reshape the frames they get back, so never hand out the shared instance.
+        return value.copy() if hasattr(value, 'copy') else value
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries), 'bytes': self._total_bytes,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+            }
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry['size']
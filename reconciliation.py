@@ -0,0 +1,189 @@
+# reconciliation.py
+
+import argparse
+import glob
+import json
+import os
+from datetime import datetime, timezone
+import pandas as pd
+import bq_database
+from stock_index import STOCK_KEY_COLUMNS
+from storage_backend import ENTRY_TYPE_SIGNS
+
+RECONCILE_CHECKPOINT_DIR = os.getenv('RECONCILE_CHECKPOINT_DIR', 'checkpoints')
+# Rows newer than this are never folded into a checkpoint, so late streaming inserts are still replayed
+RECONCILE_SETTLE_SECONDS = int(os.getenv('RECONCILE_SETTLE_SECONDS', '3600'))
+RECONCILE_KEEP_CHECKPOINTS = int(os.getenv('RECONCILE_KEEP_CHECKPOINTS', '7'))
+
+KEY_COLUMNS = list(STOCK_KEY_COLUMNS)
+
+def _empty_balances():
+    return pd.DataFrame({**{col: pd.Series(dtype=object) for col in KEY_COLUMNS}, 'expected_quantity': pd.Series(dtype='int64')})
+
+def signed_totals(transactions):
+    """Vectorized replay: sums quantity_change * sign(entry_type) per SKU.
+
+    Returns (balances frame, list of entry types that have no known sign).
+    """
+    if transactions.empty:
+        return _empty_balances(), []
+    sign = transactions['entry_type'].map(ENTRY_TYPE_SIGNS)
+    unknown = sorted(transactions.loc[sign.isna(), 'entry_type'].dropna().unique().tolist())
+    frame = transactions[KEY_COLUMNS].fillna('')
+    frame['expected_quantity'] = pd.to_numeric(transactions['quantity_change']).fillna(0).astype('int64') * sign.fillna(0).astype('int64')
+    balances = frame.groupby(KEY_COLUMNS, sort=False, as_index=False)['expected_quantity'].sum()
+    return balances, unknown
+
+def combine_balances(*frames):
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return _empty_balances()
+    return pd.concat(frames, ignore_index=True).groupby(KEY_COLUMNS, sort=False, as_index=False)['expected_quantity'].sum()
+
+# --- Checkpoints ---
+def save_checkpoint(cutoff, balances, directory=RECONCILE_CHECKPOINT_DIR, keep=RECONCILE_KEEP_CHECKPOINTS):
+    """Stores the per-SKU balances of every transaction before `cutoff`."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"stock_checkpoint_{cutoff.strftime('%Y%m%dT%H%M%S')}.json")
+    payload = {
+        'cutoff': cutoff.isoformat(),
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'balances': balances[KEY_COLUMNS + ['expected_quantity']].values.tolist(),
+    }
+    with open(path + '.tmp', 'w') as f:
+        json.dump(payload, f, default=int)
+    os.replace(path + '.tmp', path)
+    for old in list_checkpoints(directory)[:-keep]:
+        os.remove(old)
+    return path
+
+def list_checkpoints(directory=RECONCILE_CHECKPOINT_DIR):
+    """Checkpoint paths in the directory, oldest cutoff first."""
+    return sorted(glob.glob(os.path.join(directory, 'stock_checkpoint_*.json')))
+
+def checkpoint_cutoff(path):
+    """Cutoff encoded in a checkpoint file name, without opening the file."""
+    stamp = os.path.basename(path)[len('stock_checkpoint_'):-len('.json')]
+    return pd.Timestamp(datetime.strptime(stamp, '%Y%m%dT%H%M%S'), tz='UTC')
+
+def load_checkpoint(path):
+    """Returns (cutoff, balances) stored in one checkpoint file."""
+    with open(path) as f:
+        payload = json.load(f)
+    balances = pd.DataFrame(payload['balances'], columns=KEY_COLUMNS + ['expected_quantity'])
+    balances['expected_quantity'] = balances['expected_quantity'].astype('int64')
+    return pd.Timestamp(payload['cutoff']), balances
+
+def load_latest_checkpoint(directory=RECONCILE_CHECKPOINT_DIR):
+    """Returns (cutoff, balances) of the newest checkpoint, or (None, None)."""
+    paths = list_checkpoints(directory)
+    if not paths:
+        return None, None
+    return load_checkpoint(paths[-1])
+
+# --- Reconciliation ---
+def stock_deltas(backend, start=None, end=None):
+    """Signed per-SKU sums of the log rows in [start, end), computed by the backend."""
+    deltas = backend.get_stock_deltas(start, end)
+    if deltas.empty:
+        return _empty_balances()
+    deltas = deltas[KEY_COLUMNS + ['expected_quantity']].copy()
+    deltas['expected_quantity'] = pd.to_numeric(deltas['expected_quantity']).fillna(0).astype('int64')
+    return deltas
+
+def find_mismatches(expected, stock):
+    """Outer-joins log-derived balances with product_stock and keeps the rows that disagree."""
+    actual = stock[KEY_COLUMNS].fillna('')
+    actual['actual_quantity'] = pd.to_numeric(stock['current_quantity']).fillna(0).astype('int64')
+    merged = expected.merge(actual, on=KEY_COLUMNS, how='outer')
+    merged[['expected_quantity', 'actual_quantity']] = merged[['expected_quantity', 'actual_quantity']].fillna(0).astype('int64')
+    merged['difference'] = merged['actual_quantity'] - merged['expected_quantity']
+    return merged[merged['difference'] != 0].reset_index(drop=True)
+
+def reconcile(full=False, repair=False, directory=RECONCILE_CHECKPOINT_DIR, settle_seconds=RECONCILE_SETTLE_SECONDS):
+    """Rebuilds expected stock from the transaction log and compares it with product_stock.
+
+    The backend sums the log per SKU, so only one row per SKU is fetched however
+    long the log is. Incremental runs start from the newest checkpoint and only
+    sum the rows at or after its cutoff. Every run writes a new checkpoint up to
+    `now - settle_seconds`. With `repair`, product_stock is set to match the log,
+    which is treated as the source of truth. The log and stock reads are not one
+    snapshot, so each mismatch is re-checked inside the repair write and SKUs
+    whose stock or log moved since are skipped (listed in `repair_skipped`).
+    """
+    backend = bq_database.get_backend()
+    cutoff, base = (None, None) if full else load_latest_checkpoint(directory)
+    if cutoff is None:
+        base = _empty_balances()
+
+    new_cutoff = pd.Timestamp.now(tz='UTC').floor('s') - pd.Timedelta(seconds=settle_seconds)
+    if cutoff is None or new_cutoff > cutoff:
+        settled_balances = stock_deltas(backend, cutoff, new_cutoff)
+        recent_start = new_cutoff
+    else:
+        settled_balances = _empty_balances()
+        recent_start = cutoff
+    recent_balances = stock_deltas(backend, recent_start)
+    unknown = sorted(set(backend.get_transaction_filter_options()['entry_type']) - set(ENTRY_TYPE_SIGNS))
+
+    checkpoint_path = None
+    if cutoff is None or new_cutoff > cutoff:
+        checkpoint_path = save_checkpoint(new_cutoff, combine_balances(base, settled_balances), directory)
+
+    expected = combine_balances(base, settled_balances, recent_balances)
+    mismatches = find_mismatches(expected, backend.get_all_product_stock())
+
+    report = {
+        'mode': 'incremental' if cutoff is not None else 'full',
+        'replayed_skus': len(combine_balances(settled_balances, recent_balances)),
+        'skus_checked': len(expected),
+        'mismatches': mismatches,
+        'unknown_entry_types': unknown,
+        'checkpoint': checkpoint_path,
+        'repaired': [],
+        'repair_skipped': [],
+        'repair_error': None,
+    }
+    if repair and not mismatches.empty:
+        repairs = [
+            {**{col: row[col] for col in KEY_COLUMNS}, 'difference': int(row['difference'])}
+            for row in mismatches.to_dict('records')
+        ]
+        report['repaired'], report['repair_error'] = bq_database.repair_product_stock(repairs)
+        done = set(report['repaired'])
+        report['repair_skipped'] = [key for key in (tuple(r[col] for col in KEY_COLUMNS) for r in repairs) if key not in done]
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Check product_stock against the transaction log.")
+    parser.add_argument('--full', action='store_true', help="ignore checkpoints and replay the whole log")
+    parser.add_argument('--repair', action='store_true',
+                        help="set product_stock to match the log; SKUs written to since the check are skipped, run again to retry them")
+    parser.add_argument('--checkpoint-dir', default=RECONCILE_CHECKPOINT_DIR)
+    args = parser.parse_args()
+
+    started = datetime.now()
+    report = reconcile(full=args.full, repair=args.repair, directory=args.checkpoint_dir)
+    elapsed = (datetime.now() - started).total_seconds()
+
+    print(f"{report['mode'].title()} reconciliation: replayed {report['replayed_skus']} SKU(s), "
+          f"checked {report['skus_checked']} SKUs in {elapsed:.2f}s")
+    if report['unknown_entry_types']:
+        print(f"Ignored unknown entry types: {', '.join(report['unknown_entry_types'])}")
+    if report['mismatches'].empty:
+        print("product_stock matches the transaction log.")
+    else:
+        print(f"{len(report['mismatches'])} SKU(s) out of sync:")
+        print(report['mismatches'].to_string(index=False))
+        if args.repair:
+            if report['repair_error']:
+                print(f"Repair failed: {report['repair_error']}")
+            print(f"Repaired {len(report['repaired'])} SKU(s).")
+            if report['repair_skipped'] and not report['repair_error']:
+                print(f"Skipped {len(report['repair_skipped'])} SKU(s) that changed since the check or have a negative log balance; "
+                      "run again to retry them.")
+    if report['checkpoint']:
+        print(f"Checkpoint written: {report['checkpoint']}")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import streamlit as st
-from bq_database import email_exists, username_exists, create_user, authenticate, update_user_password
+
+# bq_database (and pandas with it) is imported only once a form is submitted,
+# so the login screen renders without loading the data stack.
 
 def forgot_password_ui():
     st.subheader("🔒 Forgot Password")
@@ -9,6 +11,7 @@ def forgot_password_ui():
         confirm_password = st.text_input("Confirm new password", type="password")
         submitted = st.form_submit_button("Reset Password")
         if submitted:
+            from bq_database import email_exists, update_user_password
             if not email_exists(email):
                 st.error("No account found with this email.")
             elif new_password != confirm_password:
@@ -28,6 +31,7 @@ def register_ui():
         password = st.text_input("Password", type="password", placeholder="At least 6 characters")
         submitted = st.form_submit_button("Register")
         if submitted:
+            from bq_database import email_exists, username_exists, create_user
             if username_exists(username):
                 st.error("Username already taken.")
             elif email_exists(email):
@@ -45,6 +49,7 @@ def login_ui():
         password = st.text_input("Password", type="password")
         submitted = st.form_submit_button("Login")
         if submitted:
+            from bq_database import authenticate
             valid, username, user_id, role, allowed_transaction = authenticate(email, password)
             if valid:
                 st.success(f"Welcome, {username}!")
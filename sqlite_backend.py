@@ -0,0 +1,603 @@
+# sqlite_backend.py
+
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+import pandas as pd
+from storage_backend import (
+    StorageBackend, INFLOW_TYPES, OUTFLOW_TYPES, STOCK_INCREASE_TYPES, STOCK_DECREASE_TYPES,
+    STOCK_COLUMNS, TRANSACTION_COLUMNS, ROLLUP_COLUMNS, select_list,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS product_stock (
+    product_name TEXT NOT NULL,
+    color TEXT NOT NULL DEFAULT '',
+    packing_option TEXT NOT NULL DEFAULT '',
+    product_grade TEXT NOT NULL DEFAULT '',
+    current_quantity INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (product_name, color, packing_option, product_grade)
+);
+CREATE TABLE IF NOT EXISTS inventory_transactions (
+    transaction_id TEXT PRIMARY KEY,
+    transaction_date TEXT NOT NULL,
+    product_name TEXT,
+    color TEXT,
+    packing_option TEXT,
+    product_grade TEXT,
+    entry_type TEXT,
+    quantity_change INTEGER,
+    user_name TEXT,
+    invoice_number TEXT,
+    remarks TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_date ON inventory_transactions (transaction_date, transaction_id);
+CREATE TABLE IF NOT EXISTS daily_rollup (
+    day TEXT NOT NULL,
+    product_name TEXT NOT NULL DEFAULT '',
+    color TEXT NOT NULL DEFAULT '',
+    packing_option TEXT NOT NULL DEFAULT '',
+    product_grade TEXT NOT NULL DEFAULT '',
+    entry_type TEXT NOT NULL DEFAULT '',
+    quantity INTEGER NOT NULL DEFAULT 0,
+    transactions INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, product_name, color, packing_option, product_grade, entry_type)
+);
+CREATE TABLE IF NOT EXISTS daily_rollup_stale (
+    day TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS low_stock_thresholds (
+    product_name TEXT NOT NULL DEFAULT '',
+    color TEXT NOT NULL DEFAULT '',
+    packing_option TEXT NOT NULL DEFAULT '',
+    product_grade TEXT NOT NULL DEFAULT '',
+    threshold INTEGER NOT NULL,
+    PRIMARY KEY (product_name, color, packing_option, product_grade)
+);
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    username TEXT UNIQUE,
+    email TEXT UNIQUE,
+    password_hash TEXT,
+    created_at TEXT,
+    user_role TEXT,
+    allowed_transaction TEXT
+);
+"""
+
+class SQLiteBackend(StorageBackend):
+    """Embedded single-file backend for offline use, local development and benchmarks.
+
+    One connection is shared by every Streamlit session thread; access is
+    serialized with a lock so each write is a single local transaction.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def _read_frame(self, query, params=()):
+        with self._lock:
+            return pd.read_sql_query(query, self._conn, params=params)
+
+    @staticmethod
+    def _apply_adjustment(cursor, product_name, color, packing_option, product_grade, adjustment):
+        cursor.execute(
+            """
+            UPDATE product_stock SET current_quantity = current_quantity + ?
+            WHERE product_name = ? AND color = ? AND packing_option = ? AND product_grade = ?
+            """,
+            (adjustment, product_name, color, packing_option, product_grade),
+        )
+        if cursor.rowcount == 0 and adjustment > 0:
+            cursor.execute(
+                """
+                INSERT INTO product_stock (product_name, color, packing_option, product_grade, current_quantity)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (product_name, color, packing_option, product_grade, adjustment),
+            )
+
+    # --- Inventory-related methods ---
+    def update_product_stock(self, product_name, color, packing_option, product_grade, quantity_adjustment):
+        try:
+            with self._lock, self._conn:
+                cursor = self._conn.cursor()
+                if quantity_adjustment < 0:
+                    # Conditional decrement: the sufficiency check is part of the UPDATE itself.
+                    cursor.execute(
+                        """
+                        UPDATE product_stock SET current_quantity = current_quantity + ?
+                        WHERE product_name = ? AND color = ? AND packing_option = ? AND product_grade = ?
+                          AND current_quantity + ? >= 0
+                        """,
+                        (quantity_adjustment, product_name, color, packing_option, product_grade, quantity_adjustment),
+                    )
+                    if cursor.rowcount == 0:
+                        return f"Error: Insufficient stock for {product_name} ({color})."
+                else:
+                    self._apply_adjustment(cursor, product_name, color, packing_option, product_grade, quantity_adjustment)
+            return None
+        except Exception as e:
+            return f"An Error Occurred: {e}"
+
+    def bulk_update_product_stock(self, updates: list):
+        try:
+            with self._lock, self._conn:
+                cursor = self._conn.cursor()
+                shortfalls = []
+                for u in updates:
+                    if u['adjustment'] < 0:
+                        cursor.execute(
+                            """
+                            UPDATE product_stock SET current_quantity = current_quantity + ?
+                            WHERE product_name = ? AND color = ? AND packing_option = ? AND product_grade = ?
+                              AND current_quantity + ? >= 0
+                            """,
+                            (u['adjustment'], u['product_name'], u['color'], u['packing_option'], u['product_grade'], u['adjustment']),
+                        )
+                        if cursor.rowcount == 0:
+                            shortfalls.append(f"{u['product_name']} ({u['color']})")
+                    else:
+                        self._apply_adjustment(
+                            cursor, u['product_name'], u['color'], u['packing_option'], u['product_grade'], u['adjustment']
+                        )
+                if shortfalls:
+                    # All or nothing, like the BigQuery script.
+                    self._conn.rollback()
+                    return f"Error: Insufficient stock for {', '.join(shortfalls)}."
+            return None
+        except Exception as e:
+            return f"An Error Occurred during bulk update: {e}"
+
+    def repair_product_stock(self, repairs: list):
+        increase = ", ".join("?" for _ in STOCK_INCREASE_TYPES)
+        decrease = ", ".join("?" for _ in STOCK_DECREASE_TYPES)
+        balance = f"""(
+            SELECT IFNULL(SUM(CASE WHEN entry_type IN ({increase}) THEN quantity_change
+                                   WHEN entry_type IN ({decrease}) THEN -quantity_change ELSE 0 END), 0)
+            FROM inventory_transactions
+            WHERE product_name = ? AND IFNULL(color, '') = ? AND IFNULL(packing_option, '') = ? AND IFNULL(product_grade, '') = ?
+        )"""
+        repaired = []
+        try:
+            # The first statement is a write, so the database is locked before the log is re-read.
+            with self._lock, self._conn:
+                for r in repairs:
+                    key = (r['product_name'], r['color'], r['packing_option'], r['product_grade'])
+                    log_params = (*STOCK_INCREASE_TYPES, *STOCK_DECREASE_TYPES, *key)
+                    cursor = self._conn.execute(
+                        f"""
+                        UPDATE product_stock SET current_quantity = {balance}
+                        WHERE product_name = ? AND color = ? AND packing_option = ? AND product_grade = ?
+                          AND current_quantity - {balance} = ? AND {balance} >= 0
+                        """,
+                        (*log_params, *key, *log_params, r['difference'], *log_params),
+                    )
+                    if cursor.rowcount == 0:
+                        # A SKU missing from product_stock counts as 0 on hand.
+                        cursor = self._conn.execute(
+                            f"""
+                            INSERT INTO product_stock (product_name, color, packing_option, product_grade, current_quantity)
+                            SELECT ?, ?, ?, ?, balance FROM (SELECT {balance} AS balance)
+                            WHERE -balance = ? AND balance >= 0 AND NOT EXISTS (
+                                SELECT 1 FROM product_stock
+                                WHERE product_name = ? AND color = ? AND packing_option = ? AND product_grade = ?
+                            )
+                            """,
+                            (*key, *log_params, r['difference'], *key),
+                        )
+                    if cursor.rowcount:
+                        repaired.append(key)
+            return repaired, None
+        except Exception as e:
+            return [], f"An Error Occurred during stock repair: {e}"
+
+    def insert_transaction_record(self, record: dict):
+        try:
+            self._insert_records([record])
+            return None
+        except Exception as e:
+            return f"An Error Occurred: {e}"
+
+    def bulk_insert_transaction_records(self, records: list):
+        try:
+            self._insert_records(records)
+            return None
+        except Exception as e:
+            return f"An Error Occurred: {e}"
+
+    def _insert_records(self, records):
+        placeholders = ", ".join("?" for _ in TRANSACTION_COLUMNS)
+        rows = [tuple(r.get(col) for col in TRANSACTION_COLUMNS) for r in records]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT INTO inventory_transactions ({', '.join(TRANSACTION_COLUMNS)}) VALUES ({placeholders})",
+                rows,
+            )
+
+    def get_all_product_stock(self, columns=None):
+        return self._read_frame(f"SELECT {select_list(columns, STOCK_COLUMNS)} FROM product_stock")
+
+    def get_inventory_records(self, columns=None):
+        return self._transaction_frame(f"SELECT {select_list(columns, TRANSACTION_COLUMNS)} FROM inventory_transactions")
+
+    def get_inventory_records_since(self, since):
+        return self._transaction_frame(
+            "SELECT * FROM inventory_transactions WHERE transaction_date >= ?",
+            (since.strftime('%Y-%m-%d %H:%M:%S'),),
+        )
+
+    def _transaction_frame(self, query, params=()):
+        df = self._read_frame(query, params)
+        # BigQuery hands back TIMESTAMP columns as tz-aware UTC values; mirror that for the pages.
+        if 'transaction_date' in df.columns:
+            df['transaction_date'] = pd.to_datetime(df['transaction_date'], utc=True)
+        return df
+
+    @staticmethod
+    def _transaction_filter_clause(filters, after=None):
+        conditions, params = [], []
+        for column in ('product_name', 'color', 'entry_type'):
+            if filters.get(column):
+                conditions.append(f"{column} = ?")
+                params.append(filters[column])
+        if filters.get('product_names'):
+            conditions.append(f"product_name IN ({', '.join('?' for _ in filters['product_names'])})")
+            params.extend(filters['product_names'])
+        if filters.get('invoice_number'):
+            conditions.append("instr(lower(IFNULL(invoice_number, '')), lower(?)) > 0")
+            params.append(filters['invoice_number'])
+        if filters.get('start_date'):
+            conditions.append("transaction_date >= ?")
+            params.append(filters['start_date'].strftime('%Y-%m-%d'))
+        if filters.get('end_date'):
+            conditions.append("transaction_date < ?")
+            params.append((filters['end_date'] + timedelta(days=1)).strftime('%Y-%m-%d'))
+        if after is not None:
+            after_ts = after[0].strftime('%Y-%m-%d %H:%M:%S')
+            conditions.append("(transaction_date < ? OR (transaction_date = ? AND transaction_id < ?))")
+            params.extend([after_ts, after_ts, after[1]])
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, params
+
+    def query_inventory_records(self, filters, page_size, after=None):
+        where, params = self._transaction_filter_clause(filters, after)
+        query = f"""
+            SELECT * FROM inventory_transactions
+            {where}
+            ORDER BY transaction_date DESC, transaction_id DESC
+            LIMIT ?
+        """
+        return self._transaction_frame(query, (*params, int(page_size)))
+
+    def count_inventory_records(self, filters):
+        where, params = self._transaction_filter_clause(filters)
+        with self._lock:
+            row = self._conn.execute(f"SELECT COUNT(1) AS cnt FROM inventory_transactions {where}", params).fetchone()
+        return row["cnt"]
+
+    def get_transaction_filter_options(self):
+        options = {}
+        with self._lock:
+            for column in ('product_name', 'color', 'entry_type'):
+                rows = self._conn.execute(
+                    f"SELECT DISTINCT {column} FROM inventory_transactions WHERE {column} IS NOT NULL ORDER BY {column}"
+                ).fetchall()
+                options[column] = [row[0] for row in rows]
+        return options
+
+    # --- Analytics aggregates ---
+    def get_transaction_date_range(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(transaction_date) AS first_date, MAX(transaction_date) AS last_date FROM inventory_transactions"
+            ).fetchone()
+        if row["first_date"] is None:
+            return None, None
+        return pd.Timestamp(row["first_date"], tz='UTC'), pd.Timestamp(row["last_date"], tz='UTC')
+
+    def get_daily_flow(self, filters):
+        where, params = self._transaction_filter_clause(filters)
+        inflow = ", ".join("?" for _ in INFLOW_TYPES)
+        outflow = ", ".join("?" for _ in OUTFLOW_TYPES)
+        query = f"""
+            SELECT
+              substr(transaction_date, 1, 10) AS day,
+              SUM(CASE WHEN entry_type IN ({inflow}) THEN quantity_change ELSE 0 END) AS inflow,
+              SUM(CASE WHEN entry_type IN ({outflow}) THEN quantity_change ELSE 0 END) AS outflow
+            FROM inventory_transactions
+            {where}
+            GROUP BY day
+            ORDER BY day
+        """
+        df = self._read_frame(query, (*INFLOW_TYPES, *OUTFLOW_TYPES, *params))
+        df['day'] = pd.to_datetime(df['day']).dt.date
+        return df
+
+    def get_sales_by_product(self, filters, limit):
+        where, params = self._transaction_filter_clause({**filters, 'entry_type': 'Sales'})
+        query = f"""
+            SELECT product_name, SUM(quantity_change) AS quantity_change, SUM(SUM(quantity_change)) OVER () AS total_sales
+            FROM inventory_transactions
+            {where}
+            GROUP BY product_name
+            ORDER BY quantity_change DESC
+            LIMIT ?
+        """
+        return self._read_frame(query, (*params, int(limit)))
+
+    def get_stock_distribution(self, product_names=None):
+        where, params = "", ()
+        if product_names:
+            where = f"WHERE product_name IN ({', '.join('?' for _ in product_names)})"
+            params = tuple(product_names)
+        return self._read_frame(
+            f"SELECT product_name, SUM(current_quantity) AS current_quantity FROM product_stock {where} GROUP BY product_name",
+            params,
+        )
+
+    def get_dashboard_totals(self):
+        query = """
+            SELECT entry_type, SUM(quantity_change) AS total FROM inventory_transactions
+            WHERE entry_type IS NOT NULL GROUP BY entry_type
+            UNION ALL
+            SELECT NULL AS entry_type, SUM(current_quantity) AS total FROM product_stock
+        """
+        entry_totals, total_stock = {}, 0
+        with self._lock:
+            rows = self._conn.execute(query).fetchall()
+        for row in rows:
+            if row["entry_type"] is None:
+                total_stock = int(row["total"] or 0)
+            else:
+                entry_totals[row["entry_type"]] = int(row["total"] or 0)
+        return entry_totals, total_stock
+
+    # --- Point-in-time stock ---
+    def get_stock_deltas(self, start=None, end=None):
+        # Dates are stored to the second, so rounding a bound up keeps both comparisons exact.
+        conditions, params = [], []
+        if start is not None:
+            conditions.append("transaction_date >= ?")
+            params.append(start.ceil('s').strftime('%Y-%m-%d %H:%M:%S'))
+        if end is not None:
+            conditions.append("transaction_date < ?")
+            params.append(end.ceil('s').strftime('%Y-%m-%d %H:%M:%S'))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        increase = ", ".join("?" for _ in STOCK_INCREASE_TYPES)
+        decrease = ", ".join("?" for _ in STOCK_DECREASE_TYPES)
+        query = f"""
+            SELECT IFNULL(product_name, '') AS product_name, IFNULL(color, '') AS color,
+                   IFNULL(packing_option, '') AS packing_option, IFNULL(product_grade, '') AS product_grade,
+                   SUM(CASE WHEN entry_type IN ({increase}) THEN quantity_change
+                            WHEN entry_type IN ({decrease}) THEN -quantity_change ELSE 0 END) AS expected_quantity
+            FROM inventory_transactions
+            {where}
+            GROUP BY 1, 2, 3, 4
+        """
+        return self._read_frame(query, (*STOCK_INCREASE_TYPES, *STOCK_DECREASE_TYPES, *params))
+
+    def get_sku_history(self, product_name, color, packing_option, product_grade):
+        query = """
+            SELECT transaction_date, entry_type, quantity_change FROM inventory_transactions
+            WHERE product_name = ? AND IFNULL(color, '') = ? AND IFNULL(packing_option, '') = ? AND IFNULL(product_grade, '') = ?
+            ORDER BY transaction_date, transaction_id
+        """
+        return self._transaction_frame(query, (product_name, color or '', packing_option or '', product_grade or ''))
+
+    # --- Daily rollup ---
+    def apply_rollup_deltas(self, deltas: list):
+        try:
+            rows = [tuple(str(d[col]) if col == 'day' else d[col] for col in ROLLUP_COLUMNS) for d in deltas]
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    f"""
+                    INSERT INTO daily_rollup ({', '.join(ROLLUP_COLUMNS)}) VALUES ({', '.join('?' for _ in ROLLUP_COLUMNS)})
+                    ON CONFLICT (day, product_name, color, packing_option, product_grade, entry_type) DO UPDATE SET
+                      quantity = quantity + excluded.quantity,
+                      transactions = transactions + excluded.transactions
+                    """,
+                    rows,
+                )
+            return None
+        except Exception as e:
+            return f"An Error Occurred: {e}"
+
+    def rebuild_rollup(self, start_date=None, end_date=None):
+        day_conditions, log_conditions, day_params, log_params = [], [], [], []
+        if start_date:
+            day_conditions.append("day >= ?")
+            log_conditions.append("transaction_date >= ?")
+            day_params.append(start_date.strftime('%Y-%m-%d'))
+            log_params.append(start_date.strftime('%Y-%m-%d'))
+        if end_date:
+            day_conditions.append("day <= ?")
+            log_conditions.append("transaction_date < ?")
+            day_params.append(end_date.strftime('%Y-%m-%d'))
+            log_params.append((end_date + timedelta(days=1)).strftime('%Y-%m-%d'))
+        day_where = f"WHERE {' AND '.join(day_conditions)}" if day_conditions else ""
+        log_where = f"WHERE {' AND '.join(log_conditions)}" if log_conditions else ""
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM daily_rollup {day_where}", day_params)
+            self._conn.execute(f"DELETE FROM daily_rollup_stale {day_where}", day_params)
+            cursor = self._conn.execute(
+                f"""
+                INSERT INTO daily_rollup ({', '.join(ROLLUP_COLUMNS)})
+                SELECT IFNULL(product_name, ''), IFNULL(color, ''), IFNULL(packing_option, ''), IFNULL(product_grade, ''),
+                       substr(transaction_date, 1, 10), IFNULL(entry_type, ''), SUM(quantity_change), COUNT(1)
+                FROM inventory_transactions
+                {log_where}
+                GROUP BY 1, 2, 3, 4, 5, 6
+                """,
+                log_params,
+            )
+            return cursor.rowcount
+
+    def mark_rollup_stale(self, days):
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO daily_rollup_stale (day) VALUES (?)", [(str(day),) for day in days]
+                )
+            return None
+        except Exception as e:
+            return f"An Error Occurred: {e}"
+
+    def get_rollup_stale_days(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT day FROM daily_rollup_stale ORDER BY day").fetchall()
+        return [datetime.strptime(row["day"], '%Y-%m-%d').date() for row in rows]
+
+    @staticmethod
+    def _rollup_filter_clause(filters):
+        conditions, params = [], []
+        for column in ('product_name', 'color', 'entry_type'):
+            if filters.get(column):
+                conditions.append(f"{column} = ?")
+                params.append(filters[column])
+        if filters.get('product_names'):
+            conditions.append(f"product_name IN ({', '.join('?' for _ in filters['product_names'])})")
+            params.extend(filters['product_names'])
+        if filters.get('start_date'):
+            conditions.append("day >= ?")
+            params.append(filters['start_date'].strftime('%Y-%m-%d'))
+        if filters.get('end_date'):
+            conditions.append("day <= ?")
+            params.append(filters['end_date'].strftime('%Y-%m-%d'))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, params
+
+    def get_rollup_daily_flow(self, filters):
+        where, params = self._rollup_filter_clause(filters)
+        inflow = ", ".join("?" for _ in INFLOW_TYPES)
+        outflow = ", ".join("?" for _ in OUTFLOW_TYPES)
+        query = f"""
+            SELECT
+              day,
+              SUM(CASE WHEN entry_type IN ({inflow}) THEN quantity ELSE 0 END) AS inflow,
+              SUM(CASE WHEN entry_type IN ({outflow}) THEN quantity ELSE 0 END) AS outflow
+            FROM daily_rollup
+            {where}
+            GROUP BY day
+            ORDER BY day
+        """
+        df = self._read_frame(query, (*INFLOW_TYPES, *OUTFLOW_TYPES, *params))
+        df['day'] = pd.to_datetime(df['day']).dt.date
+        return df
+
+    def get_rollup_sales_by_product(self, filters, limit):
+        where, params = self._rollup_filter_clause({**filters, 'entry_type': 'Sales'})
+        query = f"""
+            SELECT product_name, SUM(quantity) AS quantity_change, SUM(SUM(quantity)) OVER () AS total_sales
+            FROM daily_rollup
+            {where}
+            GROUP BY product_name
+            ORDER BY quantity_change DESC
+            LIMIT ?
+        """
+        return self._read_frame(query, (*params, int(limit)))
+
+    def get_rollup_dashboard_totals(self):
+        query = """
+            SELECT entry_type, SUM(quantity) AS total FROM daily_rollup
+            WHERE entry_type != '' GROUP BY entry_type
+            UNION ALL
+            SELECT NULL AS entry_type, SUM(current_quantity) AS total FROM product_stock
+        """
+        entry_totals, total_stock = {}, 0
+        with self._lock:
+            rows = self._conn.execute(query).fetchall()
+        for row in rows:
+            if row["entry_type"] is None:
+                total_stock = int(row["total"] or 0)
+            else:
+                entry_totals[row["entry_type"]] = int(row["total"] or 0)
+        return entry_totals, total_stock
+
+    # --- Low-stock thresholds ---
+    def get_low_stock_thresholds(self):
+        return self._read_frame("SELECT product_name, color, packing_option, product_grade, threshold FROM low_stock_thresholds")
+
+    def set_low_stock_threshold(self, key, threshold):
+        try:
+            with self._lock, self._conn:
+                if threshold is None:
+                    self._conn.execute(
+                        """
+                        DELETE FROM low_stock_thresholds
+                        WHERE product_name = ? AND color = ? AND packing_option = ? AND product_grade = ?
+                        """,
+                        key,
+                    )
+                else:
+                    self._conn.execute(
+                        """
+                        INSERT INTO low_stock_thresholds (product_name, color, packing_option, product_grade, threshold)
+                        VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT (product_name, color, packing_option, product_grade) DO UPDATE SET threshold = excluded.threshold
+                        """,
+                        (*key, int(threshold)),
+                    )
+            return None
+        except Exception as e:
+            return f"An Error Occurred: {e}"
+
+    # --- User-related methods ---
+    def email_exists(self, email):
+        with self._lock:
+            row = self._conn.execute("SELECT COUNT(1) AS cnt FROM users WHERE email = ?", (email,)).fetchone()
+        return row["cnt"] > 0
+
+    def username_exists(self, username):
+        with self._lock:
+            row = self._conn.execute("SELECT COUNT(1) AS cnt FROM users WHERE username = ?", (username,)).fetchone()
+        return row["cnt"] > 0
+
+    def create_user(self, user_id, username, email, password_hash):
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO users (user_id, username, email, password_hash, created_at, user_role, allowed_transaction)
+                VALUES (?, ?, ?, ?, datetime('now'), 'user', 'all')
+                """,
+                (user_id, username, email, password_hash),
+            )
+
+    def get_user_credentials(self, email):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT user_id, username, password_hash, user_role, allowed_transaction FROM users WHERE email = ?",
+                (email,),
+            ).fetchone()
+
+    def get_all_users(self):
+        return self._read_frame("SELECT user_id, username, email, user_role, allowed_transaction FROM users")
+
+    def update_user_role(self, user_id, new_role):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE users SET user_role = ? WHERE user_id = ?", (new_role, user_id))
+
+    def update_user_restriction(self, user_id, restriction_value):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE users SET allowed_transaction = ? WHERE user_id = ?", (restriction_value, user_id))
+
+    def get_user_by_email(self, email):
+        with self._lock:
+            return self._conn.execute("SELECT user_id FROM users WHERE email = ?", (email,)).fetchone()
+
+    def update_user_password(self, email, password_hash):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE users SET password_hash = ? WHERE email = ?", (password_hash, email))
+
+    def delete_user(self, user_id):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
@@ -0,0 +1,153 @@
+# stock_history.py
+
+import argparse
+import os
+import sys
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+import bq_database
+from bq_database import read_cache, TRANSACTION_TABLE
+from reconciliation import (
+    KEY_COLUMNS, RECONCILE_CHECKPOINT_DIR, RECONCILE_SETTLE_SECONDS,
+    combine_balances, save_checkpoint, list_checkpoints, checkpoint_cutoff, load_checkpoint,
+)
+from storage_backend import ENTRY_TYPE_SIGNS
+
+# Stock "as of" a past moment. Catalog-wide answers start from the newest stored
+# snapshot at or before that moment and add the signed deltas logged since, so
+# the database only sums the gap rather than the whole history. Snapshots use the
+# reconciliation checkpoint format and are read from both directories; the ones
+# written here are kept (reconciliation prunes its own). Single-SKU answers load
+# that SKU's history once, keep the running balance, and binary search it.
+#
+# Timestamps are UTC. A bare date means the end of that day.
+STOCK_SNAPSHOT_DIR = os.getenv('STOCK_SNAPSHOT_DIR', os.path.join(RECONCILE_CHECKPOINT_DIR, 'snapshots'))
+SNAPSHOT_DIRS = (STOCK_SNAPSHOT_DIR, RECONCILE_CHECKPOINT_DIR)
+
+def as_of_bound(as_of):
+    """Exclusive UTC upper bound for `as_of`: a date becomes the following midnight."""
+    if isinstance(as_of, date) and not isinstance(as_of, datetime):
+        return pd.Timestamp(as_of, tz='UTC') + pd.Timedelta(days=1)
+    bound = pd.Timestamp(as_of)
+    return bound.tz_localize('UTC') if bound.tzinfo is None else bound.tz_convert('UTC')
+
+def _latest_settled_cutoff(settle_seconds=RECONCILE_SETTLE_SECONDS):
+    return pd.Timestamp.now(tz='UTC').floor('s') - pd.Timedelta(seconds=settle_seconds)
+
+# --- Snapshots ---
+def list_snapshots(directories=SNAPSHOT_DIRS):
+    """(cutoff, path) of every stored snapshot, oldest first."""
+    return sorted((checkpoint_cutoff(path), path) for directory in directories for path in list_checkpoints(directory))
+
+def nearest_snapshot(bound, directories=SNAPSHOT_DIRS):
+    """(cutoff, path) of the newest snapshot with cutoff <= bound, or (None, None)."""
+    snapshots = list_snapshots(directories)
+    index = np.searchsorted([cutoff.value for cutoff, _ in snapshots], bound.value, side='right')
+    return snapshots[index - 1] if index else (None, None)
+
+def _balances_before(bound, directories=SNAPSHOT_DIRS):
+    cutoff, path = nearest_snapshot(bound, directories)
+    base = load_checkpoint(path)[1] if path else None
+    deltas = bq_database.get_backend().get_stock_deltas(cutoff, bound)
+    return combine_balances(*([base] if base is not None else []), deltas)
+
+def take_snapshot(cutoff=None, directory=STOCK_SNAPSHOT_DIR, settle_seconds=RECONCILE_SETTLE_SECONDS):
+    """Stores the balances of every transaction before `cutoff` (default: the latest settled second).
+
+    Cutoffs inside the settle window are refused, since late streaming inserts
+    could still land before them and would be missing from the snapshot.
+    """
+    latest = _latest_settled_cutoff(settle_seconds)
+    cutoff = latest if cutoff is None else as_of_bound(cutoff)
+    if cutoff > latest:
+        raise ValueError(f"Cutoff {cutoff} is within the last {settle_seconds}s; rows may still arrive before it.")
+    return save_checkpoint(cutoff, _balances_before(cutoff), directory, keep=0)
+
+def backfill_snapshots(every_days, directory=STOCK_SNAPSHOT_DIR, settle_seconds=RECONCILE_SETTLE_SECONDS):
+    """Writes a snapshot at UTC midnight every `every_days` days from the first transaction on; existing ones are kept.
+
+    Each snapshot builds on the previous one, so the log is summed once overall.
+    Returns the paths written.
+    """
+    first, _ = bq_database.get_backend().get_transaction_date_range()
+    if first is None or pd.isna(first):
+        return []
+    start = as_of_bound(pd.Timestamp(first)).floor('D') + pd.Timedelta(days=1)
+    existing = {cutoff for cutoff, _ in list_snapshots((directory,))}
+    written = []
+    for cutoff in pd.date_range(start, _latest_settled_cutoff(settle_seconds), freq=f"{every_days}D"):
+        if cutoff not in existing:
+            written.append(save_checkpoint(cutoff, _balances_before(cutoff, (directory,)), directory, keep=0))
+    return written
+
+# --- Queries ---
+def get_stock_as_of(as_of):
+    """Stock of every SKU as of `as_of`: key columns plus quantity, sorted by key."""
+    bound = as_of_bound(as_of)
+    def loader():
+        balances = _balances_before(bound).rename(columns={'expected_quantity': 'quantity'})
+        return balances.sort_values(KEY_COLUMNS, ignore_index=True)
+    return read_cache.get_or_load(('get_stock_as_of', bound), TRANSACTION_TABLE, loader)
+
+def get_sku_balance_history(product_name, color, packing_option, product_grade):
+    """One SKU's running balance after each of its transactions: transaction_date, balance (oldest first)."""
+    sku = (product_name, color or '', packing_option or '', product_grade or '')
+    def loader():
+        history = bq_database.get_backend().get_sku_history(*sku)
+        signs = history['entry_type'].map(ENTRY_TYPE_SIGNS).fillna(0).astype('int64')
+        quantities = pd.to_numeric(history['quantity_change']).fillna(0).astype('int64')
+        return pd.DataFrame({
+            'transaction_date': pd.to_datetime(history['transaction_date'], utc=True),
+            'balance': (quantities * signs).cumsum(),
+        })
+    return read_cache.get_or_load(('get_sku_balance_history', sku), TRANSACTION_TABLE, loader)
+
+def get_sku_stock_as_of(product_name, color, packing_option, product_grade, as_of):
+    """Stock of one SKU as of `as_of`, by binary search over its running balance."""
+    history = get_sku_balance_history(product_name, color, packing_option, product_grade)
+    if history.empty:
+        return 0
+    times = history['transaction_date'].values.astype('datetime64[ns]').view('int64')
+    index = np.searchsorted(times, as_of_bound(as_of).value, side='left')
+    return int(history['balance'].iloc[index - 1]) if index else 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Stock as of a past date, and the snapshots that speed it up.")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--snapshot', action='store_true', help="store one snapshot (at --at, default: the latest settled second)")
+    mode.add_argument('--backfill', type=int, metavar='DAYS', help="store a snapshot every DAYS days from the first transaction")
+    mode.add_argument('--as-of', help="print the stock of every SKU as of this date or timestamp (UTC)")
+    mode.add_argument('--list', action='store_true', help="list stored snapshots")
+    parser.add_argument('--at', help="snapshot cutoff (YYYY-MM-DD means the end of that day, UTC)")
+    parser.add_argument('--snapshot-dir', default=STOCK_SNAPSHOT_DIR)
+    args = parser.parse_args()
+
+    if args.list:
+        for cutoff, path in list_snapshots((args.snapshot_dir, RECONCILE_CHECKPOINT_DIR)):
+            print(f"{cutoff.isoformat()}  {path}")
+        return 0
+    if args.as_of:
+        as_of = pd.Timestamp(args.as_of)
+        stock = get_stock_as_of(as_of.date() if len(args.as_of) == 10 else as_of)
+        print(stock.to_string(index=False))
+        print(f"\nTotal: {stock['quantity'].sum()}")
+        return 0
+
+    started = datetime.now()
+    try:
+        if args.snapshot:
+            at = pd.Timestamp(args.at) if args.at else None
+            paths = [take_snapshot(at.date() if at is not None and len(args.at) == 10 else at, args.snapshot_dir)]
+        else:
+            paths = backfill_snapshots(args.backfill, args.snapshot_dir)
+    except ValueError as e:
+        print(e)
+        return 1
+    print(f"Wrote {len(paths)} snapshot(s) in {(datetime.now() - started).total_seconds():.2f}s")
+    for path in paths:
+        print(f"  {path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
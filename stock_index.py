@@ -0,0 +1,91 @@
+# stock_index.py
+
+import threading
+import time
+
+STOCK_KEY_COLUMNS = ('product_name', 'color', 'packing_option', 'product_grade')
+
+def sku_key(product_name, color, packing_option, product_grade):
+    return (product_name, color or '', packing_option or '', product_grade or '')
+
+class StockIndex:
+    """In-process map of (product_name, color, packing_option, product_grade) -> current_quantity.
+
+    Loaded once from the stock table and then kept current by the write functions,
+    so outbound adjustments can be rejected without a database round trip. The
+    database still enforces sufficiency; the index only saves the job for requests
+    that would fail anyway. Because other replicas can add stock, a rejection from
+    an index older than `max_age_seconds` is re-checked against a fresh load first.
+    """
+
+    def __init__(self, loader, max_age_seconds=30):
+        self.loader = loader
+        self.max_age_seconds = max_age_seconds
+        self._quantities = None
+        self._by_product = {}
+        self._loaded_at = 0.0
+        self._lock = threading.RLock()
+
+    def _ensure_loaded(self):
+        if self._quantities is None:
+            self.reload()
+
+    def reload(self):
+        df = self.loader()
+        keys = zip(*(df[col].fillna('') for col in STOCK_KEY_COLUMNS))
+        quantities = dict(zip(keys, df['current_quantity'].astype('int64').tolist()))
+        by_product = {}
+        for key in quantities:
+            by_product.setdefault(key[0], set()).add(key)
+        with self._lock:
+            self._quantities = quantities
+            self._by_product = by_product
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._quantities = None
+            self._by_product = {}
+
+    def get(self, key):
+        with self._lock:
+            self._ensure_loaded()
+            return self._quantities.get(key)
+
+    def find_shortfalls(self, updates):
+        """Returns the updates whose negative adjustment exceeds the indexed stock."""
+        with self._lock:
+            self._ensure_loaded()
+            short = [u for u in updates if u['adjustment'] < 0 and self._quantities.get(self._key(u), 0) + u['adjustment'] < 0]
+            if short and time.monotonic() - self._loaded_at > self.max_age_seconds:
+                self.reload()
+                short = [u for u in short if self._quantities.get(self._key(u), 0) + u['adjustment'] < 0]
+            return short
+
+    def apply(self, updates):
+        """Records adjustments that the database has accepted."""
+        with self._lock:
+            if self._quantities is None:
+                return
+            for u in updates:
+                key = self._key(u)
+                if key in self._quantities:
+                    self._quantities[key] += u['adjustment']
+                elif u['adjustment'] > 0:
+                    self._quantities[key] = u['adjustment']
+                    self._by_product.setdefault(key[0], set()).add(key)
+
+    def product_names(self):
+        with self._lock:
+            self._ensure_loaded()
+            return sorted(self._by_product)
+
+    def skus_for_product(self, product_name):
+        """All (product_name, color, packing_option, product_grade) keys stocked for a product."""
+        with self._lock:
+            self._ensure_loaded()
+            return sorted(self._by_product.get(product_name, ()))
+
+    @staticmethod
+    def _key(update):
+        return sku_key(*(update[col] for col in STOCK_KEY_COLUMNS))
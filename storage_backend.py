@@ -0,0 +1,226 @@
+# storage_backend.py
+
+STOCK_COLUMNS = ['product_name', 'color', 'packing_option', 'product_grade', 'current_quantity']
+TRANSACTION_COLUMNS = [
+    'transaction_id', 'transaction_date', 'product_name', 'color', 'packing_option', 'product_grade',
+    'entry_type', 'quantity_change', 'user_name', 'invoice_number', 'remarks'
+]
+# Daily rollup rows: summed quantity and transaction count per SKU x day x entry_type
+ROLLUP_KEY_COLUMNS = ['product_name', 'color', 'packing_option', 'product_grade', 'day', 'entry_type']
+ROLLUP_COLUMNS = ROLLUP_KEY_COLUMNS + ['quantity', 'transactions']
+
+INFLOW_TYPES = ('Production', 'Purchase')
+OUTFLOW_TYPES = ('Sales', 'Breakage')
+
+# Direction of every entry type when replaying the log into stock
+ENTRY_TYPE_SIGNS = {
+    'Production': 1,
+    'Purchase': 1,
+    'Sales': -1,
+    'Breakage': -1,
+    'Correction - Add': 1,
+    'Correction - Subtract': -1,
+}
+STOCK_INCREASE_TYPES = tuple(t for t, sign in ENTRY_TYPE_SIGNS.items() if sign > 0)
+STOCK_DECREASE_TYPES = tuple(t for t, sign in ENTRY_TYPE_SIGNS.items() if sign < 0)
+
+def select_list(columns, allowed):
+    """SQL column list for a projection; None means every column. Unknown names are rejected."""
+    if not columns:
+        return "*"
+    unknown = [c for c in columns if c not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+    return ", ".join(columns)
+
+class StorageBackend:
+    """Interface every storage engine behind bq_database has to implement.
+
+    Write methods follow the app-wide convention of returning None on success
+    and an error message string on failure. Read methods return DataFrames.
+    """
+
+    name = "base"
+
+    # --- Inventory-related methods ---
+    def update_product_stock(self, product_name, color, packing_option, product_grade, quantity_adjustment):
+        raise NotImplementedError
+
+    def bulk_update_product_stock(self, updates: list):
+        raise NotImplementedError
+
+    def repair_product_stock(self, repairs: list):
+        """Sets drifted SKUs back to their balance in the transaction log.
+
+        Each repair holds the SKU key columns and the `difference` (current_quantity
+        minus log balance) that reconciliation observed. The balance is recomputed
+        from the log in the same transaction as the write, and a SKU is only written
+        if its difference is still the observed one and the balance is not negative,
+        so stock moved by a write made after the check is left alone.
+        Returns (list of repaired SKU keys, None or an error message).
+        """
+        raise NotImplementedError
+
+    def insert_transaction_record(self, record: dict):
+        raise NotImplementedError
+
+    def bulk_insert_transaction_records(self, records: list):
+        raise NotImplementedError
+
+    # Full-table reads accept an optional list of columns to project.
+    def get_all_product_stock(self, columns=None):
+        raise NotImplementedError
+
+    def get_inventory_records(self, columns=None):
+        raise NotImplementedError
+
+    def get_inventory_records_since(self, since):
+        """Returns transactions with transaction_date >= `since` (a tz-aware UTC Timestamp)."""
+        raise NotImplementedError
+
+    # Transaction queries take a `filters` dict with any of: product_name, color,
+    # entry_type (exact matches), product_names (a sequence of allowed names),
+    # invoice_number (case-insensitive substring), start_date and end_date
+    # (inclusive `date` bounds on transaction_date).
+    def query_inventory_records(self, filters, page_size, after=None):
+        """Returns up to `page_size` matching transactions, newest first.
+
+        `after` is the (transaction_date, transaction_id) key of the last row of
+        the previous page; only rows strictly after it in that order are returned.
+        """
+        raise NotImplementedError
+
+    def iter_inventory_records(self, filters, page_size):
+        """Yields every matching transaction, newest first, as frames of up to `page_size` rows.
+
+        The default walks keyset pages of query_inventory_records; backends that
+        can stream one result set page by page override it.
+        """
+        after = None
+        while True:
+            page = self.query_inventory_records(filters, page_size, after)
+            if page.empty:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            last_row = page.iloc[-1]
+            after = (last_row['transaction_date'], last_row['transaction_id'])
+
+    def count_inventory_records(self, filters):
+        raise NotImplementedError
+
+    def get_transaction_filter_options(self):
+        """Returns {'product_name': [...], 'color': [...], 'entry_type': [...]} of distinct values."""
+        raise NotImplementedError
+
+    # --- Analytics aggregates (entry types are classified as inflow / outflow) ---
+    def get_transaction_date_range(self):
+        """Returns the (earliest, latest) transaction_date, or (None, None) for an empty log."""
+        raise NotImplementedError
+
+    def get_daily_flow(self, filters):
+        """Returns a frame of day, inflow, outflow for the matching transactions."""
+        raise NotImplementedError
+
+    def get_sales_by_product(self, filters, limit):
+        """Returns the top `limit` products by Sales quantity, with the overall total_sales on every row."""
+        raise NotImplementedError
+
+    def get_stock_distribution(self, product_names=None):
+        """Returns current_quantity summed per product_name."""
+        raise NotImplementedError
+
+    def get_dashboard_totals(self):
+        """Returns ({entry_type: summed quantity_change}, total current stock) in one round trip."""
+        raise NotImplementedError
+
+    # --- Point-in-time stock ---
+    # Bounds are tz-aware UTC Timestamps; None leaves that side open. Unknown entry types count as zero.
+    def get_stock_deltas(self, start=None, end=None):
+        """Returns SKU key columns plus expected_quantity: signed quantity sums for start <= transaction_date < end.
+
+        Key columns use '' for NULL, matching product_stock.
+        """
+        raise NotImplementedError
+
+    def get_sku_history(self, product_name, color, packing_option, product_grade):
+        """Returns transaction_date, entry_type, quantity_change of one SKU, oldest first."""
+        raise NotImplementedError
+
+    # --- Daily rollup ---
+    # Key columns are stored with '' instead of NULL so every delta lands on one row.
+    # Rollup reads take the same `filters` dict as the transaction queries, minus invoice_number.
+    def apply_rollup_deltas(self, deltas: list):
+        """Adds the quantity and transactions of each delta row onto its (SKU, day, entry_type) row."""
+        raise NotImplementedError
+
+    def rebuild_rollup(self, start_date=None, end_date=None):
+        """Recomputes the rollup for days in [start_date, end_date] (None = open-ended) from the log. Returns rows written.
+
+        Stale marks for those days are cleared in the same transaction.
+        """
+        raise NotImplementedError
+
+    # Stale marks live in the database so every app process and the backfill CLI agree on them.
+    def mark_rollup_stale(self, days):
+        """Records days whose rollup rows missed an update. Returns None or an error message."""
+        raise NotImplementedError
+
+    def get_rollup_stale_days(self):
+        """Days currently marked stale, oldest first."""
+        raise NotImplementedError
+
+    def get_rollup_daily_flow(self, filters):
+        """Same result as get_daily_flow, summed from the rollup."""
+        raise NotImplementedError
+
+    def get_rollup_sales_by_product(self, filters, limit):
+        """Same result as get_sales_by_product, summed from the rollup."""
+        raise NotImplementedError
+
+    def get_rollup_dashboard_totals(self):
+        """Same result as get_dashboard_totals, with the entry totals summed from the rollup."""
+        raise NotImplementedError
+
+    # --- Low-stock thresholds ---
+    # Key columns are stored with '' instead of NULL; the row whose key columns are all '' holds the default.
+    def get_low_stock_thresholds(self):
+        """Returns every threshold row: the SKU key columns and threshold."""
+        raise NotImplementedError
+
+    def set_low_stock_threshold(self, key, threshold):
+        """Upserts the threshold row for `key` (a SKU key tuple); None deletes it. Returns None or an error message."""
+        raise NotImplementedError
+
+    # --- User-related methods ---
+    def email_exists(self, email):
+        raise NotImplementedError
+
+    def username_exists(self, username):
+        raise NotImplementedError
+
+    def create_user(self, user_id, username, email, password_hash):
+        raise NotImplementedError
+
+    def get_user_credentials(self, email):
+        """Returns the user row (user_id, username, password_hash, user_role, allowed_transaction) or None."""
+        raise NotImplementedError
+
+    def get_all_users(self):
+        raise NotImplementedError
+
+    def update_user_role(self, user_id, new_role):
+        raise NotImplementedError
+
+    def update_user_restriction(self, user_id, restriction_value):
+        raise NotImplementedError
+
+    def get_user_by_email(self, email):
+        raise NotImplementedError
+
+    def update_user_password(self, email, password_hash):
+        raise NotImplementedError
+
+    def delete_user(self, user_id):
+        raise NotImplementedError
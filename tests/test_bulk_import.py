@@ -0,0 +1,46 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bulk_import import CORRECTION_TYPES, build_import_batch, validate_import_chunk
+
+
+def _chunk(rows):
+    return pd.DataFrame(rows, columns=['product_name', 'quantity', 'entry_type'])
+
+
+def test_mixed_known_and_unmapped_types_get_integer_signs():
+    allowed = ['Purchase', 'Sales', 'Returns']
+    valid, errors = validate_import_chunk(_chunk([
+        ['P', '5', 'purchase'],
+        ['P', '2', 'Sales'],
+        ['P', '3', 'returns'],
+    ]), allowed)
+    assert errors.empty
+    assert valid['entry_type'].tolist() == ['Purchase', 'Sales', 'Returns']
+
+    records, updates = build_import_batch(valid, 'clerk')
+    assert [u['adjustment'] for u in updates] == [5, -2, 3]
+    assert all(isinstance(u['adjustment'], int) for u in updates)
+    assert [r['quantity_change'] for r in records] == [5, 2, 3]
+
+
+def test_types_outside_the_allowed_list_are_rejected():
+    valid, errors = validate_import_chunk(_chunk([
+        ['P', '5', 'Purchase'],
+        ['P', '1', CORRECTION_TYPES[0]],
+    ]), ['Purchase', 'Sales'])
+    assert len(valid) == 1
+    assert errors['row_number'].tolist() == [3]
+
+
+def test_correction_types_sign_like_the_log_replay():
+    valid, _ = validate_import_chunk(_chunk([
+        ['P', '4', 'correction - add'],
+        ['P', '1', 'Correction - Subtract'],
+    ]), ['Purchase', *CORRECTION_TYPES])
+    _, updates = build_import_batch(valid, 'admin')
+    assert [u['adjustment'] for u in updates] == [4, -1]
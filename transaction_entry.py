@@ -0,0 +1,54 @@
+# transaction_entry.py
+
+import uuid
+from datetime import datetime
+from bq_database import (
+    update_product_stock,
+    insert_transaction_record,
+    bulk_update_product_stock,
+    bulk_insert_transaction_records
+)
+from storage_backend import ENTRY_TYPE_SIGNS
+
+# The write path behind the Add Record forms, kept free of Streamlit so that
+# scripts (e.g. benchmarks/load_test.py) exercise exactly what the page does.
+
+def build_transaction(product_name, color, packing_option, product_grade, entry_type, quantity,
+                      user_name, invoice_number="", remarks=""):
+    """Returns (transaction record, signed stock adjustment) for one entry."""
+    adjustment = -quantity if ENTRY_TYPE_SIGNS.get(entry_type) == -1 else quantity
+    record = {
+        'transaction_id': str(uuid.uuid4()), 'transaction_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'product_name': product_name, 'color': color, 'packing_option': packing_option,
+        'product_grade': product_grade, 'entry_type': entry_type, 'quantity_change': quantity,
+        'user_name': user_name, 'invoice_number': invoice_number, 'remarks': remarks
+    }
+    return record, adjustment
+
+def stock_update_for(record, adjustment):
+    return {
+        'product_name': record['product_name'], 'color': record['color'], 'packing_option': record['packing_option'],
+        'product_grade': record['product_grade'], 'adjustment': adjustment
+    }
+
+def submit_transaction(record, adjustment):
+    """Adjusts stock, then logs the transaction. Returns None or an error message."""
+    stock_errors = update_product_stock(
+        record['product_name'], record['color'], record['packing_option'], record['product_grade'], adjustment
+    )
+    if stock_errors:
+        return stock_errors
+    transaction_errors = insert_transaction_record(record)
+    if transaction_errors:
+        return f"Stock updated, but log failed: {transaction_errors}"
+    return None
+
+def submit_transactions(records, stock_updates):
+    """Applies a batch of stock updates, then logs its records. Returns None or an error message."""
+    stock_errors = bulk_update_product_stock(stock_updates)
+    if stock_errors:
+        return stock_errors
+    transaction_errors = bulk_insert_transaction_records(records)
+    if transaction_errors:
+        return f"Stock updated, but log failed: {transaction_errors}"
+    return None
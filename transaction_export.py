@@ -0,0 +1,143 @@
+# transaction_export.py
+
+import argparse
+import contextlib
+import csv
+import gzip
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+import pandas as pd
+import bq_database
+from storage_backend import TRANSACTION_COLUMNS
+
+# Streams the (filtered) transaction log out of the backend one page at a time,
+# so memory stays at one page however large the export is. BigQuery runs a single
+# query job and reads its result page by page; SQLite walks keyset pages. Pages
+# go straight to the backend rather than through read_cache; caching them would
+# hold the whole export in memory after all. Rows come out newest first, the
+# same order as the View Transactions page.
+EXPORT_PAGE_SIZE = int(os.getenv('EXPORT_PAGE_SIZE', '10000'))
+EXPORT_FORMATS = {'csv': '.csv', 'csv.gz': '.csv.gz', 'parquet': '.parquet'}
+
+# Files prepared for download in the app; ones older than the TTL are removed whenever a new one is made
+EXPORT_DIR = os.getenv('EXPORT_DIR', os.path.join(tempfile.gettempdir(), 'inventory_exports'))
+EXPORT_TTL_SECONDS = float(os.getenv('EXPORT_TTL_SECONDS', '3600'))
+
+def iter_pages(filters=None, page_size=EXPORT_PAGE_SIZE):
+    """Yields pages (DataFrames with TRANSACTION_COLUMNS) of transactions matching `filters`."""
+    key = dict(bq_database._transaction_filters(filters))
+    for page in bq_database.get_backend().iter_inventory_records(key, page_size):
+        page = page.reindex(columns=TRANSACTION_COLUMNS)
+        page['transaction_date'] = pd.to_datetime(page['transaction_date'], utc=True)
+        yield page
+
+# --- Writers ---
+def _write_csv(pages, stream):
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='', write_through=True)
+    writer = csv.writer(text)
+    writer.writerow(TRANSACTION_COLUMNS)
+    rows = 0
+    for page in pages:
+        page = page.assign(transaction_date=page['transaction_date'].dt.strftime('%Y-%m-%d %H:%M:%S'))
+        writer.writerows(page.astype(object).where(page.notna(), '').itertuples(index=False))
+        rows += len(page)
+    text.detach()
+    return rows
+
+def _parquet_schema():
+    import pyarrow as pa
+    types = {'transaction_date': pa.timestamp('us', tz='UTC'), 'quantity_change': pa.int64()}
+    return pa.schema([(col, types.get(col, pa.string())) for col in TRANSACTION_COLUMNS])
+
+def _write_parquet(pages, stream):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = _parquet_schema()
+    rows = 0
+    with pq.ParquetWriter(stream, schema, compression='snappy') as writer:
+        for page in pages:
+            page['quantity_change'] = pd.to_numeric(page['quantity_change']).astype('Int64')
+            for col in TRANSACTION_COLUMNS:
+                if col not in ('transaction_date', 'quantity_change'):
+                    page[col] = page[col].astype(object).where(page[col].notna(), None)
+            writer.write_table(pa.Table.from_pandas(page, schema=schema, preserve_index=False))
+            rows += len(page)
+    return rows
+
+def export_transactions(stream, fmt='csv', filters=None, page_size=EXPORT_PAGE_SIZE):
+    """Writes every transaction matching `filters` to the binary `stream` as csv, csv.gz or parquet. Returns the row count."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'. Expected one of: {', '.join(EXPORT_FORMATS)}.")
+    pages = iter_pages(filters, page_size)
+    if fmt == 'parquet':
+        return _write_parquet(pages, stream)
+    if fmt == 'csv.gz':
+        with gzip.GzipFile(fileobj=stream, mode='wb') as compressed:
+            return _write_csv(pages, compressed)
+    return _write_csv(pages, stream)
+
+def export_to_file(path, fmt='csv', filters=None, page_size=EXPORT_PAGE_SIZE):
+    """Exports to `path` via a temporary file, so a failed export never leaves a truncated file behind."""
+    try:
+        with open(path + '.tmp', 'wb') as f:
+            rows = export_transactions(f, fmt, filters, page_size)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path + '.tmp')
+        raise
+    os.replace(path + '.tmp', path)
+    return rows
+
+def purge_old_exports(directory=EXPORT_DIR, ttl_seconds=EXPORT_TTL_SECONDS):
+    """Removes export files (and leftover .tmp files) last modified more than `ttl_seconds` ago."""
+    if not os.path.isdir(directory):
+        return
+    cutoff = time.time() - ttl_seconds
+    for entry in os.scandir(directory):
+        with contextlib.suppress(FileNotFoundError):
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+
+def new_export_path(fmt, directory=EXPORT_DIR):
+    """Reserves a file in the export directory for one download, clearing out expired ones first."""
+    os.makedirs(directory, exist_ok=True)
+    purge_old_exports(directory)
+    handle, path = tempfile.mkstemp(suffix=EXPORT_FORMATS[fmt], dir=directory)
+    os.close(handle)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the transaction log without loading it into memory.")
+    parser.add_argument('output', help="destination file")
+    parser.add_argument('--format', choices=list(EXPORT_FORMATS), help="default: taken from the file extension, else csv")
+    parser.add_argument('--product-name')
+    parser.add_argument('--color')
+    parser.add_argument('--entry-type')
+    parser.add_argument('--invoice-number')
+    parser.add_argument('--start-date', type=lambda v: datetime.strptime(v, '%Y-%m-%d').date(), help="YYYY-MM-DD")
+    parser.add_argument('--end-date', type=lambda v: datetime.strptime(v, '%Y-%m-%d').date(), help="YYYY-MM-DD, inclusive")
+    parser.add_argument('--page-size', type=int, default=EXPORT_PAGE_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format or next((f for f, ext in sorted(EXPORT_FORMATS.items(), key=lambda item: -len(item[1]))
+                               if args.output.endswith(ext)), 'csv')
+    filters = {
+        'product_name': args.product_name, 'color': args.color, 'entry_type': args.entry_type,
+        'invoice_number': args.invoice_number, 'start_date': args.start_date,
+        'end_date': args.end_date or args.start_date,
+    }
+    started = datetime.now()
+    try:
+        rows = export_to_file(args.output, fmt, filters, args.page_size)
+    except Exception as e:
+        print(f"An Error Occurred: {e}")
+        return 1
+    print(f"Exported {rows} rows to {args.output} ({fmt}) in {(datetime.now() - started).total_seconds():.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,71 +1,171 @@
+import contextlib
+import os
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from bq_database import get_inventory_records
+from bq_database import query_inventory_records, count_inventory_records, get_transaction_filter_options, get_all_product_stock
+
+PAGE_SIZE_OPTIONS = [50, 100, 250, 500]
+SKU_COLUMNS = ['product_name', 'color', 'packing_option', 'product_grade']
 
 def show_view_records():
+    view = st.radio("View", ["Transaction Log", "Stock As Of Date"], horizontal=True, label_visibility="collapsed")
+    if view == "Stock As Of Date":
+        show_stock_as_of()
+    else:
+        show_transaction_log()
+
+def show_transaction_log():
     st.markdown("### 📋 Inventory Transaction Log")
     st.info("This table shows every single inventory movement, serving as a complete audit log.")
 
-    # Fetch records from BigQuery
-    df = get_inventory_records()
+    # Distinct values for the dropdowns come from a small dedicated query
+    options = get_transaction_filter_options()
 
-    if df.empty:
+    if not options['product_name'] and not options['entry_type']:
         st.info("No transaction records found.")
         return
 
-    # Convert timestamp for better filtering
-    df['transaction_date'] = pd.to_datetime(df['transaction_date'])
-
     # Add filters for product_name, color, date, etc.
     with st.expander("🔎 Filter Records", expanded=True):
         ## --- MODIFIED: Added a fourth column for the new filter ---
         col1, col2, col3, col4 = st.columns(4)
         with col1:
-            product_name = st.selectbox("Product Name", ["All"] + sorted(df["product_name"].unique().tolist()))
+            product_name = st.selectbox("Product Name", ["All"] + options['product_name'])
         with col2:
-            color = st.selectbox("Color", ["All"] + sorted(df["color"].unique().tolist()))
+            color = st.selectbox("Color", ["All"] + options['color'])
         with col3:
-            entry_type = st.selectbox("Entry Type", ["All"] + sorted(df["entry_type"].unique().tolist()))
+            entry_type = st.selectbox("Entry Type", ["All"] + options['entry_type'])
         ## --- NEW: Filter by Invoice Number ---
         with col4:
             invoice_filter = st.text_input("Filter by Invoice #")
 
-        filtered_df = df.copy()
-        if product_name != "All":
-            filtered_df = filtered_df[filtered_df["product_name"] == product_name]
-        if color != "All":
-            filtered_df = filtered_df[filtered_df["color"] == color]
-        if entry_type != "All":
-            filtered_df = filtered_df[filtered_df["entry_type"] == entry_type]
-        ## --- NEW: Logic to apply the invoice filter ---
-        if invoice_filter:
-            # Use .str.contains for partial matches, case-insensitive, and handle empty cells
-            filtered_df = filtered_df[filtered_df["invoice_number"].str.contains(invoice_filter, case=False, na=False)]
+        col5, col6 = st.columns([3, 1])
+        with col5:
+            date_range = st.date_input("Date Range (optional)", value=(), max_value=datetime.now().date())
+        with col6:
+            page_size = st.selectbox("Rows per page", PAGE_SIZE_OPTIONS, index=1)
+
+    start_date = date_range[0] if len(date_range) > 0 else None
+    end_date = date_range[1] if len(date_range) > 1 else start_date
+    filters = {
+        'product_name': product_name, 'color': color, 'entry_type': entry_type,
+        'invoice_number': invoice_filter.strip(), 'start_date': start_date, 'end_date': end_date,
+    }
+
+    # Filters and ordering run in the database; only the current page is held in memory.
+    # The cursor stack holds the last (transaction_date, transaction_id) of every page before this one.
+    filter_signature = (tuple(sorted(filters.items(), key=lambda item: item[0])), page_size)
+    if st.session_state.get('txn_filter_signature') != filter_signature:
+        st.session_state.txn_filter_signature = filter_signature
+        st.session_state.txn_page_cursors = []
+
+    cursors = st.session_state.txn_page_cursors
+    after = cursors[-1] if cursors else None
+    filtered_df = query_inventory_records(filters, page_size=page_size, after=after)
+    total_records = count_inventory_records(filters)
 
     # Prepare DataFrame for Display
     if not filtered_df.empty:
         df_display = filtered_df.copy()
-        df_display['transaction_date'] = df_display['transaction_date'].dt.strftime('%Y-%m-%d')
-        
+        df_display['transaction_date'] = pd.to_datetime(df_display['transaction_date']).dt.strftime('%Y-%m-%d')
+
         ## --- MODIFIED: Added 'invoice_number' to the list of columns to show ---
         columns_to_display = [
-            'transaction_date', 
+            'transaction_date',
             'invoice_number',
-            'product_name', 
-            'color', 
-            'packing_option', 
-            'product_grade', 
-            'entry_type', 
-            'quantity_change', 
+            'product_name',
+            'color',
+            'packing_option',
+            'product_grade',
+            'entry_type',
+            'quantity_change',
             'user_name'
         ]
-        
+
         # This makes sure the app doesn't crash if a column doesn't exist yet
         columns_to_display = [col for col in columns_to_display if col in df_display.columns]
-        
+
         st.dataframe(df_display[columns_to_display], use_container_width=True)
     else:
         st.dataframe(filtered_df, use_container_width=True)
 
-    st.caption(f"Total records: {len(filtered_df)}")
\ No newline at end of file
+    # --- Pagination ---
+    page_number = len(cursors) + 1
+    page_count = max(1, -(-total_records // page_size))
+    nav_prev, nav_info, nav_next = st.columns([1, 3, 1])
+    if nav_prev.button("⬅️ Previous", disabled=page_number == 1):
+        cursors.pop()
+        st.rerun()
+    nav_info.caption(f"Page {page_number} of {page_count} · Total records: {total_records}")
+    if nav_next.button("Next ➡️", disabled=len(filtered_df) < page_size or page_number >= page_count):
+        last_row = filtered_df.iloc[-1]
+        cursors.append((pd.Timestamp(last_row['transaction_date']), last_row['transaction_id']))
+        st.rerun()
+
+    show_export(filters, filter_signature)
+
+def show_export(filters, filter_signature):
+    # Imported here so pyarrow is only loaded when someone exports.
+    from transaction_export import EXPORT_FORMATS, export_to_file, new_export_path
+
+    with st.expander("⬇️ Export Filtered Records"):
+        fmt = st.selectbox("Format", list(EXPORT_FORMATS), index=1)
+        # The export streams page by page into a file in EXPORT_DIR, not into memory. Files of
+        # abandoned sessions are removed once they pass EXPORT_TTL_SECONDS.
+        if st.button("Prepare Export"):
+            previous = st.session_state.pop('txn_export', None)
+            if previous:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(previous['path'])
+            path = new_export_path(fmt)
+            with st.spinner("Exporting..."):
+                try:
+                    rows = export_to_file(path, fmt, filters)
+                except Exception as e:
+                    for leftover in (path, path + '.tmp'):
+                        with contextlib.suppress(FileNotFoundError):
+                            os.remove(leftover)
+                    st.error(f"An Error Occurred: {e}")
+                    return
+            st.session_state.txn_export = {
+                'path': path, 'rows': rows, 'signature': filter_signature,
+                'file_name': f"transactions_{datetime.now():%Y%m%d_%H%M%S}{EXPORT_FORMATS[fmt]}",
+            }
+
+        export = st.session_state.get('txn_export')
+        if export and export['signature'] == filter_signature and os.path.exists(export['path']):
+            with open(export['path'], 'rb') as f:
+                st.download_button(f"Download {export['rows']} records", f, file_name=export['file_name'])
+
+def show_stock_as_of():
+    # Imported here so the transaction log view does not load the snapshot machinery.
+    from stock_history import get_stock_as_of, get_sku_stock_as_of, get_sku_balance_history
+
+    st.markdown("### 🕰️ Stock As Of Date")
+    st.info("Stock levels at the end of the chosen day (UTC), rebuilt from the transaction log.")
+
+    skus = get_all_product_stock(SKU_COLUMNS)
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        as_of = st.date_input("As of", value=datetime.now().date(), max_value=datetime.now().date())
+    with col2:
+        sku_options = {
+            " / ".join(str(v) for v in sku if pd.notna(v) and v): tuple('' if pd.isna(v) else v for v in sku)
+            for sku in skus[SKU_COLUMNS].itertuples(index=False)
+        }
+        choice = st.selectbox("Product", ["All"] + sorted(sku_options))
+
+    if choice == "All":
+        stock = get_stock_as_of(as_of)
+        stock = stock[stock['quantity'] != 0]
+        st.metric("Total units", f"{int(stock['quantity'].sum()):,}")
+        st.dataframe(stock, use_container_width=True, hide_index=True)
+        return
+
+    sku = sku_options[choice]
+    st.metric(f"Stock on {as_of:%Y-%m-%d}", f"{get_sku_stock_as_of(*sku, as_of):,}")
+    history = get_sku_balance_history(*sku)
+    history = history[history['transaction_date'] < pd.Timestamp(as_of, tz='UTC') + pd.Timedelta(days=1)]
+    if not history.empty:
+        st.line_chart(history.set_index('transaction_date')['balance'])
@@ -0,0 +1,86 @@
+# write_coordinator.py
+
+import random
+import threading
+import time
+
+# Substrings of backend errors that mean "another writer got there first, try again"
+CONFLICT_MARKERS = (
+    'concurrent update',
+    'could not serialize access',
+    'transaction is aborted due to concurrent update',
+    'too many dml statements outstanding',
+    'database is locked',
+)
+
+# Backends put this in errors raised after part of an operation has committed. Running such
+# an operation again would apply the committed part twice, so it is never retried.
+PARTIAL_APPLY_MARKER = 'partially applied'
+
+def is_conflict_error(error):
+    text = str(error).lower()
+    return bool(error) and PARTIAL_APPLY_MARKER not in text and any(marker in text for marker in CONFLICT_MARKERS)
+
+class WriteCoordinator:
+    """Serializes stock mutations per SKU and retries concurrent-modification failures.
+
+    Keys are hashed onto a fixed set of lock stripes, so memory stays bounded no
+    matter how many SKUs exist. A bulk write takes every stripe it touches in
+    ascending order, which keeps two overlapping batches from deadlocking.
+    Conflicts reported by the backend are retried with full-jitter exponential
+    backoff before the error is handed back to the caller. An operation is only
+    safe to retry if a conflict means nothing was written, so operations that
+    commit in several steps must report a later failure as partially applied.
+    """
+
+    def __init__(self, max_retries=5, backoff_base=0.1, backoff_max=3.0, stripes=256):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._stripes = [threading.Lock() for _ in range(stripes)]
+        self._stats_lock = threading.Lock()
+        self.writes = 0
+        self.retries = 0
+        self.conflicts = 0
+        self.exhausted = 0
+
+    def run(self, keys, operation):
+        """Runs `operation()` (which returns None or an error string) while holding the locks for `keys`."""
+        stripes = sorted({hash(key) % len(self._stripes) for key in keys})
+        for index in stripes:
+            self._stripes[index].acquire()
+        try:
+            return self._run_with_retry(operation)
+        finally:
+            for index in reversed(stripes):
+                self._stripes[index].release()
+
+    def _run_with_retry(self, operation):
+        attempt = 0
+        while True:
+            error = operation()
+            if not is_conflict_error(error):
+                self._count(writes=1)
+                return error
+            self._count(conflicts=1)
+            if attempt >= self.max_retries:
+                self._count(writes=1, exhausted=1)
+                return f"Error: This item is being updated by other users right now. Please try again. ({error})"
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+            time.sleep(delay)
+            attempt += 1
+            self._count(retries=1)
+
+    def _count(self, writes=0, retries=0, conflicts=0, exhausted=0):
+        with self._stats_lock:
+            self.writes += writes
+            self.retries += retries
+            self.conflicts += conflicts
+            self.exhausted += exhausted
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'writes': self.writes, 'retries': self.retries,
+                'conflicts': self.conflicts, 'exhausted': self.exhausted,
+            }
@@ -0,0 +1,188 @@
+# write_queue.py
+
+import atexit
+import os
+import threading
+import time
+import bq_database
+from write_coordinator import PARTIAL_APPLY_MARKER
+
+# Optional write-behind mode for single transactions
+WRITE_BEHIND = os.getenv('WRITE_BEHIND', 'false').lower() in ('1', 'true', 'yes')
+WRITE_BEHIND_FLUSH_MS = int(os.getenv('WRITE_BEHIND_FLUSH_MS', '250'))
+WRITE_BEHIND_MAX_BATCH = int(os.getenv('WRITE_BEHIND_MAX_BATCH', '200'))
+
+class WriteTicket:
+    """Handle returned to the submitter; resolves to 'committed' or 'failed' once flushed."""
+
+    def __init__(self, record):
+        self.record = record
+        self.status = 'queued'
+        self.error = None
+        self.submitted_at = time.time()
+        self._done = threading.Event()
+
+    def _resolve(self, error):
+        self.error = error
+        self.status = 'failed' if error else 'committed'
+        self._done.set()
+
+    def wait(self, timeout=None):
+        """Blocks up to `timeout` seconds for the flush and returns the current status."""
+        self._done.wait(timeout)
+        return self.status
+
+class WriteBehindQueue:
+    """Collects transactions from every session and writes them in coalesced batches.
+
+    A background worker flushes whenever `flush_interval` seconds have passed since
+    the oldest pending item or `max_batch` items are waiting. Adjustments for the
+    same SKU are summed into one MERGE row by bulk_update_product_stock, and all
+    log records go out in one bulk insert. If the batch is rejected for
+    insufficient stock (nothing was written), its items are replayed one by one
+    so only the offending submission fails; any other error fails every ticket in
+    the batch, since some of it may have been applied.
+
+    Pending items are flushed at normal interpreter exit. A hard kill (SIGKILL,
+    an out-of-memory restart) loses whatever was still queued: at most
+    `max_batch` items or `flush_interval` seconds of submissions.
+    """
+
+    def __init__(self, flush_interval=WRITE_BEHIND_FLUSH_MS / 1000, max_batch=WRITE_BEHIND_MAX_BATCH):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._pending = []
+        self._cond = threading.Condition()
+        self._worker = None
+        self._flush_lock = threading.Lock()
+        # Batches the worker has taken off _pending but not finished writing; drain() waits for them
+        self._in_flight = 0
+        self._draining = False
+        self.batches_flushed = 0
+        self.records_flushed = 0
+        self.fallbacks = 0
+        self.last_flush_ms = 0.0
+
+    def submit(self, record: dict, adjustment: int):
+        """Queues one transaction and its stock adjustment; returns a WriteTicket."""
+        ticket = WriteTicket(record)
+        with self._cond:
+            self._ensure_worker()
+            self._pending.append((ticket, adjustment))
+            self._cond.notify()
+        return ticket
+
+    def pending_count(self):
+        with self._cond:
+            return len(self._pending)
+
+    def stats(self):
+        return {
+            'pending': self.pending_count(), 'batches_flushed': self.batches_flushed,
+            'records_flushed': self.records_flushed, 'fallbacks': self.fallbacks,
+            'last_flush_ms': round(self.last_flush_ms, 1),
+        }
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            atexit.register(self.drain)
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._draining:
+                    self._cond.wait()
+                if self._draining:
+                    return
+                deadline = self._pending[0][0].submitted_at + self.flush_interval
+                while len(self._pending) < self.max_batch and not self._draining:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._draining:
+                    return
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+                self._in_flight += 1
+            try:
+                self.flush(batch)
+            finally:
+                with self._cond:
+                    self._in_flight -= 1
+                    self._cond.notify_all()
+
+    def drain(self):
+        """Stops the worker, waits for the batch it is writing, then flushes everything still pending."""
+        with self._cond:
+            self._draining = True
+            self._cond.notify_all()
+            while self._in_flight:
+                self._cond.wait()
+            pending = self._pending[:]
+            del self._pending[:]
+        for start in range(0, len(pending), self.max_batch):
+            self.flush(pending[start:start + self.max_batch])
+        with self._cond:
+            # Anything submitted afterwards starts a fresh worker.
+            self._draining = False
+
+    @staticmethod
+    def _rejected_before_writing(error):
+        # bulk_update_product_stock is all or nothing, so a shortfall means no row was applied.
+        return error.startswith("Error: Insufficient stock") and PARTIAL_APPLY_MARKER not in error
+
+    def flush(self, batch):
+        with self._flush_lock:
+            self._flush(batch)
+
+    def _flush(self, batch):
+        started = time.perf_counter()
+        updates = [
+            {**{col: ticket.record.get(col, '') for col in bq_database.STOCK_KEY_COLUMNS}, 'adjustment': adjustment}
+            for ticket, adjustment in batch
+        ]
+        try:
+            error = bq_database.bulk_update_product_stock(updates)
+            if error and self._rejected_before_writing(error):
+                self._flush_individually(batch)
+            elif error:
+                for ticket, _ in batch:
+                    ticket._resolve(error)
+            else:
+                log_error = bq_database.bulk_insert_transaction_records([ticket.record for ticket, _ in batch])
+                for ticket, _ in batch:
+                    ticket._resolve(f"Stock updated, but log failed: {log_error}" if log_error else None)
+        except Exception as e:
+            for ticket, _ in batch:
+                if ticket.status == 'queued':
+                    ticket._resolve(f"An Error Occurred: {e}")
+        self.batches_flushed += 1
+        self.records_flushed += len(batch)
+        self.last_flush_ms = (time.perf_counter() - started) * 1000
+
+    def _flush_individually(self, batch):
+        self.fallbacks += 1
+        for ticket, adjustment in batch:
+            r = ticket.record
+            error = bq_database.update_product_stock(
+                r['product_name'], r.get('color', ''), r.get('packing_option', ''), r.get('product_grade', ''), adjustment
+            )
+            if not error:
+                log_error = bq_database.insert_transaction_record(r)
+                error = f"Stock updated, but log failed: {log_error}" if log_error else None
+            ticket._resolve(error)
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+def get_write_queue():
+    """Returns the process-wide queue shared by all Streamlit sessions."""
+    global _write_queue
+    with _write_queue_lock:
+        if _write_queue is None:
+            _write_queue = WriteBehindQueue()
+        return _write_queue